@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Progress analytics for PyAdventure
+Aggregates class-wide statistics over many player saves without building
+Player objects: the XP distribution, a level histogram, the most-failed
+challenges and the scenes players stall on, joined against story scene IDs
+
+Saves are only ever read. A source can be a JSON save, a journal save
+(player_journal.jsonl and its snapshot), a SQLite save database, or a
+directory holding any number of them.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from journal import JournalSaveBackend
+from player import level_for_experience
+from story import parse_link
+from story_registry import StoryRegistry
+
+JOURNAL_SUFFIX = ".jsonl"
+SNAPSHOT_SUFFIX = ".snapshot.json"
+HISTORY_SUFFIX = ".history.jsonl"
+DATABASE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# Save sources handed to each worker process at a time
+CHUNK_SIZE = 256
+
+PERCENTILES = {"p10": 0.10, "p25": 0.25, "median": 0.50, "p75": 0.75, "p90": 0.90}
+
+
+def save_kind(path: str) -> Optional[str]:
+    """'json', 'journal' or 'database' for a save file, or None for files that hold no save"""
+    name = os.path.basename(path)
+    if name.startswith(".tmp-") or name.endswith(HISTORY_SUFFIX):
+        return None
+    if name.endswith(SNAPSHOT_SUFFIX) or name.endswith(JOURNAL_SUFFIX):
+        return "journal"
+    if name.endswith(".json"):
+        return "json"
+    if name.endswith(DATABASE_SUFFIXES):
+        return "database"
+    return None
+
+
+def find_saves(sources: Iterable[str]) -> List[str]:
+    """
+    Expand save directories into one path per save source, sorted
+
+    A journal save is listed once, by its journal file, even when only its
+    snapshot exists. Files named directly are read as JSON saves unless
+    their name says otherwise.
+    """
+    found: Dict[str, None] = {}
+    for source in sources:
+        named = not os.path.isdir(source)
+        if named:
+            candidates = [source]
+        else:
+            candidates = [os.path.join(root, name) for root, _, names in os.walk(source) for name in names]
+        for path in candidates:
+            if not named and save_kind(path) is None:
+                continue
+            if path.endswith(SNAPSHOT_SUFFIX):
+                path = path[:-len(SNAPSHOT_SUFFIX)] + JOURNAL_SUFFIX
+            found[path] = None
+    return sorted(found)
+
+
+def _read_database(path: str, on_error: Callable[[str, str], None]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield every profile's save from a SQLite save database, opened read-only, skipping rows that can't be decoded"""
+    import sqlite3
+    from urllib.request import pathname2url
+
+    # SQLiteSaveStore would create tables and switch journal modes; only read here
+    connection = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(
+            "SELECT profile, experience, completed_challenges, current_story, current_scene, extra FROM profiles"
+        )
+        for profile, experience, completed, story, scene, extra in rows:
+            where = f"{path}:{profile}"
+            try:
+                save = {
+                    "experience": experience,
+                    "completed_challenges": json.loads(completed),
+                    "failed_challenges": json.loads(extra).get("failed_challenges", {}),
+                    "current_story": story,
+                    "current_scene": scene
+                }
+            except (TypeError, ValueError, AttributeError) as e:
+                # One bad profile doesn't make the rest of the database unreadable
+                on_error(where, f"malformed profile row: {e}")
+                continue
+            yield where, save
+    finally:
+        connection.close()
+
+
+def read_saves(path: str, on_error: Callable[[str, str], None] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (where, save data) for one source: one save for a file, one per profile for a database
+
+    A database profile that can't be decoded is reported as on_error(where,
+    message) and skipped; without on_error it raises ValueError. Other
+    problems with a source raise.
+    """
+    kind = save_kind(path)
+    if kind == "database":
+        if on_error is None:
+            def on_error(where: str, message: str):
+                raise ValueError(message)
+        yield from _read_database(path, on_error)
+        return
+
+    if kind == "journal":
+        data = JournalSaveBackend(path).load()
+    else:
+        with open(path, 'rb') as f:
+            data = json.loads(f.read())
+    if not isinstance(data, dict):
+        raise ValueError("not a player save")
+    yield path, data
+
+
+class ProgressStats:
+    """Running totals over a set of saves; partial totals from workers are merged"""
+
+    def __init__(self):
+        self.players = 0
+        # Experience value -> players with it
+        self.experience: Counter = Counter()
+        # Challenge ID -> wrong answers, and -> players who gave one
+        self.failures: Counter = Counter()
+        self.failing_players: Counter = Counter()
+        # (story, scene ID or legacy index) -> players whose save is there
+        self.positions: Counter = Counter()
+        self.unreadable: List[Tuple[str, str]] = []
+
+    def add(self, save: Dict[str, Any]):
+        """Count one player's save"""
+        experience = save.get("experience", 0)
+        failed = save.get("failed_challenges") or {}
+        position = (save.get("current_story", "intro"), save.get("current_scene", 0))
+        if (not isinstance(experience, int) or not isinstance(failed, dict)
+                or not all(isinstance(attempts, int) for attempts in failed.values())
+                or not all(isinstance(part, (str, int)) for part in position)):
+            raise ValueError("malformed save fields")
+
+        self.players += 1
+        self.experience[experience] += 1
+        for challenge_id, attempts in failed.items():
+            self.failures[challenge_id] += attempts
+            self.failing_players[challenge_id] += 1
+        self.positions[position] += 1
+
+    def merge(self, other: "ProgressStats"):
+        """Add another set of totals into this one"""
+        self.players += other.players
+        self.experience.update(other.experience)
+        self.failures.update(other.failures)
+        self.failing_players.update(other.failing_players)
+        self.positions.update(other.positions)
+        self.unreadable.extend(other.unreadable)
+
+
+def summarize(paths: List[str]) -> ProgressStats:
+    """Totals for a list of save sources; unreadable sources and profiles are recorded, not raised"""
+    stats = ProgressStats()
+
+    def skip(where: str, message: str):
+        stats.unreadable.append((where, message))
+
+    for path in paths:
+        try:
+            for where, save in read_saves(path, skip):
+                try:
+                    stats.add(save)
+                except ValueError as e:
+                    skip(where, str(e))
+        except Exception as e:
+            skip(path, str(e))
+    return stats
+
+
+def collect(sources: Iterable[str], workers: int = None, chunk_size: int = CHUNK_SIZE) -> Tuple[int, ProgressStats]:
+    """
+    Read every save under sources across a pool of worker processes
+
+    Returns:
+        The number of save sources found and their merged totals
+    """
+    paths = find_saves(sources)
+    workers = workers or os.cpu_count() or 1
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    stats = ProgressStats()
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            stats.merge(summarize(chunk))
+        return len(paths), stats
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as executor:
+        for partial in executor.map(summarize, chunks):
+            stats.merge(partial)
+    return len(paths), stats
+
+
+def percentile(counts: Counter, fraction: float) -> int:
+    """Nearest-rank percentile of a value -> occurrences histogram"""
+    rank = max(1, math.ceil(fraction * sum(counts.values())))
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen >= rank:
+            return value
+    raise ValueError("empty histogram")
+
+
+class SceneIndex:
+    """Scene IDs, titles and types of the stories saves refer to, loaded once each"""
+
+    def __init__(self, stories_dir: str = "stories"):
+        self.registry = StoryRegistry(stories_dir, disk_cache=False)
+        # Story name -> (scenes in order, scene ID -> scene), or None if it can't be loaded
+        self._stories: Dict[str, Optional[Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]]] = {}
+
+    def _load(self, story_name: str):
+        try:
+            story = self.registry.acquire(story_name)
+        except (OSError, ValueError):
+            return None
+        try:
+            scenes = [
+                {"scene": scene.get("id"), "title": scene.get("title", ""), "type": scene.get("type", "choice")}
+                for scene in (story.scene_at(i) for i in range(len(story)))
+            ]
+        finally:
+            self.registry.release(story)
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for scene in scenes:
+            # First occurrence wins, as in CompiledStory
+            by_id.setdefault(scene["scene"], scene)
+        return scenes, by_id
+
+    def describe(self, story_name: str, scene: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a scene by ID, or by index for saves made before scene IDs
+
+        Returns:
+            The scene's ID, title and type, or None if the story has no such scene
+        """
+        if story_name not in self._stories:
+            self._stories[story_name] = self._load(story_name)
+        story = self._stories[story_name]
+        if story is None:
+            return None
+        scenes, by_id = story
+        if isinstance(scene, int) and not isinstance(scene, bool):
+            return scenes[scene] if 0 <= scene < len(scenes) else None
+        return by_id.get(scene)
+
+
+def build_report(stats: ProgressStats, stories_dir: str = "stories", top: int = 10) -> Dict[str, Any]:
+    """Turn merged totals into the analytics report, joined against the stories"""
+    index = SceneIndex(stories_dir)
+
+    experience: Dict[str, Any] = {}
+    if stats.players:
+        experience = {
+            "min": min(stats.experience),
+            **{name: percentile(stats.experience, fraction) for name, fraction in PERCENTILES.items()},
+            "max": max(stats.experience),
+            "mean": round(sum(xp * count for xp, count in stats.experience.items()) / stats.players, 1)
+        }
+    levels: Counter = Counter()
+    for xp, count in stats.experience.items():
+        levels[level_for_experience(xp)] += count
+
+    most_failed = []
+    for challenge_id, attempts in stats.failures.most_common(top):
+        link = parse_link(challenge_id)
+        scene = index.describe(*link) if link else None
+        most_failed.append({
+            "challenge": challenge_id,
+            "attempts": attempts,
+            "players": stats.failing_players[challenge_id],
+            "title": scene["title"] if scene else None,
+            "known": scene is not None
+        })
+
+    stories: Dict[str, Dict[str, int]] = {}
+    stalls: Counter = Counter()
+    titles: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for (story_name, scene_ref), count in stats.positions.items():
+        totals = stories.setdefault(story_name, {"players": 0, "finished": 0, "unknown_scene": 0})
+        totals["players"] += count
+        scene = index.describe(story_name, scene_ref)
+        if scene is None:
+            totals["unknown_scene"] += count
+        elif scene["type"] == "ending":
+            totals["finished"] += count
+        else:
+            # Legacy index positions fold into the scene's ID
+            stalls[(story_name, scene["scene"])] += count
+            titles[(story_name, scene["scene"])] = scene
+
+    return {
+        "players": stats.players,
+        "unreadable": [{"path": path, "error": error} for path, error in stats.unreadable],
+        "experience": experience,
+        "levels": {str(level): levels[level] for level in sorted(levels)},
+        "most_failed": most_failed,
+        "stalls": [
+            {"story": story_name, "scene": scene_id, "title": titles[(story_name, scene_id)]["title"],
+             "type": titles[(story_name, scene_id)]["type"], "players": count}
+            for (story_name, scene_id), count in stalls.most_common(top)
+        ],
+        "stories": dict(sorted(stories.items()))
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a human-readable analytics report"""
+    print(f"Players: {report['players']} from {report['sources']} save sources in {report['elapsed_s']}s")
+    for entry in report["unreadable"]:
+        print(f"  ⚠️  Unreadable save {entry['path']}: {entry['error']}")
+    if not report["players"]:
+        return
+
+    experience = report["experience"]
+    print("Experience: " + ", ".join(f"{name} {value}" for name, value in experience.items()))
+
+    print("Levels:")
+    widest = max(report["levels"].values())
+    for level, count in report["levels"].items():
+        bar = "█" * max(1, round(count / widest * 40))
+        print(f"  {level:>4} {bar} {count}")
+
+    if report["most_failed"]:
+        print("Most-failed challenges:")
+        for entry in report["most_failed"]:
+            where = entry["challenge"] if entry["known"] else f"{entry['challenge']} (not in any story)"
+            print(f"  ❌ {where}: {entry['attempts']} wrong answers from {entry['players']} players")
+
+    if report["stalls"]:
+        print("Where players are stopped:")
+        for entry in report["stalls"]:
+            print(f"  {entry['story']}:{entry['scene']} ({entry['title']}): {entry['players']} players")
+
+    print("Stories:")
+    for story_name, totals in report["stories"].items():
+        line = f"  {story_name}: {totals['players']} players, {totals['finished']} finished"
+        if totals["unknown_scene"]:
+            line += f", ⚠️  {totals['unknown_scene']} at scenes the story no longer has"
+        print(line)
+
+
+def main(argv=None) -> int:
+    """Command-line entry point; exits non-zero when a save can't be read"""
+    parser = argparse.ArgumentParser(description="Aggregate PyAdventure player progress across many saves")
+    parser.add_argument("saves", nargs="+", help="Save files, journals, SQLite save databases or directories of them")
+    parser.add_argument("--stories", default="stories", help="Directory containing story files")
+    parser.add_argument("--top", type=int, default=10, help="How many challenges and scenes to list")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    sources, stats = collect(args.saves, workers=args.workers)
+    report = build_report(stats, args.stories, args.top)
+    report["sources"] = sources
+    report["elapsed_s"] = round(time.perf_counter() - started, 3)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    return 1 if report["unreadable"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
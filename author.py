@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Challenge authoring tool for PyAdventure
+Runs the reference solution stored with each story challenge through the
+sandboxed validator, fills in expected outputs that are missing, and writes
+a manifest of verified challenges with output fingerprints
+
+The manifest is a verification record for authors and CI (which challenges
+passed, against which solution and outputs); the game does not load it.
+Submissions are compiled when they are made, and challenge data comes from
+the stories themselves.
+
+A challenge carries its reference solution inline or in a file next to the
+story:
+    "challenge": {
+        "prompt": "...",
+        "expected_output": "...",
+        "solution": "print('...')"          (or "solution_file": "answers/x.py")
+    }
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from challenges import ChallengeValidator, parameter_table
+from output_match import fingerprint
+from sandbox import SandboxPool
+from storage import atomic_write_json
+from story_loader import StoryLoader
+
+MANIFEST_VERSION = 1
+
+
+def iter_challenges(story_data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (scene ID, challenge) for every challenge scene in a story"""
+    for scene in story_data.get("scenes", []):
+        challenge = scene.get("challenge")
+        if scene.get("type") == "challenge" and isinstance(challenge, dict):
+            yield scene.get("id"), challenge
+
+
+def read_solution(challenge: Dict[str, Any], story_path: str) -> Optional[str]:
+    """A challenge's reference solution, or None if it has none"""
+    if "solution" in challenge:
+        return challenge["solution"]
+    if "solution_file" in challenge:
+        path = os.path.join(os.path.dirname(os.path.abspath(story_path)), challenge["solution_file"])
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    return None
+
+
+def challenge_fingerprints(challenge: Dict[str, Any]) -> Dict[str, Any]:
+    """Fingerprints of every expected output a challenge checks, for the manifest"""
+    fingerprints: Dict[str, Any] = {}
+    if challenge.get("expected_output") is not None:
+        fingerprints["expected_fingerprint"] = fingerprint(challenge["expected_output"])
+    if challenge.get("test_cases"):
+        fingerprints["test_cases"] = [
+            case.get("expected_fingerprint") or fingerprint(case.get("expected_output", ""))
+            for case in challenge["test_cases"]
+        ]
+    if challenge.get("parameters"):
+        parameters = challenge["parameters"]
+        fingerprints["parameters"] = list(parameters.get("expected_fingerprints") or
+                                          [fingerprint(expected) for expected in parameters.get("expected", [])])
+    return fingerprints
+
+
+class ChallengeAuthor:
+    """Verifies and completes story challenges against their reference solutions"""
+
+    def __init__(self, workers: int = None, wall_time: float = 2.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.sandbox = SandboxPool(workers=self.workers, wall_time=wall_time)
+        self.validator = ChallengeValidator(sandbox=self.sandbox)
+
+    def close(self):
+        """Shut down the sandbox workers"""
+        self.sandbox.close()
+
+    def fill(self, solution: str, challenge: Dict[str, Any]) -> List[str]:
+        """
+        Fill in the expected outputs a challenge is missing from its solution's output
+
+        Args:
+            solution: Reference solution source
+            challenge: Challenge dict, updated in place
+
+        Returns:
+            Names of the fields that were filled in
+
+        Raises:
+            ValueError: If the solution fails to run for a missing output
+        """
+        code = self.validator.compile_cache.compile(solution)
+        filled = []
+
+        parameters = challenge.get("parameters")
+        if parameters:
+            if "expected" not in parameters and "expected_fingerprints" not in parameters:
+                names = list(parameters.get("names", []))
+                outcomes = self.sandbox.run_many(code, [dict(zip(names, row)) for row in parameters.get("rows", [])])
+                parameters["expected"] = [self._output(outcome) for outcome in outcomes]
+                filled.append("parameters.expected")
+            return filled
+
+        test_cases = challenge.get("test_cases")
+        if test_cases:
+            missing = [case for case in test_cases
+                       if "expected_output" not in case and "expected_fingerprint" not in case]
+            if missing:
+                outcomes = self.sandbox.run_many(code, [case.get("inputs") for case in missing])
+                for case, outcome in zip(missing, outcomes):
+                    case["expected_output"] = self._output(outcome)
+                filled.append("test_cases.expected_output")
+            return filled
+
+        if "expected_output" not in challenge:
+            challenge["expected_output"] = self._output(self.sandbox.run(code))
+            filled.append("expected_output")
+        return filled
+
+    @staticmethod
+    def _output(outcome: Dict[str, Any]) -> str:
+        if outcome["status"] != "ok":
+            raise ValueError(f"reference solution {outcome['status']}: {outcome.get('error')}")
+        return outcome["output"]
+
+    def check(self, story_path: str, scene_id: str, challenge: Dict[str, Any], fill: bool = False) -> Dict[str, Any]:
+        """
+        Verify one challenge against its reference solution
+
+        Returns:
+            A manifest entry; its status is 'verified', 'failed', 'error' or
+            'no_solution'
+        """
+        started = time.perf_counter()
+        entry: Dict[str, Any] = {
+            "story": os.path.splitext(os.path.basename(story_path))[0],
+            "scene": scene_id,
+            "prompt": challenge.get("prompt")
+        }
+        try:
+            solution = read_solution(challenge, story_path)
+            if solution is None:
+                entry.update(status="no_solution", message="No reference solution")
+                return entry
+            entry["solution_sha256"] = hashlib.sha256(solution.encode("utf-8")).hexdigest()
+
+            if fill:
+                entry["filled"] = self.fill(solution, challenge)
+            if challenge.get("parameters"):
+                # Reject a malformed table up front rather than as a failed run
+                parameter_table(challenge["parameters"])
+
+            result = self.validator.validate_challenge(solution, challenge)
+            entry["status"] = "verified" if result["success"] else "failed"
+            entry["message"] = result["message"]
+            if not result["success"] and result.get("output") is not None:
+                entry["output"] = result["output"]
+            entry.update(challenge_fingerprints(challenge))
+        except (OSError, SyntaxError, ValueError) as e:
+            entry.update(status="error", message=str(e))
+        except Exception as e:
+            # A malformed challenge (e.g. a non-string solution) must not sink the whole run
+            entry.update(status="error", message=f"{type(e).__name__}: {e}")
+        finally:
+            entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return entry
+
+    def check_stories(self, story_paths: List[str], fill: bool = False) -> Dict[str, Any]:
+        """
+        Check every challenge in the given story files concurrently
+
+        Returns:
+            The manifest: entries in story order, per-status counts, and the
+            stories whose challenges were filled in (still to be written)
+        """
+        loader = StoryLoader()
+        stories = {path: loader.load(path) for path in story_paths}
+        jobs = [(path, scene_id, challenge) for path, story_data in stories.items()
+                for scene_id, challenge in iter_challenges(story_data)]
+
+        started = time.perf_counter()
+        self.sandbox.start()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            entries = list(executor.map(lambda job: self.check(*job, fill=fill), jobs))
+
+        counts: Dict[str, int] = {}
+        for entry in entries:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        changed = sorted({path for (path, _, _), entry in zip(jobs, entries) if entry.get("filled")})
+        return {
+            "version": MANIFEST_VERSION,
+            "generated_at": round(time.time(), 3),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+            "counts": counts,
+            "challenges": entries,
+            "filled_stories": {path: stories[path] for path in changed}
+        }
+
+
+def print_report(manifest: Dict[str, Any]):
+    """Print one line per challenge that needs attention, then the totals"""
+    for entry in manifest["challenges"]:
+        where = f"{entry['story']}:{entry['scene']}"
+        if entry["status"] in ("failed", "error"):
+            print(f"  ❌ {where}: {entry['message']}")
+            if entry.get("output") is not None:
+                print(f"     Solution output: {entry['output']!r}")
+        elif entry["status"] == "no_solution":
+            print(f"  ⚠️  {where}: no reference solution")
+        if entry.get("filled"):
+            print(f"  ✏️  {where}: filled in {', '.join(entry['filled'])}")
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(manifest["counts"].items()))
+    print(f"{len(manifest['challenges'])} challenges in {manifest['elapsed_s']}s: {counts or 'none'}")
+
+
+def main(argv=None) -> int:
+    """Command-line entry point; exits non-zero when a reference solution fails or errors"""
+    parser = argparse.ArgumentParser(description="Verify PyAdventure challenges against their reference solutions")
+    parser.add_argument("stories", nargs="+", help="Story JSON files")
+    parser.add_argument("-m", "--manifest", default="challenge_manifest.json",
+                        help="Where to write the manifest of checked challenges "
+                             "(a verification record; the game does not read it)")
+    parser.add_argument("--fill", action="store_true",
+                        help="Fill in missing expected outputs from the solutions and rewrite the story files "
+                             "(comments in them are not kept)")
+    parser.add_argument("--strict", action="store_true", help="Also fail on challenges with no reference solution")
+    parser.add_argument("--workers", type=int, default=None, help="Number of sandbox workers")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Wall-clock limit per solution run in seconds")
+    args = parser.parse_args(argv)
+
+    author = ChallengeAuthor(workers=args.workers, wall_time=args.timeout)
+    try:
+        manifest = author.check_stories(args.stories, fill=args.fill)
+    finally:
+        author.close()
+
+    filled_stories = manifest.pop("filled_stories")
+    for path, story_data in filled_stories.items():
+        atomic_write_json(path, story_data, ensure_ascii=False)
+        print(f"Updated {path}")
+
+    atomic_write_json(args.manifest, manifest)
+    print_report(manifest)
+    print(f"Manifest written to {args.manifest}")
+
+    counts = manifest["counts"]
+    if counts.get("failed") or counts.get("error") or (args.strict and counts.get("no_solution")):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for PyAdventure
+Compares the memory and lookup cost of scene and player representations:
+plain JSON dicts, frozen mappings and slotted scene records for stories, and
+lists versus set-backed collections for player progress
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, Any, List
+
+from scenes import Scene
+from story_loader import StoryLoader, freeze, thaw
+
+
+# How each representation is built from a story's parsed scene list
+SCENE_REPRESENTATIONS: Dict[str, Callable[[List[Dict[str, Any]]], List[Any]]] = {
+    "dict": thaw,
+    "frozen_mapping": freeze,
+    "slotted_record": lambda scenes: [Scene(scene) for scene in scenes]
+}
+
+
+def allocated(build: Callable[[], Any]) -> int:
+    """Bytes still allocated by build()'s result once it returns"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return after - before
+
+
+def per_call_ns(statement: Callable[[], Any], number: int) -> float:
+    """Best-of-five time for one call, in nanoseconds"""
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+
+def bench_scenes(story_paths: List[str], copies: int = 100) -> Dict[str, Any]:
+    """Memory per scene and read cost for each scene representation, over copies of every story"""
+    loader = StoryLoader()
+    scenes: List[Dict[str, Any]] = []
+    for path in story_paths:
+        scenes.extend(loader.load(path).get("scenes", []))
+    if not scenes:
+        raise ValueError("no scenes to measure")
+
+    results = {}
+    for name, build in SCENE_REPRESENTATIONS.items():
+        # Separate copies stand in for stories loaded by separate sessions
+        size = allocated(lambda: [build(scenes) for _ in range(copies)])
+        sample = build(scenes)
+
+        def read():
+            for scene in sample:
+                scene.get("title")
+                scene.get("type", "choice")
+                scene.get("choices", ())
+
+        results[name] = {
+            "bytes_per_scene": round(size / (copies * len(scenes)), 1),
+            "read_ns_per_scene": round(per_call_ns(read, 200) / len(sample), 1)
+        }
+
+    baseline = results["dict"]["bytes_per_scene"]
+    for result in results.values():
+        result["vs_dict"] = round(result["bytes_per_scene"] / baseline, 2)
+    return {"scenes": len(scenes), "copies": copies, "representations": results}
+
+
+def bench_collections(sizes: List[int]) -> Dict[str, Any]:
+    """Memory and membership-check cost of a list versus an insertion-ordered dict of challenge IDs"""
+    results = {}
+    for size in sizes:
+        ids = [f"challenge_{i}" for i in range(size)]
+        missing = "challenge_missing"
+        as_list = list(ids)
+        as_set = dict.fromkeys(ids)
+        number = max(1000, 200000 // max(size, 1))
+        results[str(size)] = {
+            "list": {
+                "bytes": allocated(lambda: list(ids)),
+                "lookup_ns": round(per_call_ns(lambda: missing in as_list, number), 1)
+            },
+            "ordered_set": {
+                "bytes": allocated(lambda: dict.fromkeys(ids)),
+                "lookup_ns": round(per_call_ns(lambda: missing in as_set, number), 1)
+            }
+        }
+    return results
+
+
+def run(stories_dir: str = "stories", copies: int = 100, sizes: List[int] = None) -> Dict[str, Any]:
+    """Run both benchmarks"""
+    story_paths = sorted(glob.glob(os.path.join(stories_dir, "*.json")))
+    started = time.perf_counter()
+    report = {
+        "stories": [os.path.basename(path) for path in story_paths],
+        "scenes": bench_scenes(story_paths, copies),
+        "player_collections": bench_collections(sizes or [10, 100, 1000])
+    }
+    report["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def main(argv=None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Compare PyAdventure scene and player representations")
+    parser.add_argument("--stories", default="stories", help="Directory containing story files")
+    parser.add_argument("--copies", type=int, default=100, help="Story copies to build per representation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Completed-challenge counts to compare collections at")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run(args.stories, args.copies, args.sizes), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for PyAdventure
+Launches the game as a fresh process and measures the time until it first
+asks the player for input, so startup regressions show up in CI
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Optional
+
+
+GAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game.py")
+
+# Every prompt the game can open with
+PROMPTS = (b"Enter your choice (number): ", b"Press Enter to continue...", b"> ")
+
+
+# Extra game arguments for each save backend
+SAVE_MODES = {
+    "json": [],
+    "journal": ["--journal", "player_journal.jsonl"],
+    "save-db": ["--save-db", "pyadventure.db"]
+}
+
+
+def time_to_first_prompt(workdir: str, timeout: float = 30.0, game_args: List[str] = ()) -> float:
+    """Start one game process in workdir and return seconds until its first prompt"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", GAME, *game_args],
+        cwd=workdir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    output = b""
+    try:
+        while True:
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("game exited before prompting:\n" + output.decode("utf-8", "replace")[-500:])
+            output += chunk
+            if output.rstrip(b"\n").endswith(PROMPTS):
+                return time.perf_counter() - started
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"no prompt within {timeout:g}s")
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+        process.stdin.close()
+
+
+def interpreter_startup(workdir: str) -> float:
+    """Seconds for a bare interpreter to start and exit, for comparison"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=workdir, check=True)
+    return time.perf_counter() - started
+
+
+def run(runs: int = 10, stories_dir: str = "stories", save_file: Optional[str] = None,
+        save_mode: str = "json") -> Dict[str, Any]:
+    """Measure startup over several runs in a scratch directory"""
+    game_args = SAVE_MODES[save_mode]
+    workdir = tempfile.mkdtemp(prefix="pyadventure-bench-")
+    try:
+        shutil.copytree(stories_dir, os.path.join(workdir, "stories"),
+                        ignore=shutil.ignore_patterns(".cache"))
+        if save_file:
+            shutil.copy(save_file, os.path.join(workdir, "player_save.json"))
+
+        # One untimed run warms the OS file cache and the story parse cache
+        time_to_first_prompt(workdir, game_args=game_args)
+        samples = [time_to_first_prompt(workdir, game_args=game_args) for _ in range(runs)]
+        baseline = min(interpreter_startup(workdir) for _ in range(3))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "runs": runs,
+        "save_mode": save_mode,
+        "first_prompt_ms": {
+            "min": round(min(samples) * 1000, 1),
+            "median": round(statistics.median(samples) * 1000, 1),
+            "max": round(max(samples) * 1000, 1)
+        },
+        "interpreter_ms": round(baseline * 1000, 1),
+        "game_overhead_ms": round((statistics.median(samples) - baseline) * 1000, 1)
+    }
+
+
+def main(argv=None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Measure PyAdventure's time to first prompt")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Number of timed launches")
+    parser.add_argument("--stories", default="stories", help="Directory containing story files")
+    parser.add_argument("--save", help="JSON save file to start from (default: a new player)")
+    parser.add_argument("--save-mode", choices=sorted(SAVE_MODES), default="json",
+                        help="Save backend the game is launched with")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Exit non-zero if the median time to first prompt exceeds this")
+    args = parser.parse_args(argv)
+
+    report = run(args.runs, args.stories, args.save, args.save_mode)
+    print(json.dumps(report, indent=2))
+
+    median = report["first_prompt_ms"]["median"]
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"Median time to first prompt {median}ms exceeds {args.max_ms}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
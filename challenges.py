@@ -4,50 +4,274 @@ Challenge validation module for PyAdventure
 Handles code execution, validation, and feedback for Python challenges
 """
 
-import sys
-import io
-import contextlib
-from typing import Dict, Any, List
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+
+from metrics import METRICS
+from output_match import (
+    Expectation, Mismatch, OutputCapture, OutputMismatch, capture_help, capture_print, describe_expectation,
+    expectation_for, location, make_matcher, parse_fingerprint
+)
+from story_loader import thaw
+
+
+# Builtins exposed to submitted code, shared by in-process and sandboxed execution
+SAFE_BUILTINS = {
+    'print': print,
+    'len': len,
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    'set': set,
+    'range': range,
+    'enumerate': enumerate,
+    'zip': zip,
+    'map': map,
+    'filter': filter,
+    'sorted': sorted,
+    'sum': sum,
+    'max': max,
+    'min': min,
+    'abs': abs,
+    'round': round,
+    'type': type,
+    'isinstance': isinstance,
+    'hasattr': hasattr,
+    'getattr': getattr,
+    'setattr': setattr,
+    'dir': dir,
+    'help': help,
+}
+
+# Hint for each kind of challenge; the keys are the topics challenges are scheduled by
+HINTS = {
+    "variable": "Remember to use the assignment operator (=) to create a variable",
+    "print": "Use the print() function to display output",
+    "string": "Strings are created with quotes, like 'Hello' or \"Hello\"",
+    "number": "Numbers don't need quotes. Use int() for integers, float() for decimals",
+    "list": "Lists are created with square brackets: [1, 2, 3]",
+    "function": "Functions are defined with 'def function_name():' followed by indented code",
+    "loop": "Use 'for' loops to repeat code: 'for i in range(5):'",
+    "conditional": "Use 'if' statements to make decisions: 'if condition:'"
+}
+
+
+def execution_globals(sink, inputs: Union[Dict[str, Any], Iterable[Tuple[str, Any]]] = None,
+                      builtins: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Globals for one run of a submission, with print() and help() writing to sink
+    
+    Nothing touches sys.stdout, so runs in different threads keep their
+    output apart.
+    
+    Args:
+        sink: Where output goes: an output matcher or an OutputCapture
+        inputs: Variables to predefine, as a dict or (name, value) pairs
+        builtins: A builtins dict to reset and reuse instead of copying a new one
+    """
+    if builtins is None:
+        builtins = dict(SAFE_BUILTINS)
+    else:
+        builtins.clear()
+        builtins.update(SAFE_BUILTINS)
+    builtins['print'] = capture_print(sink.write)
+    builtins['help'] = capture_help(sink.write)
+    env = {'__builtins__': builtins}
+    if inputs:
+        env.update(inputs)
+    return env
+
+
+def parameter_table(parameters: Dict[str, Any]) -> Tuple[List[str], List[List[Any]], List[Expectation]]:
+    """
+    Read a challenge's parameter table, raising ValueError if it is malformed
+    
+    The table names its inputs once and gives one row of values and one
+    expected output per case:
+    
+        "parameters": {
+            "names": ["a", "b"],
+            "rows": [[1, 2], [3, 4]],
+            "expected": ["3", "7"]
+        }
+    
+    "expected_fingerprints" may replace "expected".
+    """
+    names = list(parameters.get("names", []))
+    rows = [thaw(row) for row in parameters.get("rows", [])]
+    if not all(isinstance(name, str) for name in names):
+        raise ValueError("'names' must be a list of strings")
+    if not rows:
+        raise ValueError("'rows' must list at least one case")
+    for i, row in enumerate(rows):
+        if not isinstance(row, list) or len(row) != len(names):
+            raise ValueError(f"row {i+1} must have one value per name ({len(names)})")
+    
+    if "expected_fingerprints" in parameters:
+        expected_list = [parse_fingerprint(value) for value in parameters["expected_fingerprints"]]
+    else:
+        expected_list = list(parameters.get("expected", []))
+    if len(expected_list) != len(rows):
+        raise ValueError(f"expected {len(rows)} expected outputs, one per row, got {len(expected_list)}")
+    return names, rows, expected_list
+
+
+def run_parameter_table(code: CodeType, names: List[str], rows: List[List[Any]],
+                        expected_list: List[Expectation]) -> List[Dict[str, Any]]:
+    """
+    Run compiled code once per row of a parameter table
+    
+    One builtins dict is reused for every row, reset between rows, and each
+    row gets fresh globals, so cases cannot see each other's variables or
+    output. Rows must be
+    private to this run (as parameter_table's thawed copies are), since
+    submissions may mutate their inputs.
+    
+    Returns:
+        One outcome per row, shaped like a sandbox outcome
+    """
+    builtins: Dict[str, Any] = {}
+    outcomes = []
+    for row, expected in zip(rows, expected_list):
+        matcher = make_matcher(expected)
+        env = execution_globals(matcher, zip(names, row), builtins)
+        try:
+            exec(code, env)
+        except OutputMismatch:
+            pass
+        except MemoryError:
+            outcomes.append({"status": "error", "output": None, "error": "Memory limit exceeded", "mismatch": None})
+            continue
+        except Exception as e:
+            outcomes.append({"status": "error", "output": None, "error": str(e), "mismatch": None})
+            continue
+        finally:
+            env.clear()
+        outcomes.append({"status": "ok", "output": matcher.output, "error": None, "mismatch": matcher.finish()})
+    return outcomes
+
+
+class CompileCache:
+    """Bounded LRU cache mapping normalized submission source to compiled code"""
+    
+    def __init__(self, maxsize: int = 256, error_maxsize: int = 128):
+        self.maxsize = maxsize
+        self.error_maxsize = error_maxsize
+        self._code: "OrderedDict[str, CodeType]" = OrderedDict()
+        self._errors: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.error_hits = 0
+        self.error_misses = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def normalize(source: str) -> str:
+        """Normalize line endings and trailing whitespace so near-identical submissions share an entry"""
+        source = source.replace("\r\n", "\n").replace("\r", "\n")
+        if '"""' in source or "'''" in source:
+            # Trailing whitespace may be significant inside multi-line strings
+            return source.rstrip()
+        return "\n".join(line.rstrip() for line in source.split("\n")).rstrip()
+    
+    def compile(self, source: str) -> CodeType:
+        """Return the code object for source, compiling it at most once; raises SyntaxError"""
+        key = self.normalize(source)
+        
+        with self._lock:
+            code = self._code.get(key)
+            if code is not None:
+                self._code.move_to_end(key)
+                self.hits += 1
+                return code
+            
+            error_args = self._errors.get(key)
+            if error_args is not None:
+                self._errors.move_to_end(key)
+                self.error_hits += 1
+                raise SyntaxError(*error_args)
+        
+        try:
+            code = compile(key, "<string>", "exec")
+        except SyntaxError as e:
+            with self._lock:
+                self.error_misses += 1
+                self._errors[key] = e.args
+                if len(self._errors) > self.error_maxsize:
+                    self._errors.popitem(last=False)
+            raise
+        
+        with self._lock:
+            self.misses += 1
+            self._code[key] = code
+            if len(self._code) > self.maxsize:
+                self._code.popitem(last=False)
+        return code
+    
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current sizes"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "error_hits": self.error_hits,
+            "error_misses": self.error_misses,
+            "size": len(self._code),
+            "error_size": len(self._errors)
+        }
+    
+    def clear(self):
+        """Drop all cached entries, keeping the counters"""
+        with self._lock:
+            self._code.clear()
+            self._errors.clear()
 
 
 class ChallengeValidator:
     """Validates Python code challenges"""
     
-    def __init__(self):
-        self.safe_globals = {
-            '__builtins__': {
-                'print': print,
-                'len': len,
-                'str': str,
-                'int': int,
-                'float': float,
-                'bool': bool,
-                'list': list,
-                'dict': dict,
-                'tuple': tuple,
-                'set': set,
-                'range': range,
-                'enumerate': enumerate,
-                'zip': zip,
-                'map': map,
-                'filter': filter,
-                'sorted': sorted,
-                'sum': sum,
-                'max': max,
-                'min': min,
-                'abs': abs,
-                'round': round,
-                'type': type,
-                'isinstance': isinstance,
-                'hasattr': hasattr,
-                'getattr': getattr,
-                'setattr': setattr,
-                'dir': dir,
-                'help': help,
-            }
-        }
+    def __init__(self, sandbox=None, compile_cache: CompileCache = None, scheduler=None):
+        """
+        Args:
+            sandbox: Optional SandboxPool; when given, submissions run in its
+                worker processes instead of in the game process
+            compile_cache: Optional CompileCache to share between validators
+            scheduler: Optional scheduler.ChallengeScheduler for practice
+                challenges; one over the default bank is built on first use
+        """
+        self.sandbox = sandbox
+        self.compile_cache = compile_cache or CompileCache()
+        self._scheduler = scheduler
+    
+    @property
+    def scheduler(self):
+        """The adaptive challenge scheduler, built (with its bank) on first use"""
+        if self._scheduler is None:
+            from scheduler import ChallengeScheduler
+            self._scheduler = ChallengeScheduler()
+        return self._scheduler
+    
+    def warm_up(self):
+        """Start sandbox workers ahead of the first submission"""
+        if self.sandbox is not None:
+            self.sandbox.start()
     
-    def validate_code(self, user_code: str, expected_output: str = None, test_cases: List[Dict] = None) -> Dict[str, Any]:
+    def validate_challenge(self, user_code: str, challenge: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a submission against everything a challenge checks"""
+        return self.validate_code(
+            user_code,
+            challenge.get("expected_output"),
+            challenge.get("test_cases", []),
+            challenge.get("parameters")
+        )
+    
+    def validate_code(self, user_code: str, expected_output: str = None, test_cases: List[Dict] = None,
+                      parameters: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Validate user-submitted Python code
         
@@ -55,10 +279,22 @@ class ChallengeValidator:
             user_code: The code submitted by the user
             expected_output: Expected output when code is run
             test_cases: List of test cases with inputs and expected outputs
+            parameters: Parameter table (see parameter_table) run as one batch
             
         Returns:
-            Dict with success status, message, and output
+            Dict with success status, message, and output; parameterized
+            challenges also get 'cases', a per-row list of results
         """
+        with METRICS.timed("challenge_validate_seconds"):
+            result = self._validate(user_code, expected_output, test_cases, parameters)
+        METRICS.incr("challenge_submissions_total")
+        if result["success"]:
+            METRICS.incr("challenge_passed_total")
+        return result
+    
+    def _validate(self, user_code: str, expected_output: str = None, test_cases: List[Dict] = None,
+                  parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Compile and run a submission, then check it; validate_code without the instrumentation"""
         if not user_code.strip():
             return {
                 "success": False,
@@ -66,34 +302,45 @@ class ChallengeValidator:
                 "output": None
             }
         
-        # Capture stdout
-        output_buffer = io.StringIO()
+        try:
+            code = self.compile_cache.compile(user_code)
+        except SyntaxError as e:
+            return {
+                "success": False,
+                "message": f"Syntax error: {e}",
+                "output": None
+            }
+        
+        if parameters:
+            return self._validate_parameters(code, parameters)
+        
+        if self.sandbox is not None:
+            return self._validate_in_sandbox(code, expected_output, test_cases)
+        
+        # Capture output, comparing it as it is printed when the output is known
+        if expected_output is not None:
+            output_buffer = make_matcher(expected_output)
+        else:
+            output_buffer = OutputCapture()
         
         try:
             # Execute code in safe environment
-            with contextlib.redirect_stdout(output_buffer):
-                exec(user_code, self.safe_globals.copy())
-            
-            actual_output = output_buffer.getvalue().strip()
+            with METRICS.timed("challenge_exec_seconds"):
+                try:
+                    exec(code, execution_globals(output_buffer))
+                except OutputMismatch:
+                    METRICS.incr("challenge_output_aborts_total")
             
             # If we have expected output, check it
             if expected_output is not None:
-                if actual_output == expected_output:
-                    return {
-                        "success": True,
-                        "message": "Great job! Your code produces the correct output.",
-                        "output": actual_output
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "message": f"Output doesn't match. Expected: '{expected_output}', Got: '{actual_output}'",
-                        "output": actual_output
-                    }
+                return self._output_result(expected_output, output_buffer.output, output_buffer.finish())
+            
+            actual_output = output_buffer.output
             
             # If we have test cases, run them
             if test_cases:
-                return self._run_test_cases(user_code, test_cases)
+                with METRICS.timed("challenge_test_cases_seconds"):
+                    return self._run_test_cases(code, test_cases)
             
             # If no specific validation, just check that code runs
             return {
@@ -102,12 +349,6 @@ class ChallengeValidator:
                 "output": actual_output
             }
             
-        except SyntaxError as e:
-            return {
-                "success": False,
-                "message": f"Syntax error: {e}",
-                "output": None
-            }
         except Exception as e:
             return {
                 "success": False,
@@ -115,37 +356,46 @@ class ChallengeValidator:
                 "output": None
             }
     
-    def _run_test_cases(self, user_code: str, test_cases: List[Dict]) -> Dict[str, Any]:
+    def _output_result(self, expected_output: Expectation, actual_output: str, mismatch: Mismatch = None) -> Dict[str, Any]:
+        """Report whether output matched the expected output"""
+        if mismatch is None:
+            return {
+                "success": True,
+                "message": "Great job! Your code produces the correct output.",
+                "output": actual_output
+            }
+        return {
+            "success": False,
+            "message": f"Output doesn't match{location(mismatch)}. "
+                       f"Expected: '{describe_expectation(expected_output)}', Got: '{actual_output}'",
+            "output": actual_output
+        }
+    
+    def _run_test_cases(self, code: CodeType, test_cases: List[Dict]) -> Dict[str, Any]:
         """Run a series of test cases against the user's code"""
         passed = 0
         total = len(test_cases)
         
         for i, test_case in enumerate(test_cases):
-            # Prepare test environment
-            test_globals = self.safe_globals.copy()
-            
-            # Set up inputs if provided
-            if "inputs" in test_case:
-                for var_name, value in test_case["inputs"].items():
-                    test_globals[var_name] = value
-            
-            # Capture output
-            output_buffer = io.StringIO()
-            
             try:
-                with contextlib.redirect_stdout(output_buffer):
-                    exec(user_code, test_globals)
+                # Compare output as it is printed
+                expected_output = expectation_for(test_case)
+                output_buffer = make_matcher(expected_output)
+                test_globals = execution_globals(output_buffer, thaw(test_case.get("inputs")))
+                try:
+                    exec(code, test_globals)
+                except OutputMismatch:
+                    METRICS.incr("challenge_output_aborts_total")
                 
-                actual_output = output_buffer.getvalue().strip()
-                expected_output = test_case.get("expected_output", "")
-                
-                if actual_output == expected_output:
+                mismatch = output_buffer.finish()
+                if mismatch is None:
                     passed += 1
                 else:
                     return {
                         "success": False,
-                        "message": f"Test case {i+1} failed. Expected: '{expected_output}', Got: '{actual_output}'",
-                        "output": actual_output
+                        "message": f"Test case {i+1} failed{location(mismatch)}. "
+                                   f"Expected: '{describe_expectation(expected_output)}', Got: '{output_buffer.output}'",
+                        "output": output_buffer.output
                     }
                     
             except Exception as e:
@@ -161,23 +411,141 @@ class ChallengeValidator:
             "output": f"{passed}/{total} tests passed"
         }
     
-    def get_hint(self, challenge_type: str) -> str:
-        """Get a hint for a specific type of challenge"""
-        hints = {
-            "variable": "Remember to use the assignment operator (=) to create a variable",
-            "print": "Use the print() function to display output",
-            "string": "Strings are created with quotes, like 'Hello' or \"Hello\"",
-            "number": "Numbers don't need quotes. Use int() for integers, float() for decimals",
-            "list": "Lists are created with square brackets: [1, 2, 3]",
-            "function": "Functions are defined with 'def function_name():' followed by indented code",
-            "loop": "Use 'for' loops to repeat code: 'for i in range(5):'",
-            "conditional": "Use 'if' statements to make decisions: 'if condition:'"
+    def _validate_in_sandbox(self, code: CodeType, expected_output: str = None, test_cases: List[Dict] = None) -> Dict[str, Any]:
+        """Validate code through the sandbox pool, producing the same results as in-process validation"""
+        with METRICS.timed("challenge_exec_seconds"):
+            outcome = self.sandbox.run(code, expected=expected_output)
+        
+        if outcome["status"] != "ok":
+            return {
+                "success": False,
+                "message": f"Runtime error: {outcome['error']}",
+                "output": None
+            }
+        
+        actual_output = outcome["output"]
+        
+        if expected_output is not None:
+            return self._output_result(expected_output, actual_output, outcome["mismatch"])
+        
+        if test_cases:
+            with METRICS.timed("challenge_test_cases_seconds"):
+                outcomes = self.sandbox.run_many(
+                    code,
+                    [test_case.get("inputs") for test_case in test_cases],
+                    [expectation_for(test_case) for test_case in test_cases]
+                )
+            return self._summarize_test_outcomes(test_cases, outcomes)
+        
+        return {
+            "success": True,
+            "message": "Code executed successfully!",
+            "output": actual_output
         }
+    
+    def _validate_parameters(self, code: CodeType, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a parameter table as one batch, in a sandbox worker when there is a pool"""
+        try:
+            names, rows, expected_list = parameter_table(parameters)
+        except (ValueError, TypeError) as e:
+            return {
+                "success": False,
+                "message": f"Invalid parameter table: {e}",
+                "output": None
+            }
         
-        return hints.get(challenge_type, "Think about what the code is trying to accomplish")
+        with METRICS.timed("challenge_test_cases_seconds"):
+            if self.sandbox is None:
+                outcomes = run_parameter_table(code, names, rows, expected_list)
+            else:
+                outcome = self.sandbox.run_table(code, names, rows, expected_list)
+                if outcome["status"] != "ok":
+                    return {
+                        "success": False,
+                        "message": f"Runtime error: {outcome['error']}",
+                        "output": None
+                    }
+                outcomes = outcome["cases"]
+        
+        cases = []
+        failures = []
+        for i, (row, expected, outcome) in enumerate(zip(rows, expected_list, outcomes)):
+            message = None
+            if outcome["status"] != "ok" or outcome["mismatch"] is not None:
+                inputs = ", ".join(f"{name}={value!r}" for name, value in zip(names, row))
+                if outcome["status"] != "ok":
+                    message = f"Case {i+1} ({inputs}) failed with error: {outcome['error']}"
+                else:
+                    message = (f"Case {i+1} ({inputs}) failed{location(outcome['mismatch'])}. "
+                               f"Expected: '{describe_expectation(expected)}', Got: '{outcome['output']}'")
+            cases.append({"passed": message is None, "output": outcome["output"], "message": message})
+            if message is not None:
+                failures.append(message)
+        
+        total = len(cases)
+        passed = total - len(failures)
+        if failures:
+            message = f"{passed}/{total} cases passed. " + failures[0]
+            if len(failures) > 1:
+                message += f" (and {len(failures) - 1} more)"
+        else:
+            message = f"All {total} cases passed!"
+        return {
+            "success": not failures,
+            "message": message,
+            "output": f"{passed}/{total} tests passed",
+            "cases": cases
+        }
     
-    def create_challenge(self, challenge_type: str, difficulty: str = "beginner") -> Dict[str, Any]:
-        """Create a new challenge of a specific type"""
+    def _summarize_test_outcomes(self, test_cases: List[Dict], outcomes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Turn per-case sandbox outcomes into a single result, reporting the first failure"""
+        total = len(test_cases)
+        
+        for i, (test_case, outcome) in enumerate(zip(test_cases, outcomes)):
+            if outcome["status"] != "ok":
+                return {
+                    "success": False,
+                    "message": f"Test case {i+1} failed with error: {outcome['error']}",
+                    "output": None
+                }
+            
+            if outcome["mismatch"] is not None:
+                expected_output = describe_expectation(expectation_for(test_case))
+                return {
+                    "success": False,
+                    "message": f"Test case {i+1} failed{location(outcome['mismatch'])}. "
+                               f"Expected: '{expected_output}', Got: '{outcome['output']}'",
+                    "output": outcome["output"]
+                }
+        
+        return {
+            "success": True,
+            "message": f"All {total} test cases passed!",
+            "output": f"{total}/{total} tests passed"
+        }
+    
+    def get_hint(self, challenge_type: str) -> str:
+        """Get a hint for a specific type of challenge"""
+        return HINTS.get(challenge_type, "Think about what the code is trying to accomplish")
+    
+    def create_challenge(self, challenge_type: str = None, difficulty: str = "beginner",
+                         player=None) -> Dict[str, Any]:
+        """
+        Create a new challenge of a specific type
+        
+        With a player, the challenge is picked by the adaptive scheduler at
+        the difficulty the player is ready for, from the given topic (a HINTS
+        category) or from the player's weakest one; pass its result back
+        through record_practice(). Without a player, or once the player has
+        passed every challenge of the topic, a fixed beginner challenge is
+        returned.
+        """
+        if player is not None:
+            topic = "number" if challenge_type == "math" else challenge_type
+            challenge = self.scheduler.next_challenge(player, topic if topic in HINTS else None)
+            if challenge is not None:
+                return challenge
+        
         challenges = {
             "variable": {
                 "prompt": "Create a variable called 'name' and set it to your name",
@@ -196,4 +564,15 @@ class ChallengeValidator:
             }
         }
         
-        return challenges.get(challenge_type, challenges["print"])
\ No newline at end of file
+        return challenges.get(challenge_type, challenges["print"])
+    
+    def record_practice(self, player, challenge: Dict[str, Any], passed: bool) -> Optional[int]:
+        """
+        Update the player's mastery after a scheduled challenge
+        
+        Returns:
+            The topic's new rating, or None for challenges the scheduler didn't pick
+        """
+        if "topic" not in challenge or "difficulty" not in challenge:
+            return None
+        return self.scheduler.record_result(player, challenge, passed)
\ No newline at end of file
@@ -6,120 +6,314 @@ Main game engine and interface
 
 import sys
 import os
-from typing import Dict, Any
-from story import StoryManager
-from player import Player
-from challenges import ChallengeValidator
+import argparse
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional
+from gameio import ConsoleIO
+from metrics import METRICS
+from renderer import SceneRenderer
+
+if TYPE_CHECKING:
+    from story import StoryManager
+    from player import Player
+    from challenges import ChallengeValidator
 
 
 class PyAdventureGame:
-    def __init__(self):
-        self.player = Player()
-        self.story_manager = StoryManager()
-        self.challenge_validator = ChallengeValidator()
+    def __init__(self, player: "Player" = None, io=None, story_manager: "StoryManager" = None,
+                 challenge_validator: "ChallengeValidator" = None, renderer: SceneRenderer = None,
+                 save_backend: Callable[[], Any] = None):
+        """
+        Args:
+            save_backend: Called with no arguments to open the player's save
+                backend when no player is given; defaults to the JSON save
+        """
+        # Subsystems not passed in are imported and built on first use, so
+        # the banner appears before any save, story or sandbox work happens
+        self.io = io or ConsoleIO()
+        self.renderer = renderer or SceneRenderer()
+        self._player = player
+        self._save_backend = save_backend
+        self._story_manager = story_manager
+        self._challenge_validator = challenge_validator
         self.running = True
+    
+    @property
+    def player(self) -> "Player":
+        """The player, loaded from the default save on first use"""
+        return self._load_player()
+    
+    @player.setter
+    def player(self, player: "Player"):
+        self._player = player
+    
+    def _load_player(self) -> "Player":
+        """Load the player from its save, unless one was given or already loaded"""
+        if self._player is None:
+            from player import Player
+            backend = self._save_backend() if self._save_backend is not None else None
+            self._player = Player(backend=backend, notify=self.io.write)
+        return self._player
+    
+    @property
+    def story_manager(self) -> "StoryManager":
+        """The story manager, created on first use"""
+        if self._story_manager is None:
+            from story import StoryManager
+            self._story_manager = StoryManager()
+        return self._story_manager
+    
+    @story_manager.setter
+    def story_manager(self, story_manager: "StoryManager"):
+        self._story_manager = story_manager
+    
+    @property
+    def challenge_validator(self) -> "ChallengeValidator":
+        """The sandboxed validator, created when the first challenge is shown"""
+        if self._challenge_validator is None:
+            from challenges import ChallengeValidator
+            from sandbox import SandboxPool
+            self._challenge_validator = ChallengeValidator(sandbox=SandboxPool())
+        return self._challenge_validator
+    
+    @challenge_validator.setter
+    def challenge_validator(self, challenge_validator: "ChallengeValidator"):
+        self._challenge_validator = challenge_validator
         
     def start(self):
         """Start the game"""
         self.print_banner()
-        self.story_manager.load_story("intro")
+        self.io.flush()
+        # Load the save now so its message comes before the first scene
+        self._load_player()
+        self.resume()
+        
+        try:
+            while self.running:
+                try:
+                    self.game_loop()
+                except KeyboardInterrupt:
+                    self.quit_game()
+                except Exception as e:
+                    self.io.write(f"\nUnexpected error: {e}")
+                    self.quit_game()
+        finally:
+            # Output is sent with each prompt; the last turn's has no prompt
+            self.io.flush()
+    
+    def resume(self, story_name: str = None):
+        """
+        Load a story and continue from the player's saved scene in it
+        
+        Args:
+            story_name: Story to play; defaults to the player's saved story
+        """
+        saved_story = self.player.current_story
+        if story_name is None:
+            story_name = saved_story if saved_story and self.story_manager.has_story(saved_story) else "intro"
+        self.story_manager.load_story(story_name)
+        
+        saved_scene = self.player.current_scene
+        if story_name != saved_story or saved_scene in (None, 0) or not self.story_manager.resume(saved_scene):
+            return
+        scene = self.story_manager.get_current_scene()
+        if scene.get("type") == "ending":
+            # A finished story starts over
+            self.story_manager.resume(0)
+            return
+        self.io.write(f"▶ Resuming at: {scene.get('title', 'Unknown Scene')}")
+    
+    def record_progress(self):
+        """
+        Note the current story and scene ID for the next save
         
-        while self.running:
-            try:
-                self.game_loop()
-            except KeyboardInterrupt:
-                self.quit_game()
-            except Exception as e:
-                print(f"\nUnexpected error: {e}")
-                self.quit_game()
+        Unchanged progress costs nothing, and changes are written by the
+        player's write-behind saver rather than by a save every turn.
+        """
+        scene_id = self.story_manager.get_current_scene_id()
+        if scene_id is not None:
+            self.player.set_story_progress(self.story_manager.current_story, scene_id)
+    
+    def go_back(self) -> bool:
+        """Handle 'back': return to the previous scene; False if there is none"""
+        if self.story_manager.go_back():
+            return True
+        self.io.write("There is no previous scene to go back to.")
+        return False
     
     def game_loop(self):
         """Main game loop"""
-        current_scene = self.story_manager.get_current_scene()
-        
-        if not current_scene:
-            print("Game completed! Thanks for playing PyAdventure!")
-            self.running = False
+        current_scene = self.begin_turn()
+        if current_scene is None:
             return
-            
-        self.display_scene(current_scene)
         
         if current_scene.get("type") == "challenge":
             self.handle_challenge(current_scene)
         else:
             self.handle_choice(current_scene)
     
+    def begin_turn(self) -> Optional[Dict[str, Any]]:
+        """Display the current scene; returns it if it needs player input, None if the game is over"""
+        current_scene = self.story_manager.get_current_scene()
+        
+        if not current_scene:
+            self.io.write("Game completed! Thanks for playing PyAdventure!")
+            self.running = False
+            return None
+        
+        self.record_progress()
+        self.display_scene(current_scene)
+        
+        if current_scene.get("type") == "ending":
+            # Endings finish the story rather than falling through to the next scene
+            self.io.write("\nGame completed! Thanks for playing PyAdventure!")
+            # Save point: the story is finished
+            self.player.flush()
+            self.running = False
+            return None
+        
+        return current_scene
+    
     def display_scene(self, scene: Dict[str, Any]):
         """Display the current scene"""
-        print("\n" + "="*50)
-        print(scene.get("title", "Unknown Scene"))
-        print("="*50)
-        print(scene.get("description", ""))
-        
-        if scene.get("code_example"):
-            print(f"\nCode Example:\n{scene['code_example']}")
+        with METRICS.timed("scene_render_seconds"):
+            # Rendered once per scene and width; revisits reuse the text
+            self.io.write(self.renderer.scene(scene))
+        METRICS.incr("scenes_displayed_total")
     
     def handle_challenge(self, scene: Dict[str, Any]):
         """Handle Python coding challenges"""
+        challenge = self.show_challenge(scene)
+        
+        while True:
+            self.io.write("\nEnter your Python code (type 'quit' to exit, 'hint' for help, 'back' to go back):")
+            user_input = self.io.read("> ")
+            
+            done = self.challenge_command(challenge, user_input)
+            if done is None:
+                result = self.challenge_validator.validate_challenge(user_input, challenge)
+                done = self.apply_challenge_result(result)
+            if done:
+                break
+    
+    def show_challenge(self, scene: Dict[str, Any]) -> Dict[str, Any]:
+        """Present a challenge scene's prompt; returns the challenge"""
         challenge = scene.get("challenge", {})
-        print(f"\nChallenge: {challenge.get('prompt', 'No prompt provided')}")
+        self.io.write(self.renderer.challenge(challenge))
+        
+        # Spin up sandbox workers while the player is typing
+        self.challenge_validator.warm_up()
+        return challenge
+    
+    def challenge_command(self, challenge: Dict[str, Any], user_input: str) -> Optional[bool]:
+        """
+        Handle 'quit', 'hint' and 'back' at a challenge prompt
         
-        if challenge.get("hint"):
-            print(f"Hint: {challenge['hint']}")
+        Returns:
+            True if the challenge is over, False to prompt again, or None
+            if the input is code to validate
+        """
+        if user_input.lower() == 'quit':
+            self.quit_game()
+            return True
+        elif user_input.lower() == 'hint':
+            self.io.write(f"Hint: {challenge.get('hint', 'No hint available')}")
+            return False
+        elif user_input.lower() == 'back':
+            return self.go_back()
+        return None
+    
+    def apply_challenge_result(self, result: Dict[str, Any]) -> bool:
+        """Report a validation result; returns True if the challenge was passed"""
+        if result["success"]:
+            self.io.write("✅ Correct! Well done!")
+            self.player.add_experience(10)
+            self.story_manager.advance_to_next_scene()
+            return True
+        
+        self.io.write(f"❌ {result['message']}")
+        if result.get("output"):
+            self.io.write(f"Your output: {result['output']}")
+        challenge_id = self.current_challenge_id()
+        if challenge_id is not None:
+            self.player.fail_challenge(challenge_id)
+        return False
+    
+    def practice(self):
+        """Play one practice challenge picked for the player's weakest topic"""
+        challenge = self.challenge_validator.create_challenge(player=self.player)
+        self.io.write(f"\n🎯 Practice: {challenge.get('topic', 'python')} (difficulty {challenge.get('difficulty', '?')})")
+        self.io.write(self.renderer.challenge(challenge))
+        self.challenge_validator.warm_up()
         
         while True:
-            print("\nEnter your Python code (type 'quit' to exit, 'hint' for help):")
-            user_input = input("> ")
-            
-            if user_input.lower() == 'quit':
-                self.quit_game()
+            self.io.write("\nEnter your Python code (type 'skip' to return to the story, 'hint' for help):")
+            user_input = self.io.read("> ")
+            if user_input.lower() == 'skip':
                 return
-            elif user_input.lower() == 'hint':
-                print(f"Hint: {challenge.get('hint', 'No hint available')}")
+            if user_input.lower() == 'hint':
+                self.io.write(f"Hint: {challenge.get('hint', 'No hint available')}")
                 continue
             
-            result = self.challenge_validator.validate_code(
-                user_input, 
-                challenge.get("expected_output"),
-                challenge.get("test_cases", [])
-            )
-            
+            result = self.challenge_validator.validate_challenge(user_input, challenge)
+            rating = self.challenge_validator.record_practice(self.player, challenge, result["success"])
             if result["success"]:
-                print("✅ Correct! Well done!")
-                self.player.add_experience(10)
-                self.story_manager.advance_to_next_scene()
-                break
-            else:
-                print(f"❌ {result['message']}")
-                if result.get("output"):
-                    print(f"Your output: {result['output']}")
+                self.io.write("✅ Correct! Well done!")
+                if rating is not None:
+                    self.io.write(f"📊 {challenge['topic'].capitalize()} mastery: {rating}")
+                return
+            self.io.write(f"❌ {result['message']}")
+            if result.get("output"):
+                self.io.write(f"Your output: {result['output']}")
+    
+    def current_challenge_id(self) -> Optional[str]:
+        """ID of the current scene's challenge, in cross-story link form (story:scene)"""
+        scene_id = self.story_manager.get_current_scene_id()
+        if scene_id is None:
+            return None
+        return f"{self.story_manager.current_story}:{scene_id}"
     
     def handle_choice(self, scene: Dict[str, Any]):
         """Handle story choices"""
         choices = scene.get("choices", [])
         
         if not choices:
-            input("\nPress Enter to continue...")
+            self.io.read("\nPress Enter to continue...")
             self.story_manager.advance_to_next_scene()
             return
         
-        print("\nWhat do you choose?")
-        for i, choice in enumerate(choices, 1):
-            print(f"{i}. {choice['text']}")
+        self.show_choices(choices)
         
-        while True:
-            try:
-                choice_input = input("\nEnter your choice (number): ")
-                choice_num = int(choice_input) - 1
-                
-                if 0 <= choice_num < len(choices):
-                    selected_choice = choices[choice_num]
-                    self.story_manager.advance_to_scene(selected_choice.get("next_scene"))
-                    break
-                else:
-                    print("Invalid choice. Please try again.")
-            except ValueError:
-                print("Please enter a valid number.")
+        while not self.choose(choices, self.io.read("\nEnter your choice (number): ")):
+            pass
+    
+    def show_choices(self, choices: List[Dict[str, Any]]):
+        """List the choices for a scene"""
+        self.io.write(self.renderer.choices(choices))
+        
+        # Load any story a choice leads into while the player is deciding
+        self.story_manager.prefetch()
+    
+    def choose(self, choices: List[Dict[str, Any]], choice_input: str) -> bool:
+        """Apply the player's choice; returns False if the input was invalid"""
+        if choice_input.strip().lower() == 'back':
+            return self.go_back()
+        if choice_input.strip().lower() == 'practice':
+            self.practice()
+            self.show_choices(choices)
+            return False
+        
+        try:
+            choice_num = int(choice_input) - 1
+        except ValueError:
+            self.io.write("Please enter a valid number.")
+            return False
+        
+        if 0 <= choice_num < len(choices):
+            self.story_manager.advance_by_choice(choice_num)
+            return True
+        
+        self.io.write("Invalid choice. Please try again.")
+        return False
     
     def print_banner(self):
         """Print game banner"""
@@ -137,22 +331,72 @@ class PyAdventureGame:
 ║                                                                               ║
 ╚═══════════════════════════════════════════════════════════════════════════════╝
         """
-        print(banner)
-        print("Welcome to PyAdventure! Learn Python through interactive storytelling.")
-        print("Type 'quit' at any time to exit the game.\n")
+        self.io.write(banner)
+        self.io.write("Welcome to PyAdventure! Learn Python through interactive storytelling.")
+        self.io.write("Type 'quit' at any time to exit the game, or 'back' to return to the previous scene.")
+        self.io.write("At a choice, type 'practice' for a challenge picked for your weakest topic.\n")
     
     def quit_game(self):
         """Quit the game"""
-        print("\nThanks for playing PyAdventure!")
-        print(f"Final Score: {self.player.experience} XP")
+        self.io.write("\nThanks for playing PyAdventure!")
+        self.io.write(f"Final Score: {self.player.experience} XP")
+        self.player.flush()
         self.running = False
         sys.exit(0)
 
 
 def main():
     """Main entry point"""
-    game = PyAdventureGame()
-    game.start()
+    parser = argparse.ArgumentParser(description="PyAdventure: learn Python through interactive storytelling")
+    parser.add_argument("--save-db", help="SQLite database holding many player profiles")
+    parser.add_argument("--player", default="default", help="Profile name to play as when using --save-db")
+    parser.add_argument("--journal", metavar="FILE",
+                        help="Save progress as an append-only event journal (compacted into snapshots)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Record engine metrics and write them on exit (.json for JSON, else Prometheus text)")
+    parser.add_argument("--profile", metavar="FILE", nargs="?", const="",
+                        help="Profile the session with cProfile; print a report, and save raw stats to FILE if given")
+    args = parser.parse_args()
+    
+    if args.metrics:
+        METRICS.enable()
+    
+    profiler = None
+    if args.profile is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    try:
+        # The save is opened by the game after the banner, like the default JSON save
+        save_backend = None
+        if args.save_db:
+            def save_backend():
+                from storage import SQLiteSaveStore
+                return SQLiteSaveStore(args.save_db).backend(args.player)
+        elif args.journal:
+            def save_backend():
+                from journal import JournalSaveBackend
+                return JournalSaveBackend(args.journal)
+        
+        game = PyAdventureGame(save_backend=save_backend)
+        game.start()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            write_profile_report(profiler, args.profile)
+        if args.metrics:
+            METRICS.export(args.metrics)
+
+
+def write_profile_report(profiler, stats_file: str = ""):
+    """Print the hottest functions of a profiled session to stderr, optionally saving raw stats"""
+    import pstats
+    
+    if stats_file:
+        profiler.dump_stats(stats_file)
+    stats = pstats.Stats(profiler, stream=sys.stderr)
+    stats.sort_stats("cumulative").print_stats(25)
 
 
 if __name__ == "__main__":
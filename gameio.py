@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Game I/O module for PyAdventure
+Separates the game engine from the terminal so it can be scripted or run headless
+"""
+
+import sys
+from collections import deque
+from typing import Callable, Iterable, List
+
+
+class ConsoleIO:
+    """
+    Reads from stdin and writes to stdout
+    
+    Output is queued and sent together with the next prompt, so a whole
+    turn reaches the terminal in one write instead of a line at a time.
+    """
+    
+    def __init__(self):
+        self._pending: List[str] = []
+    
+    def write(self, text: str = ""):
+        """Queue a line of output"""
+        self._pending.append(text)
+        self._pending.append("\n")
+    
+    def flush(self):
+        """Send queued output now"""
+        self._send("")
+    
+    def read(self, prompt: str = "") -> str:
+        """Prompt for and read a line of input"""
+        self._send(prompt)
+        return input()
+    
+    def _send(self, prompt: str):
+        self._pending.append(prompt)
+        text = "".join(self._pending)
+        self._pending.clear()
+        if text:
+            sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+class ScriptedIO:
+    """Feeds canned or computed input to the game and optionally captures its output"""
+    
+    def __init__(self, responses: Iterable[str] = None,
+                 responder: Callable[[str], str] = None, capture: bool = True):
+        """
+        Args:
+            responses: Lines to return from read(), in order
+            responder: Called with the prompt when responses run out
+            capture: Keep written output in self.output
+        """
+        self.responses = deque(responses or [])
+        self.responder = responder
+        self.capture = capture
+        self.output: List[str] = []
+        self.prompts: List[str] = []
+    
+    def write(self, text: str = ""):
+        """Record a line of output, or drop it when not capturing"""
+        if self.capture:
+            self.output.append(text)
+    
+    def flush(self):
+        """Nothing to send; output is captured as it is written"""
+    
+    def read(self, prompt: str = "") -> str:
+        """Return the next scripted response; raises EOFError when there is none"""
+        if self.capture:
+            self.prompts.append(prompt)
+        if self.responses:
+            return self.responses.popleft()
+        if self.responder is not None:
+            return self.responder(prompt)
+        raise EOFError("scripted input exhausted")
+    
+    def text(self) -> str:
+        """All captured output as one string"""
+        return "\n".join(self.output)
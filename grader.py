@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Batch grader for PyAdventure
+Regrades stored player submissions against story challenges without the
+interactive game loop
+
+Input is a JSONL stream, one submission per line:
+    {"id": "...", "story": "intro", "scene": "variables", "code": "..."}
+A submission may carry an inline "challenge" object instead of story/scene.
+Output is a JSONL stream with one result per submission, in input order.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, Optional, TextIO
+
+from challenges import ChallengeValidator
+from sandbox import SandboxPool
+from story import StoryManager
+
+
+class BatchGrader:
+    """Grades streams of submissions across a pool of sandbox workers"""
+
+    def __init__(self, stories_dir: str = "stories", workers: int = None, wall_time: float = 2.0):
+        self.stories_dir = stories_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.sandbox = SandboxPool(workers=self.workers, wall_time=wall_time)
+        self.validator = ChallengeValidator(sandbox=self.sandbox)
+        self._stories: Dict[str, Optional[StoryManager]] = {}
+        # Grading threads resolve stories concurrently
+        self._stories_lock = threading.Lock()
+        self.stats = {
+            "total": 0,
+            "passed": 0,
+            "failed": 0,
+            "invalid": 0,
+            "elapsed": 0.0,
+            "latencies": []
+        }
+
+    def close(self):
+        """Shut down the sandbox workers"""
+        self.sandbox.close()
+
+    def find_challenge(self, submission: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Resolve the challenge a submission answers"""
+        if "challenge" in submission:
+            challenge = submission["challenge"]
+            return challenge if isinstance(challenge, Mapping) else None
+
+        story_name = submission.get("story")
+        if not isinstance(story_name, str):
+            return None
+        with self._stories_lock:
+            if story_name not in self._stories:
+                manager = StoryManager(self.stories_dir)
+                # Any source the registry can load (JSON, pack or bundle); never
+                # fall back to load_story's default story for an unknown name
+                if manager.registry.source_for(story_name) is None or not manager.load_story(story_name):
+                    manager = None
+                self._stories[story_name] = manager
+            manager = self._stories[story_name]
+        if manager is None:
+            return None
+
+        index = manager.compiled.index_of(submission.get("scene"))
+        if index is None:
+            return None
+        return manager.compiled.scene_at(index).get("challenge")
+
+    def grade(self, submission: Dict[str, Any]) -> Dict[str, Any]:
+        """Grade a single submission; a malformed one gets an invalid result rather than an error"""
+        if not isinstance(submission, dict):
+            return self._invalid({"id": None, "story": None, "scene": None}, "Submission is not a JSON object")
+        result = {
+            "id": submission.get("id"),
+            "story": submission.get("story"),
+            "scene": submission.get("scene")
+        }
+        if not isinstance(submission.get("code"), str):
+            return self._invalid(result, "Submission has no code")
+
+        started = time.perf_counter()
+        try:
+            challenge = self.find_challenge(submission)
+            if challenge is None:
+                return self._invalid(result, "Unknown challenge")
+            outcome = self.validator.validate_challenge(submission["code"], challenge)
+        except Exception as e:
+            # One bad record (say a malformed inline challenge) must not stop the stream
+            return self._invalid(result, f"Could not grade submission: {e}")
+        result.update(outcome)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    @staticmethod
+    def _invalid(result: Dict[str, Any], message: str) -> Dict[str, Any]:
+        result.update({"success": False, "message": message, "output": None, "invalid": True})
+        return result
+
+    def grade_stream(self, submissions: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Grade submissions concurrently, yielding results in input order
+
+        At most a few submissions per worker are in flight at once, so
+        arbitrarily large inputs are graded in constant memory.
+        """
+        window = self.workers * 4
+        started = time.perf_counter()
+        self.sandbox.start()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = deque()
+            for submission in submissions:
+                in_flight.append(executor.submit(self.grade, submission))
+                if len(in_flight) >= window:
+                    yield self._record(in_flight.popleft().result())
+            while in_flight:
+                yield self._record(in_flight.popleft().result())
+
+        self.stats["elapsed"] = time.perf_counter() - started
+
+    def _record(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Update throughput statistics with a finished result"""
+        self.stats["total"] += 1
+        if result.get("invalid"):
+            self.stats["invalid"] += 1
+        elif result["success"]:
+            self.stats["passed"] += 1
+        else:
+            self.stats["failed"] += 1
+        if "elapsed_ms" in result:
+            self.stats["latencies"].append(result["elapsed_ms"])
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """Return throughput statistics for the last run"""
+        latencies = sorted(self.stats["latencies"])
+        elapsed = self.stats["elapsed"]
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "total": self.stats["total"],
+            "passed": self.stats["passed"],
+            "failed": self.stats["failed"],
+            "invalid": self.stats["invalid"],
+            "elapsed_s": round(elapsed, 3),
+            "submissions_per_s": round(self.stats["total"] / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "compile_cache": self.validator.compile_cache.stats()
+        }
+
+
+def read_submissions(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """Yield submissions from a JSONL stream, skipping blank lines"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Warning: skipping line {line_number}: {e}", file=sys.stderr)
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Regrade stored PyAdventure submissions")
+    parser.add_argument("submissions", help="JSONL file of submissions ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for results ('-' for stdout)")
+    parser.add_argument("--stories", default="stories", help="Directory containing story files")
+    parser.add_argument("--workers", type=int, default=None, help="Number of sandbox workers")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Wall-clock limit per submission in seconds")
+    args = parser.parse_args(argv)
+
+    grader = BatchGrader(args.stories, workers=args.workers, wall_time=args.timeout)
+    source = sys.stdin if args.submissions == "-" else open(args.submissions, 'r')
+    sink = sys.stdout if args.output == "-" else open(args.output, 'w')
+
+    try:
+        for result in grader.grade_stream(read_submissions(source)):
+            result.pop("invalid", None)
+            sink.write(json.dumps(result) + "\n")
+    finally:
+        grader.close()
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    print(json.dumps(grader.summary(), indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Event-sourced player saves for PyAdventure
+Appends each progress event to a JSON-lines journal, compacts it into a
+periodic snapshot, and rebuilds player state by replaying the two
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Any, Iterator, List, Optional
+
+from storage import atomic_write_json
+
+
+def _add_experience(state: Dict[str, Any], event: Dict[str, Any]):
+    state["experience"] = state.get("experience", 0) + event["amount"]
+
+
+def _complete_challenge(state: Dict[str, Any], event: Dict[str, Any]):
+    state.setdefault("completed_challenges", []).append(event["challenge"])
+
+
+def _fail_challenge(state: Dict[str, Any], event: Dict[str, Any]):
+    failed = state.setdefault("failed_challenges", {})
+    failed[event["challenge"]] = failed.get(event["challenge"], 0) + 1
+
+
+def _update_mastery(state: Dict[str, Any], event: Dict[str, Any]):
+    state.setdefault("mastery", {})[event["topic"]] = {
+        "rating": event["rating"],
+        "attempts": event["attempts"],
+        "passed": event["passed"]
+    }
+
+
+def _complete_practice(state: Dict[str, Any], event: Dict[str, Any]):
+    state.setdefault("practice_completed", []).append(event["challenge"])
+
+
+def _add_item(state: Dict[str, Any], event: Dict[str, Any]):
+    state.setdefault("inventory", []).append(event["item"])
+
+
+def _unlock_achievement(state: Dict[str, Any], event: Dict[str, Any]):
+    state.setdefault("achievements", []).append(event["achievement"])
+
+
+def _change_scene(state: Dict[str, Any], event: Dict[str, Any]):
+    state["current_story"] = event["story"]
+    state["current_scene"] = event["scene"]
+
+
+# How each event type changes saved state: handler(state, event)
+EVENT_HANDLERS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {
+    "experience": _add_experience,
+    "challenge_completed": _complete_challenge,
+    "challenge_failed": _fail_challenge,
+    "mastery_updated": _update_mastery,
+    "practice_completed": _complete_practice,
+    "item_added": _add_item,
+    "achievement_unlocked": _unlock_achievement,
+    "scene_changed": _change_scene
+}
+
+
+def apply_event(state: Dict[str, Any], event: Dict[str, Any]):
+    """Apply one journal event to save state in place; unknown event types are ignored"""
+    handler = EVENT_HANDLERS.get(event.get("type"))
+    if handler is not None:
+        handler(state, event)
+
+
+def read_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the events in a journal file, skipping a torn final line"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last line can be partial, left by a crash mid-append
+                continue
+
+
+def drop_torn_line(path: str):
+    """Cut a partial final line, left by a crash mid-append, off a journal file"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Find the end of the last complete line
+        end = size - 1
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+
+
+class JournalSaveBackend:
+    """
+    Save backend that journals events instead of rewriting the save
+
+    Player reports each change through record(); save() appends the
+    recorded events in one write. Once compact_every events have built up,
+    the current state is written as a snapshot and the journal starts over,
+    so a load replays at most that many events. Compacted events are moved
+    to a history file rather than dropped, unless keep_history is off.
+    """
+
+    def __init__(self, journal_file: str = "player_journal.jsonl", compact_every: int = 500,
+                 keep_history: bool = True):
+        base = journal_file[:-len(".jsonl")] if journal_file.endswith(".jsonl") else journal_file
+        self.journal_file = journal_file
+        self.snapshot_file = base + ".snapshot.json"
+        self.history_file = base + ".history.jsonl"
+        self.compact_every = compact_every
+        self.keep_history = keep_history
+        self.state: Optional[Dict[str, Any]] = None
+        self.seq = 0
+        self._journaled = 0
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Check whether a save exists"""
+        return os.path.exists(self.snapshot_file) or os.path.exists(self.journal_file)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Rebuild saved data from the snapshot and the events journaled after it"""
+        with self._lock:
+            self._pending = []
+            if not self.exists():
+                self.state = None
+                self.seq = 0
+                self._journaled = 0
+                return None
+
+            state: Dict[str, Any] = {}
+            seq = 0
+            if os.path.exists(self.snapshot_file):
+                with open(self.snapshot_file, 'r') as f:
+                    snapshot = json.load(f)
+                state = snapshot["state"]
+                seq = snapshot["seq"]
+
+            # Otherwise the next append would be glued onto the partial line and lost with it
+            drop_torn_line(self.journal_file)
+            journaled = 0
+            for event in read_events(self.journal_file):
+                if event.get("seq", 0) <= seq:
+                    # Already folded into the snapshot
+                    continue
+                apply_event(state, event)
+                seq = event["seq"]
+                journaled += 1
+
+            self.state = state
+            self.seq = seq
+            self._journaled = journaled
+            # Deep copy: the caller will mutate the lists it was handed
+            return copy.deepcopy(state)
+
+    def record(self, event_type: str, fields: Dict[str, Any]):
+        """Journal one change; it is written by the next save()"""
+        with self._lock:
+            self.seq += 1
+            event = {"seq": self.seq, "ts": round(time.time(), 3), "type": event_type, **fields}
+            if self.state is not None:
+                apply_event(self.state, event)
+            self._pending.append(json.dumps(event, separators=(",", ":")) + "\n")
+
+    def save(self, data: Dict[str, Any]):
+        """Append recorded events, snapshotting when the journal is long or out of step with data"""
+        with self._lock:
+            if self.state != data:
+                # First save, or a change that was not journaled as an event
+                self._snapshot(data)
+                return
+
+            if self._pending:
+                with open(self.journal_file, 'a', encoding='utf-8') as f:
+                    f.writelines(self._pending)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._journaled += len(self._pending)
+                self._pending = []
+
+            if self._journaled >= self.compact_every:
+                self._snapshot(data)
+
+    def delete(self):
+        """Remove the save; the history file keeps a reset marker"""
+        with self._lock:
+            self._archive()
+            if self.keep_history:
+                with open(self.history_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({"seq": self.seq, "ts": round(time.time(), 3), "type": "reset"}) + "\n")
+            for path in (self.snapshot_file, self.journal_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.state = None
+            self._journaled = 0
+            self._pending = []
+
+    def events(self, include_history: bool = True) -> Iterator[Dict[str, Any]]:
+        """Yield journaled events oldest first, including compacted ones by default"""
+        if include_history:
+            yield from read_events(self.history_file)
+        yield from read_events(self.journal_file)
+
+    def _snapshot(self, data: Dict[str, Any]):
+        """Write data as the new snapshot and start an empty journal"""
+        # Pending events are folded into the snapshot, but still belong in the history
+        if self._pending and self.keep_history:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.writelines(self._pending)
+        self._pending = []
+        atomic_write_json(self.snapshot_file, {"seq": self.seq, "state": data}, compact=True)
+        # A crash from here on only leaves events the snapshot already covers
+        self._archive()
+        self.state = copy.deepcopy(data)
+        self._journaled = 0
+
+    def _archive(self):
+        """Move the journal's events to the history file (or drop them) and truncate it"""
+        if not os.path.exists(self.journal_file):
+            return
+        if self.keep_history:
+            with open(self.journal_file, 'rb') as source:
+                events = source.read()
+            if events and not events.endswith(b"\n"):
+                # Keep a torn line from swallowing the next event appended to the history
+                events += b"\n"
+            with open(self.history_file, 'ab') as history:
+                history.write(events)
+        os.remove(self.journal_file)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Opt-in instrumentation for PyAdventure
+Counters and latency histograms for the engine's hot paths, exported as
+JSON or Prometheus text. Disabled by default, when every call is a no-op.
+"""
+
+import bisect
+import json
+import threading
+import time
+from typing import Dict, Any, List, Sequence
+
+
+# Upper bounds in seconds, from sub-millisecond scene renders to slow submissions
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_PREFIX = "pyadventure_"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Record one sample"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that holds it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary statistics and cumulative bucket counts"""
+        cumulative = {}
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            cumulative[str(bound)] = seen
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "buckets": cumulative
+        }
+
+
+class _Timer:
+    """Context manager that records its duration into a histogram"""
+
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    """Shared do-nothing timer used while metrics are disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """A registry of named counters and histograms"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """Start recording"""
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording; calls become no-ops again"""
+        self.enabled = False
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def incr(self, name: str, amount: float = 1):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float):
+        """Record a sample in a histogram"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def timed(self, name: str):
+        """Time a block into the named histogram: with METRICS.timed("x_seconds"): ..."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything recorded, as JSON-ready data"""
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {name: self.histograms[name].to_dict() for name in sorted(self.histograms)}
+            }
+
+    def to_prometheus(self) -> str:
+        """Render in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self.counters):
+                metric = PROMETHEUS_PREFIX + name
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {self.counters[name]}")
+            for name in sorted(self.histograms):
+                histogram = self.histograms[name]
+                metric = PROMETHEUS_PREFIX + name
+                lines.append(f"# TYPE {metric} histogram")
+                seen = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    seen += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {seen}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """Write metrics to a file: JSON for .json paths, Prometheus text otherwise"""
+        if path.endswith(".json"):
+            text = json.dumps(self.snapshot(), indent=2) + "\n"
+        else:
+            text = self.to_prometheus()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+# The process-wide registry the engine reports to
+METRICS = Metrics()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Streaming output comparison for PyAdventure
+Checks a submission's stdout against the expected text (or a precomputed
+fingerprint of it) while the submission is still printing, so output that
+can no longer match is rejected without being buffered in full
+
+Submissions never write to sys.stdout: each run gets its own print() bound
+to a matcher or a bounded OutputCapture, so runs can share a process and
+its threads without their output mixing.
+"""
+
+import hashlib
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Union
+
+
+# Output kept past the expected length, so a wrong answer can still be shown
+DEFAULT_SLACK = 256
+
+# Bytes of output kept from a run with nothing to compare against
+DEFAULT_CAPTURE_LIMIT = 64 * 1024
+
+
+class OutputMismatch(BaseException):
+    """
+    Raised from print() inside a submission once its output cannot match
+
+    Derives from BaseException so `except Exception` in user code does not
+    swallow it.
+    """
+
+
+class Fingerprint(NamedTuple):
+    """Length and SHA-256 of stripped expected output"""
+    length: int
+    digest: str
+
+
+class Mismatch(NamedTuple):
+    """
+    Where output went wrong
+
+    reason is 'diverged', 'too_long', 'too_short' or 'fingerprint'; the
+    position is an offset into the stripped output, and is None when a
+    fingerprint mismatch cannot be located.
+    """
+    reason: str
+    position: Optional[int]
+    line: Optional[int]
+    column: Optional[int]
+
+
+Expectation = Union[str, Fingerprint]
+
+
+def fingerprint(text: str) -> str:
+    """Fingerprint expected output, for test cases that should not embed it"""
+    stripped = text.strip()
+    digest = hashlib.sha256(stripped.encode("utf-8")).hexdigest()
+    return f"sha256:{len(stripped)}:{digest}"
+
+
+def parse_fingerprint(value: str) -> Fingerprint:
+    """Parse a 'sha256:<length>:<hex digest>' fingerprint"""
+    try:
+        algorithm, length, digest = value.split(":")
+        if algorithm != "sha256" or len(digest) != 64:
+            raise ValueError
+        return Fingerprint(int(length), digest.lower())
+    except ValueError:
+        raise ValueError(f"malformed output fingerprint '{value}'")
+
+
+def expectation_for(test_case: Dict[str, Any]) -> Expectation:
+    """What a test case's output is checked against: its fingerprint if it has one, else its text"""
+    if "expected_fingerprint" in test_case:
+        return parse_fingerprint(test_case["expected_fingerprint"])
+    return test_case.get("expected_output", "")
+
+
+def describe_expectation(expected: Expectation) -> str:
+    """Expected output as shown in failure messages"""
+    if isinstance(expected, Fingerprint):
+        return f"<{expected.length} characters, sha256 {expected.digest[:12]}>"
+    return expected
+
+
+def location(mismatch: Optional[Mismatch]) -> str:
+    """' at line L, column C' for a located mismatch, else an empty string"""
+    if mismatch is None or mismatch.line is None:
+        return ""
+    return f" at line {mismatch.line}, column {mismatch.column}"
+
+
+class _Matcher:
+    """
+    Shared stdout-replacement behaviour: skip leading whitespace, keep a
+    bounded copy of the output for reporting, abort once a mismatch is final
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.mismatch: Optional[Mismatch] = None
+        self.truncated = False
+        self._started = False
+        self._captured: List[str] = []
+        self._captured_length = 0
+
+    def write(self, text: str) -> int:
+        if self.mismatch is not None and self.truncated:
+            raise OutputMismatch(self.mismatch)
+        written = len(text)
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return written
+            self._started = True
+        self._capture(text)
+        self._consume(text)
+        if self.mismatch is not None and self.truncated:
+            raise OutputMismatch(self.mismatch)
+        return written
+
+    def flush(self):
+        pass
+
+    @property
+    def output(self) -> str:
+        """The stripped output, ending in '...' if only a prefix was kept"""
+        text = "".join(self._captured).rstrip()
+        return text + "..." if self.truncated else text
+
+    def finish(self) -> Optional[Mismatch]:
+        """Call once the submission has finished; returns None if the output matched"""
+        if self.mismatch is None:
+            self.mismatch = self._final_mismatch()
+        return self.mismatch
+
+    def _capture(self, text: str):
+        room = self.limit - self._captured_length
+        if room <= 0:
+            self.truncated = self.truncated or bool(text.strip())
+            return
+        if len(text) > room:
+            self.truncated = self.truncated or bool(text[room:].strip())
+            text = text[:room]
+        self._captured.append(text)
+        self._captured_length += len(text)
+
+    def _consume(self, text: str):
+        raise NotImplementedError
+
+    def _final_mismatch(self) -> Optional[Mismatch]:
+        raise NotImplementedError
+
+
+class OutputMatcher(_Matcher):
+    """
+    Compares output against expected text as it is written
+
+    Matches exactly when `output.strip() == expected`. Once the output has
+    diverged (or run past the expected text with anything but whitespace),
+    the submission is stopped as soon as the kept copy is full.
+    """
+
+    def __init__(self, expected: str, slack: int = DEFAULT_SLACK):
+        super().__init__(len(expected) + slack)
+        self.expected = expected
+        self._matched = 0
+        # Whitespace seen after the whole expected text, and its shape
+        self._extra = 0
+        self._extra_lines = 0
+        self._extra_column = 0
+
+    def _consume(self, text: str):
+        if self.mismatch is not None:
+            return
+        expected = self.expected
+        if self._matched < len(expected):
+            head = text[:len(expected) - self._matched]
+            if not expected.startswith(head, self._matched):
+                offset = next(i for i, (a, b) in enumerate(zip(head, expected[self._matched:])) if a != b)
+                self._diverge(self._matched + offset)
+                return
+            self._matched += len(head)
+            text = text[len(head):]
+            if not text:
+                return
+
+        stripped = text.lstrip()
+        whitespace = text[:len(text) - len(stripped)]
+        newlines = whitespace.count("\n")
+        if newlines:
+            self._extra_lines += newlines
+            self._extra_column = len(whitespace) - whitespace.rfind("\n") - 1
+        else:
+            self._extra_column += len(whitespace)
+        self._extra += len(whitespace)
+        if stripped:
+            line, column = self._expected_location(len(expected))
+            if self._extra_lines:
+                line, column = line + self._extra_lines, self._extra_column + 1
+            else:
+                column += self._extra_column
+            self.mismatch = Mismatch("too_long", len(expected) + self._extra, line, column)
+
+    def _diverge(self, position: int):
+        # Everything before the divergence equals the expected text
+        line, column = self._expected_location(position)
+        self.mismatch = Mismatch("diverged", position, line, column)
+
+    def _expected_location(self, position: int):
+        line = self.expected.count("\n", 0, position) + 1
+        column = position - self.expected.rfind("\n", 0, position)
+        return line, column
+
+    def _final_mismatch(self) -> Optional[Mismatch]:
+        if self._matched < len(self.expected):
+            line, column = self._expected_location(self._matched)
+            return Mismatch("too_short", self._matched, line, column)
+        if self.expected != self.expected.strip():
+            # Stripped output can never carry the expected surrounding whitespace
+            line, column = self._expected_location(0)
+            return Mismatch("diverged", 0, line, column)
+        return None
+
+
+class FingerprintMatcher(_Matcher):
+    """
+    Compares output against a length and hash as it is written
+
+    The stripped output is hashed incrementally; a submission is stopped as
+    soon as it prints more than the expected length.
+    """
+
+    def __init__(self, expected: Fingerprint, slack: int = DEFAULT_SLACK):
+        super().__init__(expected.length + slack)
+        self.expected = expected
+        self._hasher = hashlib.sha256()
+        self._hashed = 0
+        # Whitespace that is only part of the output if something follows it
+        self._pending = ""
+        self._overflow = False
+
+    def _consume(self, text: str):
+        if self.mismatch is not None:
+            return
+        body = text.rstrip()
+        if not body:
+            if self._overflow or self._hashed + len(self._pending) + len(text) > self.expected.length:
+                # Only valid as trailing whitespace now; no need to keep it
+                self._overflow = True
+                self._pending = ""
+            else:
+                self._pending += text
+            return
+
+        chunk = self._pending + body
+        self._pending = text[len(body):]
+        if self._overflow or self._hashed + len(chunk) > self.expected.length:
+            self.mismatch = Mismatch("too_long", self.expected.length, None, None)
+            return
+        self._hasher.update(chunk.encode("utf-8"))
+        self._hashed += len(chunk)
+
+    def _final_mismatch(self) -> Optional[Mismatch]:
+        if self._hashed != self.expected.length or self._hasher.hexdigest() != self.expected.digest:
+            return Mismatch("fingerprint", None, None, None)
+        return None
+
+
+def make_matcher(expected: Expectation, slack: int = DEFAULT_SLACK) -> _Matcher:
+    """Build the matcher for expected text or a fingerprint"""
+    if isinstance(expected, Fingerprint):
+        return FingerprintMatcher(expected, slack)
+    return OutputMatcher(expected, slack)
+
+
+class OutputCapture:
+    """
+    Bounded output buffer for runs whose output is not compared
+
+    Output is encoded into a buffer preallocated at the cap; bytes past it
+    are counted but not kept, so a runaway loop costs no more memory than
+    a well-behaved one.
+    """
+
+    def __init__(self, limit: int = DEFAULT_CAPTURE_LIMIT):
+        self.limit = limit
+        self.bytes_written = 0
+        self._buffer = bytearray(limit)
+        self._used = 0
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8")
+        self.bytes_written += len(data)
+        room = self.limit - self._used
+        if room > 0:
+            kept = min(room, len(data))
+            self._buffer[self._used:self._used + kept] = data[:kept]
+            self._used += kept
+        return len(text)
+
+    def flush(self):
+        pass
+
+    @property
+    def truncated(self) -> bool:
+        """Whether output went past the cap"""
+        return self.bytes_written > self.limit
+
+    @property
+    def output(self) -> str:
+        """The stripped output, ending in '...' if only a prefix was kept"""
+        # A cut at the cap can split a character; drop the partial one
+        text = self._buffer[:self._used].decode("utf-8", "ignore").strip()
+        return text + "..." if self.truncated else text
+
+
+def capture_print(write: Callable[[str], Any]) -> Callable[..., None]:
+    """
+    A print() replacement for submitted code that writes to the given sink
+
+    Each call makes a single write, which keeps streaming matchers cheap.
+    """
+    def print(*values, sep: Optional[str] = " ", end: Optional[str] = "\n", file=None, flush: bool = False):
+        if sep is None:
+            sep = " "
+        elif not isinstance(sep, str):
+            raise TypeError(f"sep must be None or a string, not {type(sep).__name__}")
+        if end is None:
+            end = "\n"
+        elif not isinstance(end, str):
+            raise TypeError(f"end must be None or a string, not {type(end).__name__}")
+        text = sep.join([str(value) for value in values]) + end
+        if file is None:
+            write(text)
+        else:
+            file.write(text)
+    return print
+
+
+def capture_help(write: Callable[[str], Any]) -> Callable[..., None]:
+    """A help() replacement that writes documentation to the sink instead of a pager"""
+    def help(*args):
+        if not args:
+            # Interactive help would read from the game's own input
+            write("Call help(object) to read about an object, e.g. help(len)\n")
+            return
+        import pydoc
+        try:
+            write(pydoc.render_doc(args[0], title="Help on %s:", renderer=pydoc.plaintext) + "\n")
+        except ImportError as e:
+            write(f"{e}\n")
+    return help
@@ -4,134 +4,242 @@ PyAdventure Player Module
 Handles player progress, save/load functionality, and game state management
 """
 
-import json
-import os
-from typing import List, Dict, Any
+import threading
+from typing import Callable, Dict, Any, Union
+
+from metrics import METRICS
+from storage import JsonSaveBackend, WriteBehindSaver
+
+
+def level_for_experience(experience: int) -> int:
+    """Player level for an amount of experience"""
+    return max(1, experience // 50)
 
 
 class Player:
     """Player class for tracking progress and managing save/load functionality"""
     
-    def __init__(self, save_file: str = "player_save.json"):
+    def __init__(self, save_file: str = "player_save.json", backend=None,
+                 flush_interval: float = 2.0, compact: bool = False,
+                 notify: Callable[[str], None] = print):
+        """
+        Args:
+            save_file: Path of the JSON save file
+            backend: Optional save backend; defaults to a JsonSaveBackend on save_file
+            flush_interval: Seconds to coalesce changes before writing, or None
+                to write only on flush()
+            compact: Write the JSON save without indentation
+            notify: Where player messages are sent
+        """
+        self.notify = notify
         self.save_file = save_file
+        self.backend = backend or JsonSaveBackend(save_file, compact=compact)
+        self.saver = WriteBehindSaver(self.save_progress, flush_interval)
+        # The saver's timer thread snapshots state while the game mutates it;
+        # never held while marking dirty, since the saver's lock is taken first on flush
+        self._lock = threading.RLock()
+        # Backends that keep an event journal are told about each change
+        self._record_event = getattr(self.backend, "record", None)
         self.experience = 0
-        self.completed_challenges = []
+        # Insertion-ordered sets (dict keys): constant-time membership, saved in unlock order
+        self.completed_challenges: Dict[str, None] = {}
+        # Wrong answers submitted per challenge ID
+        self.failed_challenges: Dict[str, int] = {}
+        # Per-topic skill: {"rating", "attempts", "passed"}, kept by the challenge scheduler
+        self.mastery: Dict[str, Dict[str, int]] = {}
+        # Scheduled practice challenges passed, kept apart from story challenges
+        self.practice_completed: Dict[str, None] = {}
         self.current_story = "intro"
         self.current_scene = 0
         self.inventory = []
-        self.achievements = []
+        self.achievements: Dict[str, None] = {}
+        # Bumped whenever progress is replaced wholesale (load, reset), so
+        # caches built from it (the challenge scheduler's) know to rebuild
+        self.progress_version = 0
         
         # Load existing save if it exists
         self.load_progress()
     
     def add_experience(self, amount: int):
         """Add experience points to the player"""
-        self.experience += amount
-        print(f"📈 Gained {amount} XP! Total: {self.experience} XP")
-        self.save_progress()
+        with self._lock:
+            self.experience += amount
+            total = self.experience
+            self._journal("experience", amount=amount)
+        self.notify(f"📈 Gained {amount} XP! Total: {total} XP")
+        self.mark_dirty()
     
     def complete_challenge(self, challenge_id: str):
         """Mark a challenge as completed"""
-        if challenge_id not in self.completed_challenges:
-            self.completed_challenges.append(challenge_id)
-            print(f"🏆 Challenge '{challenge_id}' completed!")
-            self.save_progress()
+        with self._lock:
+            if challenge_id in self.completed_challenges:
+                return
+            self.completed_challenges[challenge_id] = None
+            self._journal("challenge_completed", challenge=challenge_id)
+        self.notify(f"🏆 Challenge '{challenge_id}' completed!")
+        self.mark_dirty()
+    
+    def fail_challenge(self, challenge_id: str):
+        """Count a wrong answer to a challenge"""
+        with self._lock:
+            self.failed_challenges[challenge_id] = self.failed_challenges.get(challenge_id, 0) + 1
+            self._journal("challenge_failed", challenge=challenge_id)
+        self.mark_dirty()
+    
+    def complete_practice(self, challenge_id: str):
+        """Mark a scheduled practice challenge as passed"""
+        with self._lock:
+            if challenge_id in self.practice_completed:
+                return
+            self.practice_completed[challenge_id] = None
+            self._journal("practice_completed", challenge=challenge_id)
+        self.mark_dirty()
+    
+    def update_mastery(self, topic: str, rating: int, attempts: int, passed: int):
+        """Store a topic's mastery after a scheduled challenge"""
+        with self._lock:
+            self.mastery[topic] = {"rating": rating, "attempts": attempts, "passed": passed}
+            self._journal("mastery_updated", topic=topic, rating=rating, attempts=attempts, passed=passed)
+        self.mark_dirty()
     
     def add_to_inventory(self, item: str):
         """Add an item to the player's inventory"""
-        self.inventory.append(item)
-        print(f"🎒 Added '{item}' to inventory")
-        self.save_progress()
+        with self._lock:
+            self.inventory.append(item)
+            self._journal("item_added", item=item)
+        self.notify(f"🎒 Added '{item}' to inventory")
+        self.mark_dirty()
     
     def unlock_achievement(self, achievement: str):
         """Unlock an achievement"""
-        if achievement not in self.achievements:
-            self.achievements.append(achievement)
-            print(f"🏅 Achievement unlocked: {achievement}")
-            self.save_progress()
+        with self._lock:
+            if achievement in self.achievements:
+                return
+            self.achievements[achievement] = None
+            self._journal("achievement_unlocked", achievement=achievement)
+        self.notify(f"🏅 Achievement unlocked: {achievement}")
+        self.mark_dirty()
     
-    def set_story_progress(self, story: str, scene: int):
-        """Update story progress"""
-        self.current_story = story
-        self.current_scene = scene
-        self.save_progress()
+    def set_story_progress(self, story: str, scene: Union[str, int]):
+        """Update story progress; scene is a scene ID (saves before IDs were used hold an index)"""
+        with self._lock:
+            if story == self.current_story and scene == self.current_scene:
+                return
+            self.current_story = story
+            self.current_scene = scene
+            self._journal("scene_changed", story=story, scene=scene)
+        self.mark_dirty()
     
     def get_level(self) -> int:
         """Calculate player level based on experience"""
-        return max(1, self.experience // 50)
+        return level_for_experience(self.experience)
     
-    def save_progress(self):
-        """Save player progress to JSON file"""
-        try:
-            save_data = {
+    def record(self, event_type: str, **fields):
+        """Report a change to a journaling backend, then schedule a save"""
+        with self._lock:
+            self._journal(event_type, **fields)
+        self.mark_dirty()
+    
+    def _journal(self, event_type: str, **fields):
+        # Called with the lock held, so the journal sees changes in the order they were made
+        if self._record_event is not None:
+            self._record_event(event_type, fields)
+    
+    def mark_dirty(self):
+        """Schedule a save; many changes are coalesced into one write"""
+        self.saver.mark_dirty()
+    
+    def flush(self):
+        """Write any pending changes immediately"""
+        self.saver.flush()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of the saved fields, safe to take from the saver's timer thread"""
+        with self._lock:
+            return {
                 "experience": self.experience,
-                "completed_challenges": self.completed_challenges,
+                "completed_challenges": list(self.completed_challenges),
+                "failed_challenges": dict(self.failed_challenges),
+                "mastery": {topic: dict(stats) for topic, stats in self.mastery.items()},
+                "practice_completed": list(self.practice_completed),
                 "current_story": self.current_story,
                 "current_scene": self.current_scene,
-                "inventory": self.inventory,
-                "achievements": self.achievements
+                "inventory": list(self.inventory),
+                "achievements": list(self.achievements)
             }
-            
-            with open(self.save_file, 'w') as f:
-                json.dump(save_data, f, indent=2)
-                
+    
+    def save_progress(self):
+        """Save player progress through the save backend"""
+        try:
+            with METRICS.timed("save_seconds"):
+                self.backend.save(self.to_dict())
         except Exception as e:
-            print(f"Warning: Could not save progress: {e}")
+            METRICS.incr("save_errors_total")
+            self.notify(f"Warning: Could not save progress: {e}")
     
     def load_progress(self):
-        """Load player progress from JSON file"""
+        """Load player progress through the save backend"""
         try:
-            if os.path.exists(self.save_file):
-                with open(self.save_file, 'r') as f:
-                    save_data = json.load(f)
+            with METRICS.timed("load_seconds"):
+                save_data = self.backend.load()
+            if save_data is not None:
+                with self._lock:
+                    self.experience = save_data.get("experience", 0)
+                    self.completed_challenges = dict.fromkeys(save_data.get("completed_challenges", []))
+                    self.failed_challenges = dict(save_data.get("failed_challenges", {}))
+                    self.mastery = {topic: dict(stats) for topic, stats in save_data.get("mastery", {}).items()}
+                    self.practice_completed = dict.fromkeys(save_data.get("practice_completed", []))
+                    self.current_story = save_data.get("current_story", "intro")
+                    self.current_scene = save_data.get("current_scene", 0)
+                    self.inventory = save_data.get("inventory", [])
+                    self.achievements = dict.fromkeys(save_data.get("achievements", []))
+                    self.progress_version += 1
                 
-                self.experience = save_data.get("experience", 0)
-                self.completed_challenges = save_data.get("completed_challenges", [])
-                self.current_story = save_data.get("current_story", "intro")
-                self.current_scene = save_data.get("current_scene", 0)
-                self.inventory = save_data.get("inventory", [])
-                self.achievements = save_data.get("achievements", [])
-                
-                print(f"📂 Progress loaded: Level {self.get_level()}, {self.experience} XP")
+                self.notify(f"📂 Progress loaded: Level {self.get_level()}, {self.experience} XP")
             else:
-                print("🆕 Starting new adventure!")
+                self.notify("🆕 Starting new adventure!")
                 
         except Exception as e:
-            print(f"Warning: Could not load progress: {e}")
-            print("🆕 Starting new adventure!")
+            self.notify(f"Warning: Could not load progress: {e}")
+            self.notify("🆕 Starting new adventure!")
     
     def reset_progress(self):
         """Reset all player progress"""
-        self.experience = 0
-        self.completed_challenges = []
-        self.current_story = "intro"
-        self.current_scene = 0
-        self.inventory = []
-        self.achievements = []
+        with self._lock:
+            self.experience = 0
+            self.completed_challenges = {}
+            self.failed_challenges = {}
+            self.mastery = {}
+            self.practice_completed = {}
+            self.current_story = "intro"
+            self.current_scene = 0
+            self.inventory = []
+            self.achievements = {}
+            self.progress_version += 1
         
         # Remove save file
-        if os.path.exists(self.save_file):
-            os.remove(self.save_file)
+        self.saver.discard()
+        self.backend.delete()
         
-        print("🔄 Progress reset successfully!")
+        self.notify("🔄 Progress reset successfully!")
     
     def show_status(self):
         """Display current player status"""
-        print("\n" + "="*40)
-        print("PLAYER STATUS")
-        print("="*40)
-        print(f"Level: {self.get_level()}")
-        print(f"Experience: {self.experience} XP")
-        print(f"Current Story: {self.current_story}")
-        print(f"Current Scene: {self.current_scene}")
-        print(f"Challenges Completed: {len(self.completed_challenges)}")
-        print(f"Inventory Items: {len(self.inventory)}")
-        print(f"Achievements: {len(self.achievements)}")
+        self.notify("\n" + "="*40)
+        self.notify("PLAYER STATUS")
+        self.notify("="*40)
+        self.notify(f"Level: {self.get_level()}")
+        self.notify(f"Experience: {self.experience} XP")
+        self.notify(f"Current Story: {self.current_story}")
+        self.notify(f"Current Scene: {self.current_scene}")
+        self.notify(f"Challenges Completed: {len(self.completed_challenges)}")
+        self.notify(f"Inventory Items: {len(self.inventory)}")
+        self.notify(f"Achievements: {len(self.achievements)}")
         
         if self.inventory:
-            print(f"Inventory: {', '.join(self.inventory)}")
+            self.notify(f"Inventory: {', '.join(self.inventory)}")
         
         if self.achievements:
-            print(f"Achievements: {', '.join(self.achievements)}")
+            self.notify(f"Achievements: {', '.join(self.achievements)}")
         
-        print("="*40)
\ No newline at end of file
+        self.notify("="*40)
\ No newline at end of file
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Scene rendering for PyAdventure
+Builds each scene's text once per terminal width, word-wrapped, and keeps
+it, so showing a scene again is a cache lookup and one write
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+SEPARATOR_WIDTH = 50
+DEFAULT_WIDTH = 80
+# Continuation lines of a wrapped choice line up under its text
+CHOICE_INDENT = "   "
+
+
+_terminal_fd: Optional[int] = None
+_terminal_checked = False
+
+
+def terminal_width() -> int:
+    """Columns of the terminal, honouring $COLUMNS; DEFAULT_WIDTH when not on a terminal"""
+    # What shutil.get_terminal_size does, without importing shutil's
+    # compression modules at startup
+    global _terminal_fd, _terminal_checked
+    try:
+        columns = int(os.environ.get("COLUMNS", 0))
+    except ValueError:
+        columns = 0
+    if columns > 0:
+        return columns
+
+    if not _terminal_checked:
+        # Asked every turn, so find out once whether there is a terminal at all
+        try:
+            if sys.__stdout__.isatty():
+                _terminal_fd = sys.__stdout__.fileno()
+        except (AttributeError, ValueError, OSError):
+            pass
+        _terminal_checked = True
+    if _terminal_fd is not None:
+        try:
+            columns = os.get_terminal_size(_terminal_fd).columns
+        except OSError:
+            columns = 0
+    return columns or DEFAULT_WIDTH
+
+
+def wrap_text(text: str, width: int, indent: str = "") -> List[str]:
+    """
+    Word-wrap text to width, keeping its line breaks
+
+    Lines that already fit, including indented ones, are kept as they are.
+    """
+    lines = []
+    for line in text.split("\n"):
+        if len(line) <= width:
+            lines.append(line)
+            continue
+        import textwrap
+        lines.extend(textwrap.wrap(line, width, subsequent_indent=indent, break_on_hyphens=False) or [""])
+    return lines
+
+
+class SceneRenderer:
+    """
+    Renders and caches the text blocks a turn shows: a scene, its choices,
+    its challenge prompt
+
+    Blocks are cached by the identity of the (read-only) scene data and the
+    width, and each entry holds on to its data so the identity can't be
+    reused while cached. One renderer can be shared by many games.
+    """
+
+    def __init__(self, width: Optional[int] = None, cache_size: int = 256):
+        """
+        Args:
+            width: Fixed output width, or None to follow the terminal
+            cache_size: Number of rendered blocks to keep
+        """
+        self.width = width
+        self.cache_size = cache_size
+        self._blocks: "OrderedDict[Tuple[str, int, int], Tuple[Any, str]]" = OrderedDict()
+        # Games on several threads (server sessions) share a renderer
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "renders": 0}
+
+    def current_width(self) -> int:
+        """Width to render at now; the terminal may have been resized since the last turn"""
+        if self.width is not None:
+            return self.width
+        return terminal_width()
+
+    def scene(self, scene: Any) -> str:
+        """The scene's title, description and code example"""
+        return self._cached("scene", scene, self._render_scene)
+
+    def choices(self, choices: Sequence[Any]) -> str:
+        """The numbered list of a scene's choices"""
+        return self._cached("choices", choices, self._render_choices)
+
+    def challenge(self, challenge: Any) -> str:
+        """A challenge's prompt and hint"""
+        return self._cached("challenge", challenge, self._render_challenge)
+
+    def clear(self):
+        """Forget every rendered block"""
+        with self._lock:
+            self._blocks.clear()
+
+    def _cached(self, kind: str, data: Any, render) -> str:
+        width = self.current_width()
+        key = (kind, id(data), width)
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None and entry[0] is data:
+                self._blocks.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+
+        text = render(data, max(20, width - 1))
+        with self._lock:
+            self.stats["renders"] += 1
+            self._blocks[key] = (data, text)
+            self._blocks.move_to_end(key)
+            if len(self._blocks) > self.cache_size:
+                self._blocks.popitem(last=False)
+        return text
+
+    @staticmethod
+    def _render_scene(scene: Any, width: int) -> str:
+        separator = "=" * min(SEPARATOR_WIDTH, width)
+        lines = ["", separator]
+        lines.extend(wrap_text(scene.get("title", "Unknown Scene"), width))
+        lines.append(separator)
+        lines.extend(wrap_text(scene.get("description", ""), width))
+        if scene.get("code_example"):
+            # Code keeps its own line breaks
+            lines.extend(["", "Code Example:", scene["code_example"]])
+        return "\n".join(lines)
+
+    @staticmethod
+    def _render_choices(choices: Sequence[Any], width: int) -> str:
+        lines = ["", "What do you choose?"]
+        for i, choice in enumerate(choices, 1):
+            lines.extend(wrap_text(f"{i}. {choice['text']}", width, CHOICE_INDENT))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _render_challenge(challenge: Any, width: int) -> str:
+        lines = [""]
+        lines.extend(wrap_text(f"Challenge: {challenge.get('prompt', 'No prompt provided')}", width))
+        if challenge.get("hint"):
+            lines.extend(wrap_text(f"Hint: {challenge['hint']}", width))
+        return "\n".join(lines)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Sandboxed execution backend for PyAdventure
+Runs challenge submissions in a pool of pre-warmed worker processes with
+wall-clock, CPU and memory limits
+"""
+
+import marshal
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from types import CodeType
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
+
+from output_match import Expectation, OutputCapture, OutputMismatch, make_matcher
+from story_loader import thaw
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _apply_memory_limit(memory_mb: int):
+    """Cap the worker's address space"""
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _apply_cpu_limit(cpu_time: int):
+    """Allow the worker cpu_time more seconds of CPU before SIGXCPU kills it"""
+    if resource is None or not cpu_time:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_time
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _load_code(payload: Union[str, bytes]) -> Union[CodeType, Dict[str, Any]]:
+    """Turn a job's payload into a code object, or a syntax_error outcome"""
+    if isinstance(payload, bytes):
+        # Already compiled by the parent's CompileCache
+        return marshal.loads(payload)
+    try:
+        return compile(payload, "<string>", "exec")
+    except SyntaxError as e:
+        return {"status": "syntax_error", "output": None, "error": str(e), "mismatch": None}
+
+
+def _execute(payload: Union[str, bytes], inputs: Optional[Dict[str, Any]],
+             expected: Optional[Expectation] = None) -> Dict[str, Any]:
+    """Run one submission inside a worker and describe the outcome"""
+    from challenges import execution_globals
+
+    code = _load_code(payload)
+    if not isinstance(code, CodeType):
+        return code
+
+    # Compare output as it is printed when the expected output is known
+    output_buffer = OutputCapture() if expected is None else make_matcher(expected)
+    try:
+        exec(code, execution_globals(output_buffer, inputs))
+    except OutputMismatch:
+        pass
+    except MemoryError:
+        return {"status": "error", "output": None, "error": "Memory limit exceeded", "mismatch": None}
+    except Exception as e:
+        return {"status": "error", "output": None, "error": str(e), "mismatch": None}
+
+    if expected is None:
+        return {"status": "ok", "output": output_buffer.output, "error": None, "mismatch": None}
+    mismatch = output_buffer.finish()
+    return {"status": "ok", "output": output_buffer.output, "error": None, "mismatch": mismatch}
+
+
+def _execute_table(payload: Union[str, bytes], names: List[str], rows: List[List[Any]],
+                   expected_list: List[Expectation]) -> Dict[str, Any]:
+    """Run one submission over a whole parameter table inside a worker"""
+    from challenges import run_parameter_table
+
+    code = _load_code(payload)
+    if not isinstance(code, CodeType):
+        return code
+    cases = run_parameter_table(code, names, rows, expected_list)
+    return {"status": "ok", "output": None, "error": None, "mismatch": None, "cases": cases}
+
+
+def _worker_main(conn, cpu_time: int, memory_mb: int):
+    """Worker process loop: receive jobs, execute them, send back outcomes"""
+    _apply_memory_limit(memory_mb)
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        handler, args = job
+        _apply_cpu_limit(cpu_time)
+        try:
+            outcome = handler(*args)
+        except MemoryError:
+            outcome = {"status": "error", "output": None, "error": "Memory limit exceeded", "mismatch": None}
+        conn.send(outcome)
+
+
+class _Worker:
+    """A single sandbox worker process and its pipe"""
+
+    def __init__(self, context, cpu_time: int, memory_mb: int):
+        self.context = context
+        self.cpu_time = cpu_time
+        self.memory_mb = memory_mb
+        self.process = None
+        self.conn = None
+        self.spawn()
+
+    def spawn(self):
+        """Start a fresh worker process"""
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(child_conn, self.cpu_time, self.memory_mb),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def kill(self):
+        """Terminate the worker process"""
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+    def respawn(self):
+        """Replace a runaway or crashed worker with a fresh one"""
+        self.kill()
+        self.spawn()
+
+
+class SandboxPool:
+    """Pool of pre-warmed worker processes for running untrusted submissions"""
+
+    def __init__(self, workers: int = None, wall_time: float = 2.0,
+                 cpu_time: int = 2, memory_mb: int = 256):
+        self.size = workers or min(4, os.cpu_count() or 1)
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.memory_mb = memory_mb
+        # Workers are respawned at arbitrary times; forking the game process
+        # then would leak its open files and sockets into the new worker
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context("forkserver")
+        else:
+            self._context = multiprocessing.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._all: List[_Worker] = []
+        self._condition = threading.Condition()
+        self._started = False
+
+    def start(self):
+        """Spawn the worker processes so they are warm before the first submission"""
+        with self._condition:
+            if self._started:
+                return
+            for _ in range(self.size):
+                worker = _Worker(self._context, self.cpu_time, self.memory_mb)
+                self._all.append(worker)
+                self._idle.append(worker)
+            self._started = True
+
+    def close(self):
+        """Shut down all worker processes"""
+        with self._condition:
+            for worker in self._all:
+                try:
+                    worker.conn.send(None)
+                except (OSError, ValueError):
+                    pass
+                worker.kill()
+            self._all = []
+            self._idle = []
+            self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, source: Union[str, CodeType], inputs: Dict[str, Any] = None,
+            expected: Expectation = None) -> Dict[str, Any]:
+        """Run a submission once and return its outcome"""
+        return self.run_many(source, [inputs], [expected])[0]
+
+    def run_many(self, source: Union[str, CodeType], inputs_list: List[Optional[Dict[str, Any]]],
+                 expected_list: List[Optional[Expectation]] = None) -> List[Dict[str, Any]]:
+        """
+        Run a submission once per input set, spread across idle workers
+
+        `source` may be source text or a code object; code objects are
+        marshalled once and never recompiled by the workers. When an
+        expected output (or fingerprint) is given for an input set, the
+        worker compares output as it is printed and stops the submission
+        once it can no longer match. Inputs may be frozen story data;
+        they are copied into plain dicts and lists, which can be pickled
+        to a worker.
+
+        Returns:
+            One outcome dict per input set, in order. Each has a status of
+            'ok', 'syntax_error', 'error', 'timeout' or 'crashed', plus the
+            stripped output, an error message, and the output Mismatch (None
+            if the output matched or nothing was expected).
+        """
+        if not inputs_list:
+            return []
+        if expected_list is None:
+            expected_list = [None] * len(inputs_list)
+
+        payload = self._payload(source)
+        return self._dispatch([(_execute, (payload, thaw(inputs), expected))
+                               for inputs, expected in zip(inputs_list, expected_list)])
+
+    def run_table(self, source: Union[str, CodeType], names: List[str], rows: List[List[Any]],
+                  expected_list: List[Expectation]) -> Dict[str, Any]:
+        """
+        Run a submission over a parameter table as one job in one worker
+
+        The worker reuses the loaded code and one environment for every row
+        (see challenges.run_parameter_table). The wall-clock and CPU limits
+        apply to the whole table. Rows may be frozen, as for run_many().
+
+        Returns:
+            An outcome dict as for run(); when its status is 'ok' it also
+            has 'cases', one outcome per row.
+        """
+        return self._dispatch([(_execute_table, (self._payload(source), names, thaw(rows), expected_list))])[0]
+
+    @staticmethod
+    def _payload(source: Union[str, CodeType]) -> Union[str, bytes]:
+        """Code objects travel to workers marshalled; source text as is"""
+        return marshal.dumps(source) if isinstance(source, CodeType) else source
+
+    def _dispatch(self, jobs: List[Tuple[Callable, tuple]]) -> List[Dict[str, Any]]:
+        """Run (handler, args) jobs across idle workers, enforcing the wall-clock limit"""
+        workers = self._acquire(len(jobs))
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        pending = deque(enumerate(jobs))
+        idle = list(workers)
+        busy = {}
+
+        try:
+            while pending or busy:
+                while pending and idle:
+                    index, job = pending.popleft()
+                    worker = idle.pop()
+                    try:
+                        worker.conn.send(job)
+                    except (OSError, ValueError):
+                        worker.respawn()
+                        worker.conn.send(job)
+                    busy[worker.conn] = (worker, index, time.monotonic() + self.wall_time)
+
+                timeout = max(0.0, min(deadline for _, _, deadline in busy.values()) - time.monotonic())
+                for conn in wait(list(busy), timeout=timeout):
+                    worker, index, _ = busy.pop(conn)
+                    try:
+                        results[index] = conn.recv()
+                    except (EOFError, OSError):
+                        results[index] = self._crashed_outcome(worker)
+                        worker.respawn()
+                    idle.append(worker)
+
+                now = time.monotonic()
+                for conn, (worker, index, deadline) in list(busy.items()):
+                    if now >= deadline:
+                        del busy[conn]
+                        results[index] = {
+                            "status": "timeout",
+                            "output": None,
+                            "error": f"Time limit exceeded ({self.wall_time:g}s)",
+                            "mismatch": None
+                        }
+                        worker.respawn()
+                        idle.append(worker)
+        finally:
+            for worker, _, _ in busy.values():
+                worker.respawn()
+            self._release(workers)
+
+        return results
+
+    def _crashed_outcome(self, worker: _Worker) -> Dict[str, Any]:
+        """Describe why a worker died mid-job"""
+        worker.process.join(timeout=1)
+        exitcode = worker.process.exitcode
+        if exitcode is not None and -exitcode == getattr(signal, "SIGXCPU", None):
+            error = f"CPU time limit exceeded ({self.cpu_time}s)"
+        else:
+            error = f"Execution aborted (worker exit code {exitcode})"
+        return {"status": "crashed", "output": None, "error": error, "mismatch": None}
+
+    def _acquire(self, wanted: int) -> List[_Worker]:
+        """Check out at least one and at most `wanted` idle workers"""
+        self.start()
+        with self._condition:
+            while not self._idle:
+                self._condition.wait()
+            count = min(wanted, len(self._idle))
+            workers = self._idle[-count:]
+            del self._idle[-count:]
+            return workers
+
+    def _release(self, workers: List[_Worker]):
+        """Return workers to the idle list"""
+        with self._condition:
+            if not self._started:
+                for worker in workers:
+                    worker.kill()
+                return
+            self._idle.extend(workers)
+            self._condition.notify_all()
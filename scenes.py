@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Typed scene records for PyAdventure
+Compact, read-only, slotted classes for scenes, choices and challenges that
+still read like the JSON dicts they come from (get, [], in, iteration)
+"""
+
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, FrozenSet, Iterator, Optional, Tuple
+
+from story_loader import freeze, thaw
+
+
+class _Missing:
+    """Marks a field the source JSON did not have"""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<missing>"
+
+
+_MISSING = _Missing()
+
+
+class _Record(Mapping):
+    """
+    Base for slotted, read-only records built from JSON objects
+
+    Known keys live in slots; any others are kept in a read-only mapping,
+    so nothing from the story file is lost. Records compare equal to the
+    dicts they were built from.
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS: Tuple[str, ...] = ()
+    _field_set: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+
+    def __init__(self, data: Mapping):
+        set_field = object.__setattr__
+        for field in self.FIELDS:
+            value = data.get(field, _MISSING)
+            set_field(self, field, _MISSING if value is _MISSING else self._convert(field, value))
+        extra = {key: freeze(value) for key, value in data.items() if key not in self._field_set}
+        set_field(self, "_extra", MappingProxyType(extra) if extra else None)
+
+    @classmethod
+    def _convert(cls, field: str, value: Any) -> Any:
+        """Turn a field's JSON value into its stored form"""
+        return freeze(value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        # Frozen lists are tuples, so compare as plain JSON data
+        return thaw(self) == thaw(other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return type(self), (thaw(self),)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class Choice(_Record):
+    """One option of a choice scene"""
+
+    __slots__ = ("text", "next_scene")
+    FIELDS = __slots__
+
+
+class Challenge(_Record):
+    """A coding challenge; test cases and parameter tables stay frozen JSON"""
+
+    __slots__ = ("prompt", "expected_output", "hint", "test_cases", "parameters")
+    FIELDS = __slots__
+
+
+class Scene(_Record):
+    """One story scene, with its choices and challenge as records"""
+
+    __slots__ = ("id", "title", "description", "type", "code_example", "choices", "challenge")
+    FIELDS = __slots__
+
+    @classmethod
+    def _convert(cls, field: str, value: Any) -> Any:
+        if field == "choices" and isinstance(value, (list, tuple)):
+            return tuple(Choice(choice) if isinstance(choice, Mapping) else freeze(choice) for choice in value)
+        if field == "challenge" and isinstance(value, Mapping):
+            return Challenge(value)
+        return freeze(value)
+
+
+def as_scene(data: Optional[Mapping]) -> Optional[Scene]:
+    """Build a Scene from scene JSON, passing through None and existing Scenes"""
+    if data is None or isinstance(data, Scene):
+        return data
+    return Scene(data)
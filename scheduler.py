@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Adaptive challenge scheduling for PyAdventure
+Tracks each player's mastery of every challenge topic and picks the next
+challenge from a large bank at the difficulty the player is most likely
+to learn from
+
+Topics are the challenge categories in challenges.HINTS. Mastery is an
+Elo-style rating per topic on the same 0-1000 scale as challenge
+difficulty, moved up by passes and down by failures, weighted by how
+surprising the result was.
+
+The bank stores only a sorted difficulty table per topic; a challenge's
+prompt, solution and expected output are generated from its bank position
+when it is picked, so the bank can hold millions of challenges and a pick
+is a binary search plus one generation. A player's completed challenges
+are skipped through links over their positions, so they don't slow picks
+down however many there are.
+"""
+
+import argparse
+import heapq
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import weakref
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from challenges import HINTS
+
+TOPICS = tuple(HINTS)
+MAX_DIFFICULTY = 1000
+# Ratings this far apart give the stronger side a 10:1 expected edge
+RATING_SCALE = 200
+INITIAL_RATING = 100
+# How far one result can move a rating; more while the rating is still provisional
+RATING_STEP = 32
+PROVISIONAL_STEP = 160
+PROVISIONAL_ATTEMPTS = 10
+# Each attempt at a topic counts this much against practising it again,
+# so the weakest topic gets the most practice without getting all of it
+PRACTICE_WEIGHT = 15
+# Pick challenges the player is expected to pass this often
+TARGET_SUCCESS = 0.7
+
+WORDS = ("python", "dragon", "castle", "forest", "quest", "magic", "river", "valley",
+         "wizard", "scroll", "lantern", "bridge", "crystal", "shadow", "garden", "tower")
+VARIABLE_NAMES = ("gold", "gems", "arrows", "potions", "keys", "coins", "scrolls", "maps")
+
+
+def expected_success(rating: float, difficulty: float) -> float:
+    """Chance a player of this rating passes a challenge of this difficulty"""
+    return 1 / (1 + 10 ** ((difficulty - rating) / RATING_SCALE))
+
+
+def rating_step(attempts: int) -> float:
+    """How far the next result moves a rating with this many attempts behind it"""
+    if attempts >= PROVISIONAL_ATTEMPTS:
+        return RATING_STEP
+    return PROVISIONAL_STEP - (PROVISIONAL_STEP - RATING_STEP) * attempts / PROVISIONAL_ATTEMPTS
+
+
+def target_difficulty(rating: float, success: float = TARGET_SUCCESS) -> int:
+    """The difficulty a player of this rating passes with the given chance"""
+    difficulty = rating - RATING_SCALE * math.log10(success / (1 - success))
+    return min(MAX_DIFFICULTY, max(0, round(difficulty)))
+
+
+# Challenge generators: generator(rng, level) -> (prompt, solution, expected output),
+# where level runs from 0 (easiest) to 1 (hardest)
+
+def _phrase(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _print_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    message = _phrase(rng, 1 + int(level * 5)) + "!"
+    repeat = 1 + int(level * 3)
+    if repeat == 1:
+        return f"Print the message '{message}'", f"print({message!r})", message
+    return (f"Print the message '{message}' {repeat} times, each on its own line",
+            f"for _ in range({repeat}):\n    print({message!r})",
+            "\n".join([message] * repeat))
+
+
+def _variable_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    names = rng.sample(VARIABLE_NAMES, 2 + int(level * 3))
+    values = [rng.randint(1, 10 + int(level * 90)) for _ in names]
+    assignments = [f"{name} = {value}" for name, value in zip(names, values)]
+    prompt = f"Create the variables {', '.join(assignments)}, then print their total"
+    solution = "\n".join(assignments + [f"print({' + '.join(names)})"])
+    return prompt, solution, str(sum(values))
+
+
+def _string_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    word = rng.choice(WORDS)
+    kind = min(5, int(level * 6))
+    if kind == 0:
+        return f"Print the word '{word}' in capital letters", f"print({word!r}.upper())", word.upper()
+    if kind == 1:
+        return f"Print how many letters are in the word '{word}'", f"print(len({word!r}))", str(len(word))
+    if kind == 2:
+        return f"Print the word '{word}' backwards", f"print({word!r}[::-1])", word[::-1]
+    if kind == 3:
+        count = rng.randint(2, len(word) - 1)
+        return f"Print the first {count} letters of '{word}'", f"print({word!r}[:{count}])", word[:count]
+    phrase = _phrase(rng, 3).lower()
+    if kind == 4:
+        letter = rng.choice(phrase.replace(" ", ""))
+        return (f"Print how many times the letter '{letter}' appears in '{phrase}'",
+                f"print({phrase!r}.count({letter!r}))", str(phrase.count(letter)))
+    return (f"Print '{phrase}' with every word capitalized",
+            f"print({phrase!r}.title())", phrase.title())
+
+
+def _number_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    operators = "+" if level < 0.3 else "+-" if level < 0.6 else "+-*"
+    values = [rng.randint(1, 10 + int(level * 90)) for _ in range(2 + int(level * 3))]
+    expression = str(values[0])
+    for value in values[1:]:
+        expression += f" {rng.choice(operators)} {value}"
+    # Only digits and + - * from above, so evaluating it is safe
+    result = eval(compile(expression, "<challenge>", "eval"), {"__builtins__": {}})
+    return f"Calculate {expression} and print the result", f"print({expression})", str(result)
+
+
+def _list_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    numbers = [rng.randint(1, 50) for _ in range(3 + int(level * 9))]
+    kind = min(3, int(level * 4))
+    if kind == 0:
+        return f"Print the sum of the list {numbers}", f"numbers = {numbers}\nprint(sum(numbers))", str(sum(numbers))
+    if kind == 1:
+        return (f"Print the largest number in the list {numbers}",
+                f"numbers = {numbers}\nprint(max(numbers))", str(max(numbers)))
+    if kind == 2:
+        return (f"Print the list {numbers} sorted from smallest to largest",
+                f"numbers = {numbers}\nprint(sorted(numbers))", str(sorted(numbers)))
+    evens = [number for number in numbers if number % 2 == 0]
+    return (f"Print a list of only the even numbers in {numbers}",
+            f"numbers = {numbers}\nprint([n for n in numbers if n % 2 == 0])", str(evens))
+
+
+def _function_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    kind = min(3, int(level * 4))
+    if kind == 0:
+        message = _phrase(rng, 2) + "!"
+        return (f"Define a function called greet that prints '{message}', then call it",
+                f"def greet():\n    print({message!r})\ngreet()", message)
+    if kind == 1:
+        factor, value = rng.randint(2, 9), rng.randint(1, 50)
+        return (f"Define a function called scale(n) that returns n * {factor}, then print scale({value})",
+                f"def scale(n):\n    return n * {factor}\nprint(scale({value}))", str(factor * value))
+    if kind == 2:
+        width, height = rng.randint(2, 30), rng.randint(2, 30)
+        return (f"Define a function called area(width, height) that returns their product, "
+                f"then print area({width}, {height})",
+                f"def area(width, height):\n    return width * height\nprint(area({width}, {height}))",
+                str(width * height))
+    value = rng.randint(3, 10)
+    return (f"Define a function called factorial(n) that returns n! (1 * 2 * ... * n), "
+            f"then print factorial({value})",
+            f"def factorial(n):\n    return 1 if n <= 1 else n * factorial(n - 1)\nprint(factorial({value}))",
+            str(math.factorial(value)))
+
+
+def _loop_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    step = 1 if level < 0.4 else rng.randint(2, 5)
+    start = rng.randint(0, 10)
+    last = start + step * (2 + int(level * 8))
+    prompt = f"Use a for loop to print the numbers from {start} to {last}, one per line"
+    if step > 1:
+        prompt += f", counting by {step}"
+    return (prompt, f"for i in range({start}, {last + 1}, {step}):\n    print(i)",
+            "\n".join(str(i) for i in range(start, last + 1, step)))
+
+
+def _conditional_challenge(rng: random.Random, level: float) -> Tuple[str, str, str]:
+    if level < 0.5:
+        value = rng.randint(1, 100)
+        return (f"Set x = {value}. Print 'even' if x is even, otherwise print 'odd'",
+                f"x = {value}\nif x % 2 == 0:\n    print('even')\nelse:\n    print('odd')",
+                "even" if value % 2 == 0 else "odd")
+    if level < 0.8:
+        score = rng.randint(50, 100)
+        grade = "A" if score >= 90 else "B" if score >= 80 else "C"
+        return (f"Set score = {score}. Print 'A' if score is at least 90, 'B' if it is at least 80, "
+                f"otherwise print 'C'",
+                f"score = {score}\nif score >= 90:\n    print('A')\nelif score >= 80:\n    print('B')\n"
+                f"else:\n    print('C')",
+                grade)
+    limit = 10 + int(level * 10)
+    lines = ["FizzBuzz" if i % 15 == 0 else "Fizz" if i % 3 == 0 else "Buzz" if i % 5 == 0 else str(i)
+             for i in range(1, limit + 1)]
+    return (f"For each number from 1 to {limit}, print 'Fizz' if it is divisible by 3, 'Buzz' if by 5, "
+            f"'FizzBuzz' if by both, otherwise the number",
+            f"for i in range(1, {limit + 1}):\n    if i % 15 == 0:\n        print('FizzBuzz')\n"
+            f"    elif i % 3 == 0:\n        print('Fizz')\n    elif i % 5 == 0:\n        print('Buzz')\n"
+            f"    else:\n        print(i)",
+            "\n".join(lines))
+
+
+GENERATORS: Dict[str, Callable[[random.Random, float], Tuple[str, str, str]]] = {
+    "variable": _variable_challenge,
+    "print": _print_challenge,
+    "string": _string_challenge,
+    "number": _number_challenge,
+    "list": _list_challenge,
+    "function": _function_challenge,
+    "loop": _loop_challenge,
+    "conditional": _conditional_challenge
+}
+
+
+class CompletedPositions:
+    """
+    The positions of one topic's difficulty table a player has completed
+
+    Each completed position links to its neighbour on either side, and
+    lookups follow the links to the nearest open position, shortening them
+    as they go (as in a union-find), so skipping any run of completed
+    challenges costs near-constant time.
+    """
+
+    def __init__(self):
+        self._up: Dict[int, int] = {}
+        self._down: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._up)
+
+    def __contains__(self, position: int) -> bool:
+        return position in self._up
+
+    def add(self, position: int):
+        """Mark a position completed"""
+        self._up[position] = position + 1
+        self._down[position] = position - 1
+
+    def open_above(self, position: int) -> int:
+        """The first open position at or above position (may be past the end of the table)"""
+        return self._follow(self._up, position)
+
+    def open_below(self, position: int) -> int:
+        """The first open position at or below position (may be -1)"""
+        return self._follow(self._down, position)
+
+    @staticmethod
+    def _follow(links: Dict[int, int], position: int) -> int:
+        end = position
+        while end in links:
+            end = links[end]
+        while position != end:
+            links[position], position = end, links[position]
+        return end
+
+
+class ChallengeBank:
+    """
+    Generated challenges for every topic, indexed by difficulty
+
+    Challenge n of a topic always has the same difficulty and content for a
+    given seed, however large the bank, so its ID stays valid as the bank
+    grows.
+    """
+
+    def __init__(self, per_topic: int = 10000, seed: int = 0):
+        self.per_topic = per_topic
+        self.seed = seed
+        # Topic -> difficulties in ascending order, and the challenge number at each position
+        self._difficulties: Dict[str, array] = {}
+        self._numbers: Dict[str, array] = {}
+        for topic in TOPICS:
+            rng = random.Random(f"{seed}:{topic}")
+            order = sorted((rng.randint(0, MAX_DIFFICULTY), n) for n in range(per_topic))
+            self._difficulties[topic] = array('H', (difficulty for difficulty, _ in order))
+            self._numbers[topic] = array('I', (n for _, n in order))
+        # Topic -> position of each challenge number, built when first needed
+        self._positions: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return self.per_topic * len(TOPICS)
+
+    def challenge_id(self, topic: str, number: int) -> str:
+        """Stable ID of a bank challenge"""
+        return f"bank-{self.seed}-{topic}-{number}"
+
+    def parse_id(self, challenge_id: str) -> Optional[Tuple[str, int]]:
+        """The (topic, number) of one of this bank's challenge IDs, or None for any other ID"""
+        prefix = f"bank-{self.seed}-"
+        if not isinstance(challenge_id, str) or not challenge_id.startswith(prefix):
+            return None
+        topic, _, number = challenge_id[len(prefix):].rpartition("-")
+        if topic not in self._numbers or not number.isdigit() or int(number) >= self.per_topic:
+            return None
+        return topic, int(number)
+
+    def position_of(self, topic: str, number: int) -> int:
+        """Where a challenge number sits in its topic's difficulty table"""
+        positions = self._positions.get(topic)
+        if positions is None:
+            positions = array('I', [0]) * self.per_topic
+            for position, n in enumerate(self._numbers[topic]):
+                positions[n] = position
+            self._positions[topic] = positions
+        return positions[number]
+
+    def challenge(self, topic: str, position: int) -> Dict[str, Any]:
+        """Generate the challenge at a position of a topic's difficulty table"""
+        difficulty = self._difficulties[topic][position]
+        number = self._numbers[topic][position]
+        rng = random.Random(f"{self.seed}:{topic}:{number}")
+        prompt, solution, expected_output = GENERATORS[topic](rng, difficulty / MAX_DIFFICULTY)
+        return {
+            "id": self.challenge_id(topic, number),
+            "topic": topic,
+            "difficulty": difficulty,
+            "prompt": prompt,
+            "expected_output": expected_output,
+            "hint": HINTS[topic],
+            "solution": solution
+        }
+
+    def nearest(self, topic: str, difficulty: int,
+                completed: CompletedPositions = None) -> Optional[Dict[str, Any]]:
+        """
+        The challenge closest in difficulty whose position is not completed
+
+        Binary search finds the position; the completed positions' links
+        then give the nearest open one on each side.
+
+        Returns:
+            None if every challenge of the topic is completed
+        """
+        difficulties = self._difficulties[topic]
+        above = bisect_left(difficulties, difficulty)
+        below = above - 1
+        if completed is not None:
+            above = completed.open_above(above)
+            below = completed.open_below(below)
+        if above < len(difficulties) and (below < 0 or
+                                          difficulties[above] - difficulty <= difficulty - difficulties[below]):
+            return self.challenge(topic, above)
+        if below >= 0:
+            return self.challenge(topic, below)
+        return None
+
+
+class MasteryQueue:
+    """
+    One player's topics in a heap, the one most in need of practice first
+
+    A topic's priority is its rating plus PRACTICE_WEIGHT per attempt.
+    Updates push a new entry and leave the old one to be skipped when it
+    reaches the top, so both are O(log topics).
+    """
+
+    def __init__(self, mastery: Dict[str, Dict[str, int]]):
+        self._current: Dict[str, Tuple[int, int, str]] = {}
+        for topic in TOPICS:
+            stats = mastery.get(topic, {})
+            self._current[topic] = self._entry(topic, stats.get("rating", INITIAL_RATING), stats.get("attempts", 0))
+        self._heap = list(self._current.values())
+        heapq.heapify(self._heap)
+
+    @staticmethod
+    def _entry(topic: str, rating: int, attempts: int) -> Tuple[int, int, str]:
+        return rating + PRACTICE_WEIGHT * attempts, attempts, topic
+
+    def weakest(self) -> str:
+        """The topic to practise next; ties go to the least practised"""
+        while self._heap[0] != self._current[self._heap[0][2]]:
+            heapq.heappop(self._heap)
+        return self._heap[0][2]
+
+    def update(self, topic: str, rating: int, attempts: int):
+        """Reorder a topic after its mastery changed"""
+        entry = self._entry(topic, rating, attempts)
+        self._current[topic] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 4 * len(self._current):
+            # Drop the stale entries before they pile up
+            self._heap = list(self._current.values())
+            heapq.heapify(self._heap)
+
+
+class _PlayerState:
+    """A player's mastery queue and completed bank positions, kept by the scheduler"""
+
+    def __init__(self, bank: ChallengeBank, player):
+        self.version = getattr(player, "progress_version", 0)
+        self.queue = MasteryQueue(player.mastery)
+        self.completed: Dict[str, CompletedPositions] = {topic: CompletedPositions() for topic in TOPICS}
+        for challenge_id in player.practice_completed:
+            parsed = bank.parse_id(challenge_id)
+            if parsed is not None:
+                topic, number = parsed
+                self.completed[topic].add(bank.position_of(topic, number))
+
+
+class ChallengeScheduler:
+    """Picks each player's next challenge from the bank and updates mastery from the result"""
+
+    def __init__(self, bank: ChallengeBank = None, target_success: float = TARGET_SUCCESS):
+        self.bank = bank or ChallengeBank()
+        self.target_success = target_success
+        # Built from a player's save on first use, kept in step by record_result,
+        # and rebuilt when the player's progress is reloaded or reset
+        self._players: "weakref.WeakKeyDictionary[Any, _PlayerState]" = weakref.WeakKeyDictionary()
+
+    def _state(self, player) -> _PlayerState:
+        state = self._players.get(player)
+        if state is None or state.version != getattr(player, "progress_version", 0):
+            state = self._players[player] = _PlayerState(self.bank, player)
+        return state
+
+    def forget(self, player):
+        """Drop what is kept for a player; it is rebuilt from their progress when next needed"""
+        self._players.pop(player, None)
+
+    def next_challenge(self, player, topic: str = None) -> Optional[Dict[str, Any]]:
+        """
+        The challenge the player should try next
+
+        Args:
+            player: Player whose mastery and passed practice challenges guide the pick
+            topic: Topic to practise; defaults to the player's weakest
+
+        Returns:
+            None if the player has completed every challenge of the topic
+        """
+        state = self._state(player)
+        if topic is None:
+            topic = state.queue.weakest()
+        elif topic not in HINTS:
+            raise ValueError(f"Unknown topic '{topic}', expected one of {sorted(HINTS)}")
+        rating = player.mastery.get(topic, {}).get("rating", INITIAL_RATING)
+        return self.bank.nearest(topic, target_difficulty(rating, self.target_success), state.completed[topic])
+
+    def record_result(self, player, challenge: Dict[str, Any], passed: bool) -> int:
+        """
+        Update the player's mastery of the challenge's topic
+
+        A pass is recorded in the player's practice_completed, apart from
+        story challenges (and so from leaderboards and analytics). A miss is
+        counted only in the topic's mastery (attempts less passed).
+
+        Returns:
+            The topic's new rating
+        """
+        topic = challenge["topic"]
+        stats = player.mastery.get(topic, {})
+        rating = stats.get("rating", INITIAL_RATING)
+        attempts = stats.get("attempts", 0)
+        surprise = (1 if passed else 0) - expected_success(rating, challenge["difficulty"])
+        rating = min(MAX_DIFFICULTY, max(0, round(rating + rating_step(attempts) * surprise)))
+        attempts += 1
+        player.update_mastery(topic, rating, attempts, stats.get("passed", 0) + (1 if passed else 0))
+        state = self._state(player)
+        state.queue.update(topic, rating, attempts)
+
+        if passed:
+            player.complete_practice(challenge["id"])
+            parsed = self.bank.parse_id(challenge["id"])
+            if parsed is not None:
+                state.completed[topic].add(self.bank.position_of(*parsed))
+        return rating
+
+
+def simulate(scheduler: ChallengeScheduler, learners: int = 100, rounds: int = 200,
+             seed: int = 0) -> Dict[str, Any]:
+    """
+    Schedule challenges for simulated learners of random true skill
+
+    Returns:
+        How fast picks were and how close ratings got to the true skills
+    """
+    from player import Player
+    from storage import MemorySaveBackend
+
+    rng = random.Random(seed)
+    pick_times: List[float] = []
+    errors: List[float] = []
+    passes = attempts = 0
+    for _ in range(learners):
+        player = Player(backend=MemorySaveBackend(), flush_interval=None, notify=lambda message: None)
+        skill = {topic: rng.randint(0, MAX_DIFFICULTY) for topic in TOPICS}
+        for _ in range(rounds):
+            started = time.perf_counter()
+            challenge = scheduler.next_challenge(player)
+            pick_times.append(time.perf_counter() - started)
+            if challenge is None:
+                break
+            passed = rng.random() < expected_success(skill[challenge["topic"]], challenge["difficulty"])
+            scheduler.record_result(player, challenge, passed)
+            passes += passed
+            attempts += 1
+        errors.extend(abs(player.mastery.get(topic, {}).get("rating", INITIAL_RATING) - skill[topic])
+                      for topic in TOPICS)
+        player.saver.close()
+
+    pick_times.sort()
+    return {
+        "learners": learners,
+        "rounds": rounds,
+        "pass_rate": round(passes / max(attempts, 1), 3),
+        "pick_us": {
+            "p50": round(pick_times[len(pick_times) // 2] * 1e6, 2),
+            "p99": round(pick_times[int(len(pick_times) * 0.99)] * 1e6, 2),
+            "max": round(pick_times[-1] * 1e6, 2)
+        },
+        "rating_error": {
+            "mean": round(statistics.mean(errors), 1),
+            "median": round(statistics.median(errors), 1)
+        }
+    }
+
+
+def verify(bank: ChallengeBank, samples: int = 200, seed: int = 0) -> List[Dict[str, Any]]:
+    """Run the solutions of randomly chosen bank challenges; returns those that fail"""
+    from challenges import ChallengeValidator
+
+    validator = ChallengeValidator()
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(samples):
+        topic = rng.choice(TOPICS)
+        challenge = bank.challenge(topic, rng.randrange(bank.per_topic))
+        result = validator.validate_challenge(challenge["solution"], challenge)
+        if not result["success"]:
+            failures.append({"id": challenge["id"], "message": result["message"]})
+    return failures
+
+
+def main(argv=None) -> int:
+    """Command-line entry point; exits non-zero if a sampled bank solution fails its own challenge"""
+    parser = argparse.ArgumentParser(description="Benchmark PyAdventure's adaptive challenge scheduler")
+    parser.add_argument("--per-topic", type=int, default=10000, help="Bank challenges per topic")
+    parser.add_argument("--seed", type=int, default=0, help="Bank and simulation seed")
+    parser.add_argument("--learners", type=int, default=100, help="Simulated players")
+    parser.add_argument("--rounds", type=int, default=200, help="Challenges per simulated player")
+    parser.add_argument("--verify", type=int, default=200, metavar="N",
+                        help="Check N random bank challenges against their own solutions")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    bank = ChallengeBank(args.per_topic, args.seed)
+    report: Dict[str, Any] = {"bank_size": len(bank), "build_ms": round((time.perf_counter() - started) * 1000, 1)}
+    report["simulation"] = simulate(ChallengeScheduler(bank), args.learners, args.rounds, args.seed)
+    failures = verify(bank, args.verify, args.seed)
+    report["verified"] = args.verify - len(failures)
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Multi-session game server for PyAdventure
+Hosts many concurrent players in one process over a plain-text line
+protocol (connect with telnet or nc)
+"""
+
+import argparse
+import asyncio
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from challenges import ChallengeValidator
+from game import PyAdventureGame
+from player import Player
+from renderer import DEFAULT_WIDTH, SceneRenderer
+from sandbox import SandboxPool
+from storage import SQLiteSaveStore
+from story import StoryManager
+
+
+_PROFILE_PATTERN = re.compile(r"^[\w.-]{1,32}$")
+
+
+class SessionIO:
+    """Buffers a session's output until the server writes it to the socket"""
+
+    def __init__(self):
+        self.buffer: List[str] = []
+
+    def write(self, text: str = ""):
+        """Queue a line of output"""
+        self.buffer.append(text + "\n")
+
+    def flush(self):
+        """Output is sent by the server when the session next asks for input"""
+
+    def read(self, prompt: str = "") -> str:
+        """Sessions read asynchronously through the server, never through the IO object"""
+        raise RuntimeError("SessionIO does not support blocking reads")
+
+    def drain(self) -> str:
+        """Take everything queued so far"""
+        text = "".join(self.buffer)
+        self.buffer.clear()
+        return text
+
+
+class SessionGame(PyAdventureGame):
+    """A game hosted by the server: quitting ends the session, not the process"""
+
+    def quit_game(self):
+        """End this session"""
+        self.io.write("\nThanks for playing PyAdventure!")
+        self.io.write(f"Final Score: {self.player.experience} XP")
+        # The server saves the session when it ends, off the event loop
+        self.running = False
+
+    def practice(self):
+        """Practice prompts block on input, which sessions can't do"""
+        self.io.write("Practice challenges are only available in the console game.")
+
+
+class GameServer:
+    """Asyncio server running one SessionGame per connection"""
+
+    def __init__(self, story_name: str = "intro", stories_dir: str = "stories",
+                 db_path: str = "pyadventure.db", workers: int = None):
+        self.story_name = story_name
+        self.stories_dir = stories_dir
+        self.store = SQLiteSaveStore(db_path)
+        self.sandbox = SandboxPool(workers=workers)
+        # Shared by every session; validation runs on executor threads
+        self.validator = ChallengeValidator(sandbox=self.sandbox)
+        self.executor = ThreadPoolExecutor(max_workers=self.sandbox.size)
+        # Telnet clients don't report a width; sessions share one set of rendered scenes
+        self.renderer = SceneRenderer(width=DEFAULT_WIDTH)
+        self.sessions = 0
+        # Profiles being played; a second session on one would overwrite the first's saves
+        self._active_profiles = set()
+        self._profiles_lock = threading.Lock()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 4000):
+        """Accept connections until cancelled"""
+        # Sessions share the registry's single copy of the story; hold a
+        # reference for the server's lifetime so it is never evicted
+        story_manager = StoryManager(self.stories_dir)
+        if not story_manager.load_story(self.story_name):
+            raise ValueError(f"Could not load story '{self.story_name}'")
+        self.sandbox.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"PyAdventure server listening on {addresses}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            story_manager.release_story()
+            self.close()
+
+    def close(self):
+        """Release workers and the save database"""
+        self.executor.shutdown(wait=False)
+        self.sandbox.close()
+        self.store.close()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Run one player's session"""
+        self.sessions += 1
+        try:
+            await self.run_session(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def claim_profile(self, profile: str) -> bool:
+        """Mark a profile as being played; False if another session already has it"""
+        with self._profiles_lock:
+            if profile in self._active_profiles:
+                return False
+            self._active_profiles.add(profile)
+            return True
+
+    def release_profile(self, profile: str):
+        """Let the profile be played again"""
+        with self._profiles_lock:
+            self._active_profiles.discard(profile)
+
+    async def run_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Ask for a profile name, then play until the story ends or the player leaves"""
+        io = SessionIO()
+
+        async def send(prompt: str = ""):
+            writer.write((io.drain() + prompt).encode("utf-8"))
+            await writer.drain()
+
+        async def ask(prompt: str) -> Optional[str]:
+            await send(prompt)
+            line = await reader.readline()
+            if not line:
+                return None
+            return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+        while True:
+            profile = await ask("Enter your player name: ")
+            if profile is None:
+                return
+            profile = profile.strip()
+            if not _PROFILE_PATTERN.match(profile):
+                io.write("Names may use letters, digits, '.', '-' and '_' (up to 32 characters).")
+            elif not self.claim_profile(profile):
+                io.write(f"'{profile}' is already playing in another session; finish that one first.")
+            else:
+                break
+
+        try:
+            await self.play_session(profile, io, ask, send)
+        finally:
+            self.release_profile(profile)
+
+    async def play_session(self, profile: str, io: "SessionIO", ask, send):
+        """Load the profile's save and play until the story ends or the player leaves"""
+        loop = asyncio.get_running_loop()
+        # Loading and saving are SQLite transactions; keep them off the event loop.
+        # Changes are written behind, not after every turn
+        player = await loop.run_in_executor(
+            self.executor,
+            lambda: Player(backend=self.store.backend(profile), notify=io.write)
+        )
+        story_manager = StoryManager(self.stories_dir)
+        game = SessionGame(
+            player=player,
+            io=io,
+            story_manager=story_manager,
+            challenge_validator=self.validator,
+            renderer=self.renderer
+        )
+        game.print_banner()
+        game.resume(self.story_name)
+
+        try:
+            while game.running:
+                scene = game.begin_turn()
+                if scene is None:
+                    break
+                if scene.get("type") == "challenge":
+                    finished = await self.play_challenge(game, scene, ask)
+                else:
+                    finished = await self.play_choice(game, scene, ask)
+                if not finished:
+                    return
+            await send()
+        finally:
+            await loop.run_in_executor(self.executor, player.saver.close)
+            story_manager.release_story()
+
+    async def play_choice(self, game: SessionGame, scene: Dict[str, Any], ask) -> bool:
+        """Async counterpart of PyAdventureGame.handle_choice; False if the player disconnected"""
+        choices = scene.get("choices", [])
+
+        if not choices:
+            if await ask("\nPress Enter to continue...") is None:
+                return False
+            game.story_manager.advance_to_next_scene()
+            return True
+
+        game.show_choices(choices)
+        while True:
+            choice_input = await ask("\nEnter your choice (number): ")
+            if choice_input is None:
+                return False
+            if choice_input.strip().lower() == 'quit':
+                game.quit_game()
+                return True
+            if game.choose(choices, choice_input):
+                return True
+
+    async def play_challenge(self, game: SessionGame, scene: Dict[str, Any], ask) -> bool:
+        """Async counterpart of PyAdventureGame.handle_challenge; False if the player disconnected"""
+        challenge = game.show_challenge(scene)
+        loop = asyncio.get_running_loop()
+
+        while True:
+            game.io.write("\nEnter your Python code (type 'quit' to exit, 'hint' for help, 'back' to go back):")
+            user_input = await ask("> ")
+            if user_input is None:
+                return False
+
+            done = game.challenge_command(challenge, user_input)
+            if done is None:
+                # Run the submission off the event loop so other players keep moving
+                result = await loop.run_in_executor(
+                    self.executor,
+                    game.challenge_validator.validate_challenge,
+                    user_input,
+                    challenge
+                )
+                done = game.apply_challenge_result(result)
+            if done:
+                return True
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Host many PyAdventure sessions in one process")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=4000, help="Port to listen on")
+    parser.add_argument("--story", default="intro", help="Story every session plays")
+    parser.add_argument("--stories", default="stories", help="Directory containing story files")
+    parser.add_argument("--save-db", default="pyadventure.db", help="SQLite database for player profiles")
+    parser.add_argument("--workers", type=int, default=None, help="Number of sandbox workers")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.story, args.stories, args.save_db, args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Headless simulation for PyAdventure
+Plays many scripted sessions against a story to load-test the game engine,
+replay sessions, and serve as a regression benchmark
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, Any, List, Optional
+
+from challenges import ChallengeValidator
+from game import PyAdventureGame
+from gameio import ScriptedIO
+from player import Player
+from storage import MemorySaveBackend
+from story import StoryManager
+
+
+# A policy picks a choice index for a scene: policy(scene, rng) -> int
+Policy = Callable[[Dict[str, Any], random.Random], int]
+
+
+def random_policy(scene: Dict[str, Any], rng: random.Random) -> int:
+    """Pick uniformly among a scene's choices"""
+    return rng.randrange(len(scene.get("choices", [])))
+
+
+def first_choice_policy(scene: Dict[str, Any], rng: random.Random) -> int:
+    """Always take the first choice"""
+    return 0
+
+
+POLICIES = {
+    "random": random_policy,
+    "first": first_choice_policy
+}
+
+PHASES = ("display", "choice", "challenge")
+
+
+def default_answer(challenge: Dict[str, Any]) -> str:
+    """Build a submission that prints a challenge's expected output"""
+    expected_output = challenge.get("expected_output")
+    if expected_output is None:
+        return "pass"
+    return f"print({expected_output!r})"
+
+
+class _Stuck(Exception):
+    """Raised when a canned answer keeps failing a challenge"""
+
+
+class _TimedGame(PyAdventureGame):
+    """PyAdventureGame that records how long each phase of a turn takes"""
+
+    def __init__(self, timings: Dict[str, List[float]], **kwargs):
+        super().__init__(**kwargs)
+        self.timings = timings
+
+    def display_scene(self, scene):
+        started = time.perf_counter()
+        super().display_scene(scene)
+        self.timings["display"].append(time.perf_counter() - started)
+
+    def handle_choice(self, scene):
+        started = time.perf_counter()
+        super().handle_choice(scene)
+        self.timings["choice"].append(time.perf_counter() - started)
+
+    def handle_challenge(self, scene):
+        started = time.perf_counter()
+        super().handle_challenge(scene)
+        self.timings["challenge"].append(time.perf_counter() - started)
+
+
+class Simulator:
+    """Runs scripted playthroughs of a story through the real game engine"""
+
+    def __init__(self, story_name: str = "intro", stories_dir: str = "stories",
+                 policy: Policy = random_policy, answers: Dict[str, str] = None,
+                 seed: Optional[int] = None, max_turns: int = 200):
+        """
+        Args:
+            story_name: Story to play
+            stories_dir: Directory containing story files
+            policy: Picks a choice index for each choice scene
+            answers: Canned challenge submissions by scene id; challenges
+                without one are answered by printing their expected output
+            seed: Random seed, for reproducible runs
+            max_turns: Playthroughs longer than this are cut off
+        """
+        loader = StoryManager(stories_dir)
+        if not loader.load_story(story_name):
+            raise ValueError(f"Could not load story '{story_name}'")
+        self.story_name = story_name
+        self.stories_dir = stories_dir
+        self.compiled = loader.compiled
+        self.policy = policy
+        self.answers = answers or {}
+        self.rng = random.Random(seed)
+        self.max_turns = max_turns
+        self.max_attempts = 3
+        self.validator = ChallengeValidator()
+
+    def _respond(self, game: PyAdventureGame, attempts: Counter, prompt: str) -> str:
+        """Answer whatever the game is asking for the current scene"""
+        scene = game.story_manager.get_current_scene()
+        if scene is not None and scene.get("type") == "challenge":
+            scene_id = scene.get("id")
+            attempts[scene_id] += 1
+            if attempts[scene_id] > self.max_attempts:
+                raise _Stuck(scene_id)
+            return self.answers.get(scene_id) or default_answer(scene.get("challenge", {}))
+        if scene is None or "Press Enter" in prompt:
+            return ""
+        return str(self.policy(scene, self.rng) + 1)
+
+    def play_once(self, timings: Dict[str, List[float]]) -> Dict[str, Any]:
+        """Play one session to an ending, the end of the story, or the turn limit"""
+        story_manager = StoryManager(self.stories_dir)
+        story_manager.use_story(self.story_name, self.compiled)
+        attempts = Counter()
+        game = None
+
+        def respond(prompt: str) -> str:
+            return self._respond(game, attempts, prompt)
+
+        io = ScriptedIO(responder=respond, capture=False)
+        player = Player(backend=MemorySaveBackend(), flush_interval=None, notify=io.write)
+        game = _TimedGame(
+            timings,
+            player=player,
+            io=io,
+            story_manager=story_manager,
+            challenge_validator=self.validator
+        )
+
+        turns = 0
+        stuck = None
+        while game.running and turns < self.max_turns:
+            # Attempts are counted per visit; stories may loop back to a challenge
+            attempts.clear()
+            try:
+                game.game_loop()
+            except _Stuck as e:
+                stuck = e.args[0]
+                break
+            turns += 1
+        player.saver.close()
+
+        scene = story_manager.get_current_scene()
+        if stuck is not None:
+            outcome = f"(stuck at {stuck})"
+        elif game.running:
+            outcome = "(turn limit)"
+        elif scene is not None and scene.get("type") == "ending":
+            outcome = scene.get("id")
+        else:
+            outcome = "(end of story)"
+        return {"turns": turns, "outcome": outcome, "experience": player.experience}
+
+    def run(self, playthroughs: int) -> Dict[str, Any]:
+        """Run many playthroughs and report throughput, phase latency and endings"""
+        timings: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        outcomes = Counter()
+        turns = 0
+
+        started = time.perf_counter()
+        for _ in range(playthroughs):
+            result = self.play_once(timings)
+            outcomes[result["outcome"]] += 1
+            turns += result["turns"]
+        elapsed = time.perf_counter() - started
+
+        return {
+            "story": self.story_name,
+            "playthroughs": playthroughs,
+            "turns": turns,
+            "elapsed_s": round(elapsed, 3),
+            "playthroughs_per_s": round(playthroughs / elapsed, 1) if elapsed else 0.0,
+            "turns_per_s": round(turns / elapsed, 1) if elapsed else 0.0,
+            "phases_us": {phase: _latency_summary(samples) for phase, samples in timings.items()},
+            "outcomes": dict(outcomes.most_common())
+        }
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Mean, p50, p95 and max of latency samples, in microseconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def at(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6, 2)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1e6, 2),
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "max": round(ordered[-1] * 1e6, 2)
+    }
+
+
+def main(argv=None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Run headless PyAdventure playthroughs")
+    parser.add_argument("--story", default="intro", help="Story to play")
+    parser.add_argument("--stories", default="stories", help="Directory containing story files")
+    parser.add_argument("-n", "--playthroughs", type=int, default=1000, help="Number of playthroughs")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random", help="How choices are made")
+    parser.add_argument("--answers", help="JSON file mapping challenge scene ids to submissions")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--max-turns", type=int, default=200, help="Turn limit per playthrough")
+    parser.add_argument("--min-turns-per-sec", type=float, default=None,
+                        help="Exit non-zero if throughput falls below this (regression check)")
+    args = parser.parse_args(argv)
+
+    answers = None
+    if args.answers:
+        with open(args.answers, 'r') as f:
+            answers = json.load(f)
+
+    simulator = Simulator(
+        args.story, args.stories,
+        policy=POLICIES[args.policy],
+        answers=answers,
+        seed=args.seed,
+        max_turns=args.max_turns
+    )
+    report = simulator.run(args.playthroughs)
+    print(json.dumps(report, indent=2))
+
+    if args.min_turns_per_sec is not None and report["turns_per_s"] < args.min_turns_per_sec:
+        print(f"Throughput {report['turns_per_s']} turns/s is below {args.min_turns_per_sec}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
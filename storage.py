@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Save storage module for PyAdventure
+Handles atomic file writes, save backends and write-behind flushing
+"""
+
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional
+
+
+def atomic_write_json(path: str, data: Dict[str, Any], compact: bool = False, ensure_ascii: bool = True):
+    """Write JSON to path via a temp file and rename, so readers never see a partial file"""
+    if compact:
+        payload = json.dumps(data, separators=(",", ":"), ensure_ascii=ensure_ascii)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=ensure_ascii)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonSaveBackend:
+    """Stores a single player's progress in a JSON file"""
+
+    def __init__(self, save_file: str = "player_save.json", compact: bool = False):
+        self.save_file = save_file
+        self.compact = compact
+
+    def exists(self) -> bool:
+        """Check whether a save exists"""
+        return os.path.exists(self.save_file)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load saved data, or None if there is no save"""
+        if not self.exists():
+            return None
+        with open(self.save_file, 'r') as f:
+            return json.load(f)
+
+    def save(self, data: Dict[str, Any]):
+        """Atomically replace the save with data"""
+        atomic_write_json(self.save_file, data, compact=self.compact)
+
+    def delete(self):
+        """Remove the save"""
+        if self.exists():
+            os.remove(self.save_file)
+
+
+class MemorySaveBackend:
+    """Keeps a save in memory only, for simulations and tests"""
+
+    def __init__(self, data: Dict[str, Any] = None):
+        self.data = copy.deepcopy(data)
+
+    def exists(self) -> bool:
+        """Check whether a save exists"""
+        return self.data is not None
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Return a copy of the saved data, or None"""
+        return copy.deepcopy(self.data)
+
+    def save(self, data: Dict[str, Any]):
+        """Keep the data"""
+        self.data = data
+
+    def delete(self):
+        """Forget the save"""
+        self.data = None
+
+
+_MISSING = object()
+
+
+class SQLiteSaveStore:
+    """Embedded SQLite database holding one row per player profile"""
+
+    # Save fields stored in their own columns; lists are stored as JSON text
+    COLUMNS = {
+        "experience": False,
+        "completed_challenges": True,
+        "current_story": False,
+        "current_scene": False,
+        "inventory": True,
+        "achievements": True
+    }
+    LEADERBOARD_ORDER = {
+        "experience": "experience DESC, completed_count DESC",
+        "completed": "completed_count DESC, experience DESC"
+    }
+
+    def __init__(self, db_path: str = "pyadventure.db"):
+        self.db_path = db_path
+        import sqlite3
+
+        # Write-behind flushes arrive on timer threads, so share one
+        # connection behind a lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    profile TEXT PRIMARY KEY,
+                    experience INTEGER NOT NULL DEFAULT 0,
+                    completed_count INTEGER NOT NULL DEFAULT 0,
+                    completed_challenges TEXT NOT NULL DEFAULT '[]',
+                    current_story TEXT,
+                    current_scene,
+                    inventory TEXT NOT NULL DEFAULT '[]',
+                    achievements TEXT NOT NULL DEFAULT '[]',
+                    extra TEXT NOT NULL DEFAULT '{}',
+                    updated_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS profiles_by_experience ON profiles (experience DESC);
+                CREATE INDEX IF NOT EXISTS profiles_by_completed ON profiles (completed_count DESC);
+            """)
+
+    def backend(self, profile: str) -> "SQLiteSaveBackend":
+        """Return a save backend bound to one profile"""
+        return SQLiteSaveBackend(self, profile)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def exists(self, profile: str) -> bool:
+        """Check whether a profile has a saved row"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM profiles WHERE profile = ?", (profile,)).fetchone()
+        return row is not None
+
+    def load(self, profile: str) -> Optional[Dict[str, Any]]:
+        """Load a profile's save data, or None if it has none"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM profiles WHERE profile = ?", (profile,)).fetchone()
+        if row is None:
+            return None
+
+        data = json.loads(row["extra"])
+        for column, is_json in self.COLUMNS.items():
+            data[column] = json.loads(row[column]) if is_json else row[column]
+        return data
+
+    def update(self, profile: str, changes: Dict[str, Any]):
+        """Insert the profile if needed and write only the changed fields"""
+        columns = {}
+        extra = {}
+        for field, value in changes.items():
+            if field in self.COLUMNS:
+                columns[field] = json.dumps(value) if self.COLUMNS[field] else value
+            else:
+                extra[field] = value
+        if "completed_challenges" in changes:
+            columns["completed_count"] = len(changes["completed_challenges"])
+        columns["updated_at"] = time.time()
+
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO profiles (profile) VALUES (?)", (profile,))
+            assignments = ", ".join(f"{column} = ?" for column in columns)
+            self._conn.execute(
+                f"UPDATE profiles SET {assignments} WHERE profile = ?",
+                (*columns.values(), profile)
+            )
+            if extra:
+                row = self._conn.execute("SELECT extra FROM profiles WHERE profile = ?", (profile,)).fetchone()
+                merged = json.loads(row["extra"])
+                merged.update(extra)
+                self._conn.execute("UPDATE profiles SET extra = ? WHERE profile = ?", (json.dumps(merged), profile))
+
+    def delete(self, profile: str):
+        """Remove a profile's row"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM profiles WHERE profile = ?", (profile,))
+
+    def profiles(self) -> List[str]:
+        """List all profile names"""
+        with self._lock:
+            rows = self._conn.execute("SELECT profile FROM profiles ORDER BY profile").fetchall()
+        return [row["profile"] for row in rows]
+
+    def leaderboard(self, by: str = "experience", limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the top profiles by 'experience' or 'completed' challenge count"""
+        if by not in self.LEADERBOARD_ORDER:
+            raise ValueError(f"Unknown leaderboard '{by}', expected one of {sorted(self.LEADERBOARD_ORDER)}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT profile, experience, completed_count FROM profiles "
+                f"ORDER BY {self.LEADERBOARD_ORDER[by]} LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class SQLiteSaveBackend:
+    """Save backend for one profile in a SQLiteSaveStore, writing only changed fields"""
+
+    def __init__(self, store: SQLiteSaveStore, profile: str):
+        self.store = store
+        self.profile = profile
+        self._last_saved: Dict[str, Any] = {}
+
+    def exists(self) -> bool:
+        """Check whether the profile has a save"""
+        return self.store.exists(self.profile)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load the profile's save data, or None if there is no save"""
+        data = self.store.load(self.profile)
+        # Deep copy: the caller will mutate the lists it was handed
+        self._last_saved = copy.deepcopy(data) if data else {}
+        return data
+
+    def save(self, data: Dict[str, Any]):
+        """Write the fields that changed since the last load or save"""
+        changes = {field: value for field, value in data.items() if self._last_saved.get(field, _MISSING) != value}
+        if not changes and self._last_saved:
+            return
+        self.store.update(self.profile, changes)
+        self._last_saved.update(copy.deepcopy(changes))
+
+    def delete(self):
+        """Remove the profile's save"""
+        self.store.delete(self.profile)
+        self._last_saved = {}
+
+
+# Savers holding unwritten changes; one exit handler flushes them all, and a
+# saver drops out once it is clean so the set doesn't keep it alive
+_pending_savers = set()
+_pending_lock = threading.Lock()
+
+
+def _flush_pending_savers():
+    with _pending_lock:
+        savers = list(_pending_savers)
+    for saver in savers:
+        saver.flush()
+
+
+atexit.register(_flush_pending_savers)
+
+
+class WriteBehindSaver:
+    """
+    Coalesces many mutations into a single deferred flush
+
+    Callers mark state dirty as often as they like; the flush callback runs
+    once per interval at most, and again on flush() or at interpreter exit.
+    """
+
+    def __init__(self, flush_callback: Callable[[], None], interval: Optional[float] = 2.0):
+        self.flush_callback = flush_callback
+        self.interval = interval
+        self.dirty = False
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    def mark_dirty(self):
+        """Record that there are unsaved changes and schedule a flush"""
+        with self._lock:
+            if not self.dirty:
+                self.dirty = True
+                with _pending_lock:
+                    _pending_savers.add(self)
+            if self.interval is None:
+                return
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write pending changes now, if there are any"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.dirty:
+                return
+            self._clean()
+            self.flush_callback()
+
+    def discard(self):
+        """Drop pending changes without writing them"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._clean()
+
+    def close(self):
+        """Flush pending changes; a clean saver is not flushed again at exit"""
+        self.flush()
+
+    def _clean(self):
+        self.dirty = False
+        with _pending_lock:
+            _pending_savers.discard(self)
@@ -6,35 +6,198 @@ Handles story loading, scene progression, and narrative flow
 
 import json
 import os
-from typing import Dict, Any, Optional
+import threading
+from collections import deque
+from typing import Deque, Dict, Any, List, NamedTuple, Optional, Tuple, Union
+
+from metrics import METRICS
+from scenes import Scene, as_scene
+from story_registry import StoryRegistry, get_registry
+
+
+# Separates the story from the scene in a cross-story link: "story:scene"
+LINK_SEPARATOR = ":"
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def parse_link(target: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Split a cross-story link into (story, scene ID)
+    
+    An empty scene ID ("story:") means the story's first scene.
+    
+    Returns:
+        None if target is not a cross-story link
+    """
+    if not isinstance(target, str) or LINK_SEPARATOR not in target:
+        return None
+    story_name, _, scene_id = target.partition(LINK_SEPARATOR)
+    if not story_name:
+        return None
+    return story_name, scene_id
+
+
+def _prefetch_executor():
+    """The background thread stories are warmed on, started on first use"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="story-prefetch")
+        return _prefetcher
+
+
+class SceneRecord(NamedTuple):
+    """Compact per-scene record with choice targets resolved to scene indices"""
+    scene_id: Optional[str]
+    scene_type: str
+    data: Scene
+    targets: Tuple[Optional[int], ...]
+
+
+class CompiledStory:
+    """Story data compiled once at load time for constant-time navigation"""
+    
+    def __init__(self, story_data: Dict[str, Any]):
+        self.title = story_data.get("title", "")
+        self.description = story_data.get("description", "")
+        # Read-only typed records; sessions share them without copying
+        scenes = [as_scene(scene) for scene in story_data.get("scenes", [])]
+        
+        # First occurrence wins, matching the old linear scan
+        self.index: Dict[str, int] = {}
+        for i, scene in enumerate(scenes):
+            scene_id = scene.get("id")
+            if scene_id is not None and scene_id not in self.index:
+                self.index[scene_id] = i
+        
+        self.scenes: List[SceneRecord] = [
+            SceneRecord(
+                scene.get("id"),
+                scene.get("type", "choice"),
+                scene,
+                tuple(self.index.get(choice.get("next_scene")) for choice in scene.get("choices", []))
+            )
+            for scene in scenes
+        ]
+    
+    def __len__(self) -> int:
+        return len(self.scenes)
+    
+    def index_of(self, scene_id: str) -> Optional[int]:
+        """Return the index of a scene by ID, or None if it doesn't exist"""
+        return self.index.get(scene_id)
+    
+    def scene_at(self, index: int) -> Optional[Scene]:
+        """Return the scene at an index, or None if out of range"""
+        if 0 <= index < len(self.scenes):
+            return self.scenes[index].data
+        return None
+    
+    def choice_target(self, index: int, choice_index: int) -> Optional[int]:
+        """Return the pre-resolved scene index a choice leads to"""
+        targets = self.scenes[index].targets
+        if 0 <= choice_index < len(targets):
+            return targets[choice_index]
+        return None
 
 
 class StoryManager:
     """Manages story content and progression"""
     
-    def __init__(self, stories_dir: str = "stories"):
+    def __init__(self, stories_dir: str = "stories", cache_dir: str = None,
+                 registry: StoryRegistry = None, history_size: int = 50):
         self.stories_dir = stories_dir
+        # Stories are shared, read-only, between every manager in the process
+        self.registry = registry or get_registry(stories_dir, cache_dir)
         self.current_story = None
         self.current_scene_index = 0
+        # (story, scene index) visited before the current one, most recent last
+        self.history: Deque[Tuple[str, int]] = deque(maxlen=history_size)
         self.story_data = {}
+        self.compiled: Optional[CompiledStory] = None
+        # Every story this manager holds a registry reference to, by name,
+        # so switching back to one is a dictionary lookup
+        self._held: Dict[str, Any] = {}
+        self._held_lock = threading.Lock()
+        # Bumped by release_story, so a prefetch still running can't hold stories past it
+        self._generation = 0
     
     def load_story(self, story_name: str) -> bool:
         """Load a story from the stories directory"""
-        story_path = os.path.join(self.stories_dir, f"{story_name}.json")
-        
-        if not os.path.exists(story_path):
+        if story_name not in self._held and self.registry.source_for(story_name) is None:
             # Create a basic intro story if it doesn't exist
             self.create_default_story(story_name)
             
         try:
-            with open(story_path, 'r') as f:
-                self.story_data = json.load(f)
-            self.current_story = story_name
-            self.current_scene_index = 0
-            return True
+            compiled = self.hold_story(story_name)
         except Exception as e:
             print(f"Error loading story '{story_name}': {e}")
             return False
+        
+        self.use_story(story_name, compiled)
+        return True
+    
+    def hold_story(self, story_name: str, generation: int = None):
+        """
+        Return a story, taking a registry reference the first time this manager asks for it
+        
+        Args:
+            story_name: Story to hold
+            generation: Only hold it if release_story hasn't been called since
+                this generation was read; returns None otherwise
+        """
+        with self._held_lock:
+            if generation is not None and generation != self._generation:
+                return None
+            compiled = self._held.get(story_name)
+            if compiled is None:
+                with METRICS.timed("story_load_seconds"):
+                    compiled = self.registry.acquire(story_name)
+                self._held[story_name] = compiled
+            return compiled
+    
+    def use_story(self, story_name: str, compiled):
+        """Start an already compiled story, skipping file loading entirely"""
+        self._show(story_name, compiled)
+        self.current_scene_index = 0
+        self.history.clear()
+    
+    def _show(self, story_name: str, compiled):
+        """Make a story current without touching the scene or history"""
+        self.compiled = compiled
+        self.story_data = {"title": compiled.title, "description": compiled.description}
+        self.current_story = story_name
+    
+    def has_story(self, story_name: str) -> bool:
+        """Check whether a story exists, without loading or creating it"""
+        return story_name in self._held or self.registry.source_for(story_name) is not None
+    
+    def resume(self, scene: Union[str, int]) -> bool:
+        """
+        Jump to a saved scene, given by ID (or by index, as older saves stored it)
+        
+        Returns:
+            True if the scene exists in the current story
+        """
+        if self.compiled is None:
+            return False
+        index = scene if isinstance(scene, int) else self.compiled.index_of(scene)
+        if index is None or self.compiled.scene_at(index) is None:
+            return False
+        self.current_scene_index = index
+        self.history.clear()
+        return True
+    
+    def release_story(self):
+        """Give every story this manager holds back to the shared registry"""
+        with self._held_lock:
+            held, self._held = self._held, {}
+            self._generation += 1
+        for compiled in held.values():
+            self.registry.release(compiled)
     
     def create_default_story(self, story_name: str):
         """Create a default intro story"""
@@ -103,28 +266,123 @@ class StoryManager:
     
     def get_current_scene(self) -> Optional[Dict[str, Any]]:
         """Get the current scene data"""
-        if not self.story_data or "scenes" not in self.story_data:
+        if self.compiled is None:
             return None
-            
-        scenes = self.story_data["scenes"]
-        if 0 <= self.current_scene_index < len(scenes):
-            return scenes[self.current_scene_index]
-        return None
+        return self.compiled.scene_at(self.current_scene_index)
+    
+    def get_current_scene_id(self) -> Optional[str]:
+        """Get the stable ID of the current scene"""
+        scene = self.get_current_scene()
+        return scene.get("id") if scene is not None else None
+    
+    def _move_to(self, index: int):
+        """Change scene, remembering where we came from"""
+        self.history.append((self.current_story, self.current_scene_index))
+        self.current_scene_index = index
+    
+    def go_back(self) -> bool:
+        """Return to the previously visited scene, in whichever story; False if there is none"""
+        if not self.history:
+            return False
+        story_name, index = self.history.pop()
+        if story_name != self.current_story:
+            self._show(story_name, self.hold_story(story_name))
+        self.current_scene_index = index
+        return True
+    
+    def follow_link(self, story_name: str, scene_id: str = "") -> bool:
+        """
+        Move to a scene in another story (or the start of it, for an empty scene ID)
+        
+        Returns:
+            False if the story or scene doesn't exist, leaving the current scene unchanged
+        """
+        if story_name not in self._held and self.registry.source_for(story_name) is None:
+            return False
+        try:
+            compiled = self.hold_story(story_name)
+        except Exception as e:
+            print(f"Error loading story '{story_name}': {e}")
+            return False
+        
+        index = compiled.index_of(scene_id) if scene_id else 0
+        if index is None or compiled.scene_at(index) is None:
+            return False
+        self._move_to(index)
+        self._show(story_name, compiled)
+        return True
+    
+    def prefetch(self):
+        """
+        Warm the stories the current scene's choices lead into, in the background
+        
+        Loads each one into this manager's held stories and decodes the
+        target scene, so following the link costs no file reads.
+        """
+        scene = self.get_current_scene()
+        if scene is None:
+            return
+        links = set()
+        for choice_index, choice in enumerate(scene.get("choices", [])):
+            if self.compiled.choice_target(self.current_scene_index, choice_index) is not None:
+                continue
+            link = parse_link(choice.get("next_scene"))
+            if link is not None and link[0] not in self._held:
+                links.add(link)
+        if links:
+            _prefetch_executor().submit(self._warm, sorted(links), self._generation)
+    
+    def _warm(self, links: List[Tuple[str, str]], generation: int):
+        for story_name, scene_id in links:
+            try:
+                if story_name not in self._held and self.registry.source_for(story_name) is None:
+                    continue
+                compiled = self.hold_story(story_name, generation)
+                if compiled is None:
+                    return
+                compiled.scene_at(compiled.index_of(scene_id) if scene_id else 0)
+            except Exception:
+                # Prefetch is best effort; following the link reports any error
+                continue
     
     def advance_to_next_scene(self):
         """Advance to the next scene in sequence"""
-        if self.story_data and "scenes" in self.story_data:
-            self.current_scene_index += 1
+        if self.compiled is not None:
+            self._move_to(self.current_scene_index + 1)
     
     def advance_to_scene(self, scene_id: str):
-        """Advance to a specific scene by ID"""
-        if not self.story_data or "scenes" not in self.story_data:
+        """Advance to a specific scene by ID, or to a scene in another story as 'story:scene'"""
+        if self.compiled is None:
             return
-            
-        scenes = self.story_data["scenes"]
-        for i, scene in enumerate(scenes):
-            if scene.get("id") == scene_id:
-                self.current_scene_index = i
+        
+        index = self.compiled.index_of(scene_id)
+        if index is not None:
+            self._move_to(index)
+            return
+        
+        link = parse_link(scene_id)
+        if link is not None and self.follow_link(*link):
+            return
+        
+        # If scene not found, go to next scene
+        self.advance_to_next_scene()
+    
+    def advance_by_choice(self, choice_index: int):
+        """Advance along a choice of the current scene using its pre-resolved target"""
+        scene = self.get_current_scene() if self.compiled is not None else None
+        if scene is None:
+            return
+        
+        index = self.compiled.choice_target(self.current_scene_index, choice_index)
+        if index is not None:
+            self._move_to(index)
+            return
+        
+        # Only links within the story are pre-resolved
+        choices = scene.get("choices", [])
+        if 0 <= choice_index < len(choices):
+            link = parse_link(choices[choice_index].get("next_scene"))
+            if link is not None and self.follow_link(*link):
                 return
         
         # If scene not found, go to next scene
@@ -135,5 +393,6 @@ class StoryManager:
         return {
             "current_story": self.current_story,
             "current_scene": self.current_scene_index,
-            "total_scenes": len(self.story_data.get("scenes", []))
+            "current_scene_id": self.get_current_scene_id(),
+            "total_scenes": len(self.compiled) if self.compiled is not None else 0
         }
\ No newline at end of file
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Static story graph analysis for PyAdventure
+Finds broken links, unreachable scenes and inescapable loops before a story
+is published
+
+Edges follow what the game engine actually does:
+    - choice scenes go to each choice's next_scene; a dangling target falls
+      back to the next scene in order
+    - challenge scenes and choice scenes without choices go to the next
+      scene in order
+    - ending scenes are terminal, as is running off the end of the scene list
+    - a cross-story link ("story:scene") leaves the story, so it counts as
+      a way to finish it; bundles check that each link's target exists
+
+Every pass is linear in the number of scenes plus choices.
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from typing import Dict, Any, List, Optional, Set
+
+from story import CompiledStory, parse_link
+from story_loader import StoryLoader
+from storybin import BUNDLE_SUFFIX, MappedStory, PACK_SUFFIX, StoryBundle
+
+
+class StoryGraph:
+    """Adjacency lists over a compiled story's scenes"""
+
+    def __init__(self, story):
+        """
+        Args:
+            story: A CompiledStory or MappedStory
+        """
+        self.story = story
+        count = len(story)
+        self.ids: List[str] = []
+        self.types: List[str] = []
+        self.edges: List[List[int]] = [[] for _ in range(count)]
+        self.dangling: List[Dict[str, Any]] = []
+        # Scenes whose successor is "off the end", i.e. the game just stops
+        self.falls_off: Set[int] = set()
+        # Choices that continue in another story
+        self.exits: List[Dict[str, Any]] = []
+        self.leaves: Set[int] = set()
+
+        for i in range(count):
+            scene = story.scene_at(i)
+            scene_type = scene.get("type", "choice")
+            self.ids.append(scene.get("id"))
+            self.types.append(scene_type)
+
+            if scene_type == "ending":
+                continue
+
+            successors = set()
+            choices = scene.get("choices", []) if scene_type != "challenge" else []
+            for choice_index, choice in enumerate(choices):
+                target = story.choice_target(i, choice_index)
+                link = parse_link(choice.get("next_scene")) if target is None else None
+                if link is not None:
+                    self.exits.append({
+                        "scene": scene.get("id"),
+                        "choice": choice_index,
+                        "target": choice.get("next_scene")
+                    })
+                    self.leaves.add(i)
+                    continue
+                if target is None:
+                    self.dangling.append({
+                        "scene": scene.get("id"),
+                        "choice": choice_index,
+                        "target": choice.get("next_scene")
+                    })
+                    target = i + 1
+                successors.add(target)
+            if not choices:
+                successors.add(i + 1)
+
+            for target in sorted(successors):
+                if target >= count:
+                    self.falls_off.add(i)
+                else:
+                    self.edges[i].append(target)
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def endings(self) -> List[int]:
+        """Indices of ending scenes"""
+        return [i for i, scene_type in enumerate(self.types) if scene_type == "ending"]
+
+    def shortest_paths(self, start: int = 0):
+        """Breadth-first search from start; returns (distance, parent) lists"""
+        distance: List[Optional[int]] = [None] * len(self)
+        parent: List[Optional[int]] = [None] * len(self)
+        if not len(self):
+            return distance, parent
+
+        distance[start] = 0
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for target in self.edges[node]:
+                if distance[target] is None:
+                    distance[target] = distance[node] + 1
+                    parent[target] = node
+                    queue.append(target)
+        return distance, parent
+
+    def can_finish(self) -> List[bool]:
+        """Which scenes have some path to an ending, the end of the story, or another story"""
+        reverse: List[List[int]] = [[] for _ in range(len(self))]
+        for node, targets in enumerate(self.edges):
+            for target in targets:
+                reverse[target].append(node)
+
+        finished = [False] * len(self)
+        queue = deque(self.endings())
+        queue.extend(self.falls_off)
+        queue.extend(self.leaves)
+        for node in queue:
+            finished[node] = True
+        while queue:
+            node = queue.popleft()
+            for source in reverse[node]:
+                if not finished[source]:
+                    finished[source] = True
+                    queue.append(source)
+        return finished
+
+    def strongly_connected_components(self) -> List[List[int]]:
+        """Tarjan's algorithm, iteratively; components come out in reverse topological order"""
+        index_counter = 0
+        index: List[Optional[int]] = [None] * len(self)
+        lowlink = [0] * len(self)
+        on_stack = [False] * len(self)
+        stack: List[int] = []
+        components: List[List[int]] = []
+
+        for root in range(len(self)):
+            if index[root] is not None:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, edge_position = work.pop()
+                if edge_position == 0:
+                    index[node] = lowlink[node] = index_counter
+                    index_counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+
+                recurse = False
+                targets = self.edges[node]
+                while edge_position < len(targets):
+                    target = targets[edge_position]
+                    edge_position += 1
+                    if index[target] is None:
+                        work.append((node, edge_position))
+                        work.append((target, 0))
+                        recurse = True
+                        break
+                    if on_stack[target]:
+                        lowlink[node] = min(lowlink[node], index[target])
+                if recurse:
+                    continue
+
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+                if work:
+                    caller = work[-1][0]
+                    lowlink[caller] = min(lowlink[caller], lowlink[node])
+        return components
+
+
+def analyze(story, start: int = 0) -> Dict[str, Any]:
+    """
+    Analyze a compiled story's scene graph
+
+    Returns:
+        Dict with dangling links, unreachable scenes, trap cycles (loops that
+        can never reach an ending), dead ends, and shortest/longest paths
+        from the start to each reachable ending
+    """
+    graph = StoryGraph(story)
+    distance, parent = graph.shortest_paths(start)
+    finished = graph.can_finish()
+    components = graph.strongly_connected_components()
+
+    component_of = [0] * len(graph)
+    cyclic = []
+    for number, component in enumerate(components):
+        for node in component:
+            component_of[node] = number
+        node = component[0]
+        cyclic.append(len(component) > 1 or node in graph.edges[node])
+
+    trap_cycles = [
+        [graph.ids[node] for node in component]
+        for number, component in enumerate(components)
+        if cyclic[number] and distance[component[0]] is not None and not finished[component[0]]
+    ]
+    dead_ends = [
+        graph.ids[node] for node in range(len(graph))
+        if distance[node] is not None and not finished[node] and not cyclic[component_of[node]]
+    ]
+
+    # Longest path over the condensation, walking components in topological order.
+    # Loops can be repeated forever, so paths through one are reported as unbounded.
+    longest: List[Optional[int]] = [None] * len(components)
+    unbounded = [False] * len(components)
+    if len(graph):
+        longest[component_of[start]] = 0
+        unbounded[component_of[start]] = cyclic[component_of[start]]
+    for number in range(len(components) - 1, -1, -1):
+        if longest[number] is None:
+            continue
+        for node in components[number]:
+            for target in graph.edges[node]:
+                other = component_of[target]
+                if other == number:
+                    continue
+                if longest[other] is None or longest[number] + 1 > longest[other]:
+                    longest[other] = longest[number] + 1
+                unbounded[other] = unbounded[other] or unbounded[number] or cyclic[other]
+
+    endings = {}
+    for node in graph.endings():
+        if distance[node] is None:
+            continue
+        path = []
+        step = node
+        while step is not None:
+            path.append(graph.ids[step])
+            step = parent[step]
+        endings[graph.ids[node]] = {
+            "shortest": distance[node],
+            "shortest_path": path[::-1],
+            "longest": longest[component_of[node]],
+            "longest_unbounded": unbounded[component_of[node]]
+        }
+
+    return {
+        "scenes": len(graph),
+        "reachable": sum(1 for d in distance if d is not None),
+        "start": graph.ids[start] if len(graph) else None,
+        "dangling": graph.dangling,
+        "unreachable": [graph.ids[node] for node in range(len(graph)) if distance[node] is None],
+        "trap_cycles": trap_cycles,
+        "dead_ends": dead_ends,
+        "falls_off_end": [graph.ids[node] for node in sorted(graph.falls_off) if distance[node] is not None],
+        "exits": graph.exits,
+        "endings": endings
+    }
+
+
+def load_for_analysis(path: str):
+    """Open a story JSON file or compiled pack for analysis"""
+    if path.endswith(PACK_SUFFIX):
+        return MappedStory(path)
+    return CompiledStory(StoryLoader().load(path))
+
+
+def analyze_bundle(bundle: StoryBundle) -> Dict[str, Dict[str, Any]]:
+    """
+    Analyze every story in a bundle, by name
+
+    Cross-story links whose story or scene is missing from the bundle are
+    reported as dangling.
+    """
+    stories = {name: bundle.story(name) for name in bundle}
+    reports = {}
+    for name, story in stories.items():
+        report = analyze(story)
+        exits = []
+        for link in report["exits"]:
+            story_name, scene_id = parse_link(link["target"])
+            target = stories.get(story_name)
+            if target is None or (scene_id and target.index_of(scene_id) is None):
+                report["dangling"].append(link)
+            else:
+                exits.append(link)
+        report["exits"] = exits
+        reports[name] = report
+    return reports
+
+
+def print_report(path: str, report: Dict[str, Any]):
+    """Print a human-readable analysis report"""
+    print(f"Story: {path}")
+    print(f"Scenes: {report['scenes']} ({report['reachable']} reachable from '{report['start']}')")
+
+    for link in report["dangling"]:
+        print(f"  ❌ Dangling link: '{link['scene']}' choice {link['choice'] + 1} -> '{link['target']}'")
+    for cycle in report["trap_cycles"]:
+        print(f"  ❌ Loop with no way out: {', '.join(cycle)}")
+    for scene_id in report["dead_ends"]:
+        print(f"  ❌ Dead end (no ending reachable): {scene_id}")
+    for scene_id in report["unreachable"]:
+        print(f"  ⚠️  Unreachable scene: {scene_id}")
+    for scene_id in report["falls_off_end"]:
+        print(f"  ⚠️  Play runs off the end of the story after: {scene_id}")
+    for link in report["exits"]:
+        print(f"  ↪ Continues in another story: '{link['scene']}' choice {link['choice'] + 1} -> '{link['target']}'")
+
+    print("Endings:")
+    for ending, paths in report["endings"].items():
+        longest = "unbounded" if paths["longest_unbounded"] else paths["longest"]
+        print(f"  {ending}: shortest {paths['shortest']}, longest {longest}")
+
+
+def main(argv=None) -> int:
+    """Command-line entry point; exits non-zero when a story has broken links or traps"""
+    parser = argparse.ArgumentParser(description="Check PyAdventure story graphs before publishing")
+    parser.add_argument("stories", nargs="+", help="Story JSON files, compiled packs or bundles")
+    parser.add_argument("--json", action="store_true", help="Print reports as JSON")
+    parser.add_argument("--strict", action="store_true", help="Also fail on unreachable scenes")
+    args = parser.parse_args(argv)
+
+    failed = False
+    reports = {}
+    for path in args.stories:
+        if path.endswith(BUNDLE_SUFFIX):
+            # Bundled stories are reported as "<bundle>:<story>"
+            named = {f"{path}:{name}": report for name, report in analyze_bundle(StoryBundle(path)).items()}
+        else:
+            named = {path: analyze(load_for_analysis(path))}
+        for name, report in named.items():
+            reports[os.path.basename(name)] = report
+            if report["dangling"] or report["trap_cycles"] or report["dead_ends"]:
+                failed = True
+            if args.strict and report["unreachable"]:
+                failed = True
+            if not args.json:
+                print_report(name, report)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Story loading pipeline for PyAdventure
+Parses JSON story files that may contain comments, validates them, and
+caches the result so unchanged stories are not parsed again
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple
+
+
+# Matches a JSON string (kept) or a // or /* */ comment (removed)
+_COMMENT_PATTERN = re.compile(
+    r'("(?:\\.|[^"\\])*")|(/\*.*?\*/|//[^\n]*)',
+    re.DOTALL
+)
+
+CACHE_VERSION = 2
+
+
+class StoryFormatError(ValueError):
+    """Raised when a story file does not have the expected structure"""
+
+
+def strip_json_comments(text: str) -> str:
+    """Remove // and /* */ comments from JSON text, leaving string contents alone"""
+    return _COMMENT_PATTERN.sub(lambda m: m.group(1) or "", text)
+
+
+def parse_story_text(text: str) -> Dict[str, Any]:
+    """Parse story JSON, accepting comments when plain JSON parsing fails"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(strip_json_comments(text))
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only deep copy of JSON data: dicts become mapping proxies, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Return a mutable deep copy of (possibly frozen) JSON data"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    if isinstance(value, Mapping):
+        # Typed scene records
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
+def validate_story(story_data: Any, name: str = "story") -> Dict[str, Any]:
+    """
+    Check a parsed story's structure, raising StoryFormatError on problems
+
+    Scenes without a string ID, or with an ID used before, still load as
+    they always have (lookups find the first scene with an ID); they are
+    only warned about.
+    """
+    if not isinstance(story_data, dict):
+        raise StoryFormatError("story must be a JSON object")
+
+    scenes = story_data.get("scenes")
+    if not isinstance(scenes, list):
+        raise StoryFormatError("story must have a 'scenes' list")
+
+    seen = set()
+    for i, scene in enumerate(scenes):
+        if not isinstance(scene, dict):
+            raise StoryFormatError(f"scene {i} must be an object")
+        scene_id = scene.get("id")
+        if not isinstance(scene_id, str):
+            print(f"Warning: {name}: scene {i} has no string 'id' and can't be reached by ID")
+            scene_id = i
+        elif scene_id in seen:
+            print(f"Warning: {name}: duplicate scene id '{scene_id}'; the first one is used")
+        seen.add(scene_id)
+        choices = scene.get("choices", [])
+        if not isinstance(choices, list) or not all(isinstance(choice, dict) for choice in choices):
+            raise StoryFormatError(f"scene '{scene_id}' has malformed 'choices'")
+
+    return story_data
+
+
+class StoryLoader:
+    """
+    Loads stories with an in-memory and on-disk cache
+
+    Cache entries are keyed by the file's mtime and size; when those change
+    but the content hash does not (e.g. after a checkout), the cached parse
+    is reused and re-stamped.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self._memory: Dict[str, Tuple[Tuple[int, int], str, Dict[str, Any]]] = {}
+
+    def load(self, path: str) -> Dict[str, Any]:
+        """Load, validate and cache the story at path"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        cached = self._memory.get(path)
+        if cached is None:
+            cached = self._read_cache(path)
+        if cached is not None and cached[0] == stamp:
+            self._memory[path] = cached
+            return cached[2]
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if cached is not None and cached[1] == digest:
+            story_data = cached[2]
+        else:
+            story_data = validate_story(parse_story_text(raw.decode("utf-8")), os.path.basename(path))
+
+        entry = (stamp, digest, story_data)
+        self._memory[path] = entry
+        self._write_cache(path, entry)
+        return story_data
+
+    def invalidate(self, path: str = None):
+        """Forget cached parses for one path, or all of them"""
+        if path is None:
+            self._memory.clear()
+        else:
+            self._memory.pop(os.path.abspath(path), None)
+
+    def _cache_path(self, path: str) -> Optional[str]:
+        """Where the on-disk cache for a story lives"""
+        if not self.cache_dir:
+            return None
+        name = os.path.splitext(os.path.basename(path))[0]
+        key = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{name}-{key}.json")
+
+    def _read_cache(self, path: str):
+        """Read a cache entry from disk, ignoring missing, malformed or stale-format files"""
+        # Plain JSON, not pickle: anyone who can write the cache directory
+        # could otherwise run code in the game
+        cache_path = self._cache_path(path)
+        if cache_path is None or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached["version"] != CACHE_VERSION:
+                return None
+            mtime_ns, size = cached["stamp"]
+            story_data = cached["story"]
+            # The file may have been edited by hand
+            if not isinstance(story_data, dict) or not isinstance(story_data.get("scenes"), list):
+                return None
+            return (mtime_ns, size), cached["digest"], story_data
+        except Exception:
+            return None
+
+    def _write_cache(self, path: str, entry):
+        """Atomically write a cache entry to disk; failures only cost a re-parse"""
+        cache_path = self._cache_path(path)
+        if cache_path is None:
+            return
+        stamp, digest, story_data = entry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": CACHE_VERSION, "stamp": list(stamp), "digest": digest, "story": story_data},
+                          f, separators=(",", ":"))
+            os.replace(temp_path, cache_path)
+        except BaseException as e:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            if not isinstance(e, Exception):
+                raise
+
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Shared story registry for PyAdventure
+Hands out one read-only copy of each story to every session in the process,
+with reference counting, memory-budgeted LRU eviction and hot reload
+Stories come from JSON files, compiled packs, or bundles holding many stories
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional, Tuple
+
+from story_loader import StoryLoader
+from storybin import BUNDLE_SUFFIX, MappedStory, PACK_SUFFIX, StoryBundle
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by JSON-like data, in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class _Entry:
+    """One loaded version of a story"""
+
+    def __init__(self, name: str, story, source: str, stamp: Tuple[int, int], size: int):
+        self.name = name
+        self.story = story
+        self.source = source
+        self.stamp = stamp
+        self.size = size
+        self.refs = 0
+
+
+class StoryRegistry:
+    """
+    Process-wide cache of compiled, read-only stories
+
+    acquire() returns the shared story and takes a reference; release() drops
+    it. Unreferenced stories stay cached until the memory budget forces the
+    least recently used out. When a story file changes on disk, the next
+    acquire loads the new version while existing holders keep the old one.
+    """
+
+    def __init__(self, stories_dir: str = "stories", cache_dir: str = None,
+                 memory_budget: int = 64 * 1024 * 1024, disk_cache: bool = True):
+        self.stories_dir = stories_dir
+        self.memory_budget = memory_budget
+        # Read-only tools turn the parse cache off so they never write under stories_dir
+        self.loader = StoryLoader((cache_dir or os.path.join(stories_dir, ".cache")) if disk_cache else None)
+        self._current: Dict[str, _Entry] = {}
+        # Unreferenced current entries in least-recently-used order
+        self._idle: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Every entry still held by someone, including superseded versions
+        self._live: Dict[int, _Entry] = {}
+        # Open bundles by path, with the (mtime, size) they were opened at
+        self._bundles: Dict[str, Tuple[Tuple[int, int], StoryBundle]] = {}
+        self._lock = threading.RLock()
+        self.stats = {"loads": 0, "hits": 0, "reloads": 0, "evictions": 0}
+
+    def paths(self, story_name: str) -> Tuple[str, str]:
+        """JSON and pack paths for a story name"""
+        base = os.path.join(self.stories_dir, story_name)
+        return base + ".json", base + PACK_SUFFIX
+
+    def source_for(self, story_name: str) -> Optional[str]:
+        """
+        The file a story loads from
+
+        A pack is used over its JSON when at least as new, and a bundle
+        holding the story over both on the same terms.
+        """
+        story_path, pack_path = self.paths(story_name)
+        pack_exists = os.path.exists(pack_path)
+        story_exists = os.path.exists(story_path)
+        if pack_exists and (not story_exists or os.path.getmtime(pack_path) >= os.path.getmtime(story_path)):
+            source = pack_path
+        elif story_exists:
+            source = story_path
+        else:
+            source = None
+
+        bundle_path = self.bundle_for(story_name)
+        if bundle_path is not None and (source is None or os.path.getmtime(bundle_path) >= os.path.getmtime(source)):
+            return bundle_path
+        return source
+
+    def bundle_for(self, story_name: str) -> Optional[str]:
+        """Path of the first bundle in the stories directory (by name) holding a story"""
+        try:
+            names = sorted(name for name in os.listdir(self.stories_dir) if name.endswith(BUNDLE_SUFFIX))
+        except FileNotFoundError:
+            return None
+        for name in names:
+            path = os.path.join(self.stories_dir, name)
+            try:
+                if story_name in self._bundle(path):
+                    return path
+            except (OSError, ValueError) as e:
+                print(f"Warning: skipping story bundle '{path}': {e}")
+        return None
+
+    def _bundle(self, path: str) -> StoryBundle:
+        """The open bundle at path, reopened if the file has changed"""
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._bundles.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            # Stories still held from an older version keep its map alive
+            bundle = StoryBundle(path)
+            self._bundles[path] = (stamp, bundle)
+            return bundle
+
+    def acquire(self, story_name: str):
+        """Return the shared story, loading or reloading it as needed, and take a reference"""
+        source = self.source_for(story_name)
+        if source is None:
+            raise FileNotFoundError(f"no story named '{story_name}' in '{self.stories_dir}'")
+        st = os.stat(source)
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._current.get(story_name)
+            if entry is not None and entry.source == source and entry.stamp == stamp:
+                self.stats["hits"] += 1
+            else:
+                if entry is not None:
+                    self.stats["reloads"] += 1
+                    self._retire(entry)
+                entry = self._load(story_name, source, stamp)
+                self._current[story_name] = entry
+                self.stats["loads"] += 1
+
+            self._idle.pop(story_name, None)
+            entry.refs += 1
+            self._live[id(entry.story)] = entry
+            self._evict()
+            return entry.story
+
+    def release(self, story):
+        """Drop a reference taken by acquire()"""
+        with self._lock:
+            entry = self._live.get(id(story))
+            if entry is None or entry.refs == 0:
+                return
+            entry.refs -= 1
+            if entry.refs:
+                return
+
+            if self._current.get(entry.name) is entry:
+                self._idle[entry.name] = entry
+                self._evict()
+            else:
+                # A superseded version nobody holds any more
+                del self._live[id(story)]
+                self._close(entry)
+
+    def loaded(self) -> List[Dict[str, Any]]:
+        """Describe the cached stories"""
+        with self._lock:
+            return [
+                {"story": entry.name, "refs": entry.refs, "size": entry.size, "source": entry.source}
+                for entry in self._current.values()
+            ]
+
+    def memory_used(self) -> int:
+        """Estimated bytes held by current story versions"""
+        with self._lock:
+            return sum(entry.size for entry in self._current.values())
+
+    def _load(self, story_name: str, source: str, stamp: Tuple[int, int]) -> _Entry:
+        """Load and freeze a story from its source file"""
+        from story import CompiledStory
+
+        if source.endswith(BUNDLE_SUFFIX):
+            bundle = self._bundle(source)
+            story = bundle.story(story_name, frozen=True)
+            size = bundle.size_of(story_name)
+        elif source.endswith(PACK_SUFFIX):
+            story = MappedStory(source, frozen=True)
+            # Decoded scenes are bounded by the scene cache, so the pack's
+            # size is a fair upper bound on what it pins in memory
+            size = stamp[1]
+        else:
+            # Compiled scenes are read-only records, safe to share as they are
+            story = CompiledStory(self.loader.load(source))
+            # The registry is the cache now; don't keep a second, mutable copy
+            self.loader.invalidate(source)
+            size = estimate_size([record.data for record in story.scenes])
+        return _Entry(story_name, story, source, stamp, size)
+
+    def _retire(self, entry: _Entry):
+        """Replace a current entry; it lives on only while referenced"""
+        self._idle.pop(entry.name, None)
+        del self._current[entry.name]
+        if entry.refs == 0:
+            self._live.pop(id(entry.story), None)
+            self._close(entry)
+
+    def _evict(self):
+        """Drop least recently used unreferenced stories until within the memory budget"""
+        used = sum(entry.size for entry in self._current.values())
+        while used > self.memory_budget and self._idle:
+            name, entry = self._idle.popitem(last=False)
+            del self._current[name]
+            self._live.pop(id(entry.story), None)
+            self._close(entry)
+            used -= entry.size
+            self.stats["evictions"] += 1
+
+    @staticmethod
+    def _close(entry: _Entry):
+        if isinstance(entry.story, MappedStory):
+            entry.story.close()
+
+
+_registries: Dict[Tuple[str, Optional[str]], StoryRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(stories_dir: str = "stories", cache_dir: str = None) -> StoryRegistry:
+    """Return the process-wide registry for a stories directory"""
+    key = (os.path.abspath(stories_dir), cache_dir)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = StoryRegistry(stories_dir, cache_dir)
+        return registry
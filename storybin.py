@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Binary story packs for PyAdventure
+Compiles story JSON into a compact, memory-mappable pack and reads scenes
+from it lazily
+
+Pack layout (little-endian):
+    header          magic, version, counts and section offsets
+    string offsets  string_count + 1 uint32 offsets into the string blob
+    string blob     UTF-8 text of every interned string
+    scene index     per scene: id string, data offset/length, targets start/count
+    sorted ids      indices of scenes with an id, ordered by id text, for binary
+                    search; then one 0xFFFFFFFF per scene without an id
+    targets         int32 pre-resolved choice targets (-1 when dangling)
+    metadata        encoded story title/description
+    scene data      encoded scene values
+
+Bundle layout: a bundle header and a directory of (story name, pack header
+offset), then one string table shared by every story, then each story's
+pack header and sections. Offsets inside a bundled pack are absolute within
+the bundle, so a story reads its scenes straight out of the bundle's map.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Tuple
+
+from scenes import Scene
+from story_loader import StoryLoader
+
+
+MAGIC = b"PYAP"
+VERSION = 1
+PACK_SUFFIX = ".pyadv"
+BUNDLE_MAGIC = b"PYAB"
+BUNDLE_SUFFIX = ".pyadvb"
+
+_HEADER = struct.Struct("<4sHHIIQQQQQQ")
+_U32 = struct.Struct("<I")
+_I32 = struct.Struct("<i")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_SCENE_ENTRY = struct.Struct("<IQIII")
+_BUNDLE_HEADER = struct.Struct("<4sHHIIQQ")
+_BUNDLE_ENTRY = struct.Struct("<IQ")
+
+_NO_TARGET = -1
+# Sorted-id slot of a scene without an ID; sorts after every real ID
+_NO_SCENE = 0xFFFFFFFF
+
+
+class StoryPackError(ValueError):
+    """Raised when a story pack is missing, corrupt or from another version"""
+
+
+class _Encoder:
+    """Encodes JSON-like values with interned strings"""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+
+    def intern(self, text: str) -> int:
+        index = self._string_ids.get(text)
+        if index is None:
+            index = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def encode(self, value: Any, out: bytearray):
+        if value is None:
+            out += b"N"
+        elif value is True:
+            out += b"T"
+        elif value is False:
+            out += b"F"
+        elif isinstance(value, int):
+            out += b"i" + _I64.pack(value)
+        elif isinstance(value, float):
+            out += b"d" + _F64.pack(value)
+        elif isinstance(value, str):
+            out += b"s" + _U32.pack(self.intern(value))
+        elif isinstance(value, list):
+            out += b"l" + _U32.pack(len(value))
+            for item in value:
+                self.encode(item, out)
+        elif isinstance(value, dict):
+            out += b"m" + _U32.pack(len(value))
+            for key, item in value.items():
+                out += _U32.pack(self.intern(key))
+                self.encode(item, out)
+        else:
+            raise StoryPackError(f"cannot encode value of type {type(value).__name__}")
+
+
+class _EncodedStory(NamedTuple):
+    """One story's sections, encoded but not yet placed in a file"""
+    scene_count: int
+    entries: List[Tuple[int, int, int, int]]
+    scene_blobs: List[bytearray]
+    sorted_ids: List[int]
+    targets: List[int]
+    metadata: bytearray
+
+
+def _encode_story(story_data: Dict[str, Any], encoder: _Encoder) -> _EncodedStory:
+    """Encode a story's scenes and metadata, interning strings into encoder"""
+    scenes = story_data.get("scenes", [])
+
+    # Scenes without a string ID are kept but can't be reached by ID, as in CompiledStory
+    scene_ids = [scene.get("id") if isinstance(scene.get("id"), str) else None for scene in scenes]
+    index: Dict[str, int] = {}
+    for i, scene_id in enumerate(scene_ids):
+        if scene_id is not None:
+            index.setdefault(scene_id, i)
+
+    metadata = bytearray()
+    encoder.encode({key: value for key, value in story_data.items() if key != "scenes"}, metadata)
+
+    scene_blobs = []
+    targets: List[int] = []
+    entries = []
+    for scene, scene_id in zip(scenes, scene_ids):
+        blob = bytearray()
+        encoder.encode(scene, blob)
+        scene_blobs.append(blob)
+        choices = scene.get("choices", [])
+        entries.append((encoder.intern(scene_id or ""), len(blob), len(targets), len(choices)))
+        for choice in choices:
+            target = index.get(choice.get("next_scene"))
+            targets.append(_NO_TARGET if target is None else target)
+
+    with_ids = [i for i, scene_id in enumerate(scene_ids) if scene_id is not None]
+    sorted_ids = sorted(with_ids, key=lambda i: scene_ids[i]) + [_NO_SCENE] * (len(scenes) - len(with_ids))
+    return _EncodedStory(len(scenes), entries, scene_blobs, sorted_ids, targets, metadata)
+
+
+def _string_table(encoder: _Encoder) -> Tuple[bytes, bytes]:
+    """Encode interned strings as (offset table, blob)"""
+    encoded_strings = [text.encode("utf-8") for text in encoder.strings]
+    string_offsets = bytearray()
+    position = 0
+    for data in encoded_strings:
+        string_offsets += _U32.pack(position)
+        position += len(data)
+    string_offsets += _U32.pack(position)
+    return bytes(string_offsets), b"".join(encoded_strings)
+
+
+def _place_story(story: _EncodedStory, string_count: int, string_offsets_at: int,
+                 string_blob_at: int, body_at: int) -> Tuple[bytes, bytes]:
+    """
+    Lay out an encoded story whose sections start at body_at
+
+    Returns:
+        (header, body); every offset in them is absolute within the file
+    """
+    offset = body_at
+    scene_index_at = offset
+    offset += _SCENE_ENTRY.size * story.scene_count
+    sorted_ids_at = offset
+    offset += _U32.size * story.scene_count
+    targets_at = offset
+    offset += _I32.size * len(story.targets)
+    metadata_at = offset
+    offset += len(story.metadata)
+
+    scene_index = bytearray()
+    for (id_string, length, target_start, target_count), blob in zip(story.entries, story.scene_blobs):
+        scene_index += _SCENE_ENTRY.pack(id_string, offset, length, target_start, target_count)
+        offset += length
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, 0, story.scene_count, string_count,
+        string_offsets_at, string_blob_at, scene_index_at, sorted_ids_at, targets_at, metadata_at
+    )
+    body = b"".join([
+        scene_index,
+        b"".join(_U32.pack(i) for i in story.sorted_ids),
+        b"".join(_I32.pack(t) for t in story.targets),
+        story.metadata,
+        *story.scene_blobs
+    ])
+    return header, body
+
+
+def compile_story(story_data: Dict[str, Any]) -> bytes:
+    """Compile parsed story data into pack bytes"""
+    encoder = _Encoder()
+    story = _encode_story(story_data, encoder)
+    string_offsets, string_blob = _string_table(encoder)
+
+    string_offsets_at = _HEADER.size
+    string_blob_at = string_offsets_at + len(string_offsets)
+    header, body = _place_story(story, len(encoder.strings), string_offsets_at, string_blob_at,
+                                string_blob_at + len(string_blob))
+    return b"".join([header, string_offsets, string_blob, body])
+
+
+def compile_bundle(stories: Dict[str, Dict[str, Any]]) -> bytes:
+    """Compile several stories, keyed by name, into one bundle with a shared string table"""
+    encoder = _Encoder()
+    name_strings = [encoder.intern(name) for name in stories]
+    encoded = [_encode_story(story_data, encoder) for story_data in stories.values()]
+    string_offsets, string_blob = _string_table(encoder)
+
+    string_offsets_at = _BUNDLE_HEADER.size + _BUNDLE_ENTRY.size * len(stories)
+    string_blob_at = string_offsets_at + len(string_offsets)
+    offset = string_blob_at + len(string_blob)
+
+    directory = bytearray()
+    placed = []
+    for name_string, story in zip(name_strings, encoded):
+        header, body = _place_story(story, len(encoder.strings), string_offsets_at, string_blob_at,
+                                    offset + _HEADER.size)
+        directory += _BUNDLE_ENTRY.pack(name_string, offset)
+        placed += [header, body]
+        offset += len(header) + len(body)
+
+    bundle_header = _BUNDLE_HEADER.pack(
+        BUNDLE_MAGIC, VERSION, 0, len(stories), len(encoder.strings), string_offsets_at, string_blob_at
+    )
+    return b"".join([bundle_header, directory, string_offsets, string_blob, *placed])
+
+
+def compile_story_file(source_path: str, pack_path: str = None) -> str:
+    """Compile a story JSON file into a pack next to it; returns the pack path"""
+    story_data = StoryLoader().load(source_path)
+    pack_path = pack_path or os.path.splitext(source_path)[0] + PACK_SUFFIX
+    temp_path = pack_path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(compile_story(story_data))
+    os.replace(temp_path, pack_path)
+    return pack_path
+
+
+def story_name_for(source_path: str) -> str:
+    """The story name a JSON file is played as: its file name without the extension"""
+    return os.path.splitext(os.path.basename(source_path))[0]
+
+
+def compile_bundle_files(source_paths: List[str], bundle_path: str) -> str:
+    """Compile story JSON files into one bundle, each named after its file; returns the bundle path"""
+    loader = StoryLoader()
+    stories = {story_name_for(path): loader.load(path) for path in source_paths}
+    temp_path = bundle_path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(compile_bundle(stories))
+    os.replace(temp_path, bundle_path)
+    return bundle_path
+
+
+class MappedStory:
+    """
+    A story pack opened with mmap, decoding scenes only when they are visited
+
+    Offers the same navigation interface as story.CompiledStory.
+    """
+
+    def __init__(self, pack_path: str, scene_cache_size: int = 256, frozen: bool = False,
+                 buffer=None, base: int = 0, strings: Dict[int, str] = None):
+        """
+        Args:
+            pack_path: Path of the .pyadv pack (or of the bundle holding it)
+            scene_cache_size: Number of decoded scenes to keep
+            frozen: Decode scenes as read-only Scene records, for sharing between sessions
+            buffer: An already mapped bundle to read from instead of opening pack_path
+            base: Offset of the pack header within buffer
+            strings: Decoded string cache shared with the bundle's other stories
+        """
+        self.pack_path = pack_path
+        self.scene_cache_size = scene_cache_size
+        self.frozen = frozen
+        # A bundle's map belongs to the bundle, and is freed with its last story
+        self._owns_buffer = buffer is None
+        if buffer is None:
+            with open(pack_path, 'rb') as f:
+                try:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    raise StoryPackError(f"empty story pack '{pack_path}'")
+        self._buffer = buffer
+
+        if len(self._buffer) < base + _HEADER.size:
+            raise StoryPackError(f"truncated story pack '{pack_path}'")
+        (magic, version, _, self._scene_count, self._string_count,
+         self._string_offsets_at, self._string_blob_at, self._scene_index_at,
+         self._sorted_ids_at, self._targets_at, metadata_at) = _HEADER.unpack_from(self._buffer, base)
+        if magic != MAGIC or version != VERSION:
+            raise StoryPackError(f"'{pack_path}' is not a version {VERSION} story pack")
+
+        self._strings: Dict[int, str] = strings if strings is not None else {}
+        self._scenes: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # Shared stories are read from several threads (sessions, prefetch)
+        self._scenes_lock = threading.Lock()
+        self._index: Dict[str, Optional[int]] = {}
+
+        metadata, _ = self._decode(metadata_at)
+        self.title = metadata.get("title", "")
+        self.description = metadata.get("description", "")
+
+    def close(self):
+        """Release the memory map, unless it belongs to a bundle"""
+        if self._owns_buffer:
+            self._buffer.close()
+
+    def __len__(self) -> int:
+        return self._scene_count
+
+    def index_of(self, scene_id: str) -> Optional[int]:
+        """Return the index of a scene by ID using binary search over the sorted id table"""
+        if not isinstance(scene_id, str):
+            return None
+        if scene_id in self._index:
+            return self._index[scene_id]
+
+        found = None
+        low, high = 0, self._scene_count
+        while low < high:
+            middle = (low + high) // 2
+            candidate = _U32.unpack_from(self._buffer, self._sorted_ids_at + middle * _U32.size)[0]
+            if candidate != _NO_SCENE and self._scene_id(candidate) < scene_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._scene_count:
+            candidate = _U32.unpack_from(self._buffer, self._sorted_ids_at + low * _U32.size)[0]
+            if candidate != _NO_SCENE and self._scene_id(candidate) == scene_id:
+                # Ties are sorted by index, so this is the first occurrence
+                found = candidate
+
+        self._index[scene_id] = found
+        return found
+
+    def scene_at(self, index: int) -> Optional[Dict[str, Any]]:
+        """Decode the scene at an index, or return None if out of range"""
+        if not 0 <= index < self._scene_count:
+            return None
+
+        with self._scenes_lock:
+            scene = self._scenes.get(index)
+            if scene is not None:
+                self._scenes.move_to_end(index)
+                return scene
+
+        _, offset, _, _, _ = self._entry(index)
+        scene, _ = self._decode(offset)
+        if self.frozen:
+            scene = Scene(scene)
+        with self._scenes_lock:
+            self._scenes[index] = scene
+            if len(self._scenes) > self.scene_cache_size:
+                self._scenes.popitem(last=False)
+        return scene
+
+    def choice_target(self, index: int, choice_index: int) -> Optional[int]:
+        """Return the pre-resolved scene index a choice leads to"""
+        _, _, _, target_start, target_count = self._entry(index)
+        if not 0 <= choice_index < target_count:
+            return None
+        target = _I32.unpack_from(self._buffer, self._targets_at + (target_start + choice_index) * _I32.size)[0]
+        return None if target == _NO_TARGET else target
+
+    def _entry(self, index: int):
+        return _SCENE_ENTRY.unpack_from(self._buffer, self._scene_index_at + index * _SCENE_ENTRY.size)
+
+    def _scene_id(self, index: int) -> str:
+        return self._string(self._entry(index)[0])
+
+    def _string(self, string_index: int) -> str:
+        text = self._strings.get(string_index)
+        if text is None:
+            start, end = struct.unpack_from("<II", self._buffer, self._string_offsets_at + string_index * _U32.size)
+            text = self._buffer[self._string_blob_at + start:self._string_blob_at + end].decode("utf-8")
+            self._strings[string_index] = text
+        return text
+
+    def _decode(self, offset: int):
+        """Decode one value at offset; returns (value, next offset)"""
+        buffer = self._buffer
+        tag = buffer[offset:offset + 1]
+        offset += 1
+        if tag == b"s":
+            return self._string(_U32.unpack_from(buffer, offset)[0]), offset + _U32.size
+        if tag == b"m":
+            count = _U32.unpack_from(buffer, offset)[0]
+            offset += _U32.size
+            value = {}
+            for _ in range(count):
+                key = self._string(_U32.unpack_from(buffer, offset)[0])
+                value[key], offset = self._decode(offset + _U32.size)
+            return value, offset
+        if tag == b"l":
+            count = _U32.unpack_from(buffer, offset)[0]
+            offset += _U32.size
+            items = []
+            for _ in range(count):
+                item, offset = self._decode(offset)
+                items.append(item)
+            return items, offset
+        if tag == b"i":
+            return _I64.unpack_from(buffer, offset)[0], offset + _I64.size
+        if tag == b"d":
+            return _F64.unpack_from(buffer, offset)[0], offset + _F64.size
+        if tag == b"N":
+            return None, offset
+        if tag == b"T":
+            return True, offset
+        if tag == b"F":
+            return False, offset
+        raise StoryPackError(f"corrupt story pack '{self.pack_path}' at offset {offset - 1}")
+
+
+class StoryBundle:
+    """
+    A story bundle opened with mmap; each story in it is a MappedStory view
+
+    Stories share the bundle's map and its decoded strings, so opening one
+    more story from an open bundle costs only its header and metadata.
+    """
+
+    def __init__(self, bundle_path: str):
+        self.bundle_path = bundle_path
+        with open(bundle_path, 'rb') as f:
+            try:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise StoryPackError(f"empty story bundle '{bundle_path}'")
+
+        if len(self._buffer) < _BUNDLE_HEADER.size:
+            raise StoryPackError(f"truncated story bundle '{bundle_path}'")
+        (magic, version, _, story_count, _, string_offsets_at,
+         string_blob_at) = _BUNDLE_HEADER.unpack_from(self._buffer, 0)
+        if magic != BUNDLE_MAGIC or version != VERSION:
+            raise StoryPackError(f"'{bundle_path}' is not a version {VERSION} story bundle")
+
+        self._strings: Dict[int, str] = {}
+        # Story name -> (pack header offset, bytes up to the next story)
+        self._directory: Dict[str, Tuple[int, int]] = {}
+        offsets = []
+        for i in range(story_count):
+            name_string, offset = _BUNDLE_ENTRY.unpack_from(self._buffer, _BUNDLE_HEADER.size + i * _BUNDLE_ENTRY.size)
+            start, end = struct.unpack_from("<II", self._buffer, string_offsets_at + name_string * _U32.size)
+            name = self._buffer[string_blob_at + start:string_blob_at + end].decode("utf-8")
+            offsets.append((name, offset))
+        for i, (name, offset) in enumerate(offsets):
+            end = offsets[i + 1][1] if i + 1 < len(offsets) else len(self._buffer)
+            self._directory.setdefault(name, (offset, end - offset))
+
+    def __contains__(self, story_name: str) -> bool:
+        return story_name in self._directory
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._directory)
+
+    def __len__(self) -> int:
+        return len(self._directory)
+
+    def size_of(self, story_name: str) -> int:
+        """Bytes taken by one story's own sections, excluding the shared strings"""
+        return self._directory[story_name][1]
+
+    def story(self, story_name: str, scene_cache_size: int = 256, frozen: bool = False) -> MappedStory:
+        """Open a story in the bundle"""
+        entry = self._directory.get(story_name)
+        if entry is None:
+            raise KeyError(f"no story named '{story_name}' in '{self.bundle_path}'")
+        return MappedStory(self.bundle_path, scene_cache_size, frozen,
+                           buffer=self._buffer, base=entry[0], strings=self._strings)
+
+
+def main(argv=None):
+    """Command-line entry point: compile story JSON files into packs or a bundle"""
+    parser = argparse.ArgumentParser(description="Compile PyAdventure stories into binary packs")
+    parser.add_argument("stories", nargs="+", help="Story JSON files to compile")
+    parser.add_argument("-o", "--output", help="Output path (only with a single story)")
+    parser.add_argument("--bundle", metavar="PATH",
+                        help=f"Compile every story into one {BUNDLE_SUFFIX} bundle instead, named by file")
+    args = parser.parse_args(argv)
+
+    if args.output and len(args.stories) > 1:
+        parser.error("--output can only be used with a single story")
+    if args.output and args.bundle:
+        parser.error("--output cannot be combined with --bundle")
+
+    if args.bundle:
+        bundle_path = compile_bundle_files(args.stories, args.bundle)
+        print(f"Bundled {len(args.stories)} stories -> {bundle_path} ({os.path.getsize(bundle_path)} bytes)")
+        return
+
+    for source_path in args.stories:
+        pack_path = compile_story_file(source_path, args.output)
+        print(f"Compiled {source_path} -> {pack_path} ({os.path.getsize(pack_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The game is a set of top-level modules, not a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STORIES_DIR = os.path.join(ROOT, "stories")
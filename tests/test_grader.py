@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from conftest import STORIES_DIR
+from grader import BatchGrader
+from storybin import compile_story_file
+
+HELLO = "message = 'Hello, Python!'\nprint(message)"
+
+
+@pytest.fixture
+def pack_only_stories(tmp_path):
+    """A stories directory holding intro only as a compiled pack"""
+    compile_story_file(os.path.join(STORIES_DIR, "intro.json"), str(tmp_path / "intro.pyadv"))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def grader(pack_only_stories):
+    grader = BatchGrader(pack_only_stories, workers=1)
+    yield grader
+    grader.close()
+
+
+def test_grades_story_challenge_from_pack(grader):
+    result = grader.grade({"id": 1, "story": "intro", "scene": "variables", "code": HELLO})
+    assert result["success"], result
+
+
+def test_malformed_records_are_invalid_and_do_not_stop_the_stream(grader, pack_only_stories):
+    submissions = [
+        {"id": 1, "story": "intro", "scene": "variables", "code": None},
+        [1, 2],
+        {"id": 3, "challenge": "not a challenge", "code": "print(1)"},
+        {"id": 4, "story": "missing", "scene": "variables", "code": "print(1)"},
+        {"id": 5, "story": "intro", "scene": "variables", "code": HELLO},
+    ]
+    results = list(grader.grade_stream(submissions))
+
+    assert [result.get("invalid", False) for result in results] == [True, True, True, True, False]
+    assert results[-1]["success"]
+    assert grader.summary()["invalid"] == 4
+    # An unknown story is not created as a default story
+    assert os.listdir(pack_only_stories) == ["intro.pyadv"]
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from journal import JournalSaveBackend, read_events
+from player import Player
+
+
+def make_player(path, **backend_options):
+    return Player(backend=JournalSaveBackend(str(path), **backend_options), flush_interval=None,
+                  notify=lambda message: None)
+
+
+def play(player):
+    player.add_experience(10)
+    player.complete_challenge("intro:variables")
+    player.fail_challenge("intro:loops")
+    player.fail_challenge("intro:loops")
+    player.update_mastery("loop", 180, 3, 1)
+    player.complete_practice("bank-0-loop-7")
+    player.add_to_inventory("lantern")
+    player.unlock_achievement("First Steps")
+    player.set_story_progress("intro", "explore")
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return tmp_path / "player_journal.jsonl"
+
+
+def test_events_replay_into_the_saved_state(journal_path):
+    player = make_player(journal_path)
+    play(player)
+    player.flush()
+
+    reloaded = make_player(journal_path)
+    assert reloaded.to_dict() == player.to_dict()
+    assert reloaded.failed_challenges == {"intro:loops": 2}
+    assert reloaded.mastery == {"loop": {"rating": 180, "attempts": 3, "passed": 1}}
+
+
+def test_torn_final_line_is_skipped_and_later_events_survive(journal_path):
+    player = make_player(journal_path)
+    play(player)
+    player.flush()
+    # A crash part way through appending the next event
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 99, "type": "experience", "amo')
+
+    recovered = make_player(journal_path)
+    assert recovered.to_dict() == player.to_dict()
+
+    recovered.add_experience(5)
+    recovered.flush()
+    assert make_player(journal_path).experience == 15
+
+
+def test_compaction_snapshots_state_and_archives_events(journal_path):
+    player = make_player(journal_path, compact_every=4)
+    play(player)
+    player.add_experience(1)
+    player.flush()
+    backend = player.backend
+
+    with open(backend.snapshot_file, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    journaled = list(read_events(backend.journal_file))
+    assert snapshot["seq"] <= backend.seq
+    assert all(event["seq"] > snapshot["seq"] for event in journaled)
+    # Every event is kept once, in order, across the history and the journal
+    assert [event["seq"] for event in backend.events()] == list(range(1, backend.seq + 1))
+
+    assert make_player(journal_path, compact_every=4).to_dict() == player.to_dict()
+
+
+def test_events_already_in_the_snapshot_are_not_replayed(journal_path):
+    player = make_player(journal_path)
+    play(player)
+    player.flush()
+    backend = player.backend
+    # A crash after the snapshot was written but before the journal was archived
+    with open(backend.snapshot_file, "w", encoding="utf-8") as f:
+        json.dump({"seq": backend.seq, "state": player.to_dict()}, f)
+
+    reloaded = make_player(journal_path)
+    assert reloaded.to_dict() == player.to_dict()
+    assert reloaded.failed_challenges == {"intro:loops": 2}
+
+
+def test_reset_removes_the_save_and_keeps_a_history_marker(journal_path):
+    player = make_player(journal_path)
+    play(player)
+    player.flush()
+    player.reset_progress()
+
+    assert not player.backend.exists()
+    assert list(player.backend.events())[-1]["type"] == "reset"
+    assert make_player(journal_path).experience == 0
@@ -0,0 +1,71 @@
+import sys
+import threading
+
+from challenges import ChallengeValidator
+from output_match import OutputCapture, capture_print
+
+
+def test_capture_keeps_output_up_to_the_cap():
+    capture = OutputCapture(limit=8)
+    print_ = capture_print(capture.write)
+    print_("abc")
+
+    assert capture.output == "abc"
+    assert capture.bytes_written == 4
+    assert not capture.truncated
+
+
+def test_capture_counts_but_drops_output_past_the_cap():
+    capture = OutputCapture(limit=8)
+    print_ = capture_print(capture.write)
+    for _ in range(1000):
+        print_("abcdef")
+
+    assert capture.truncated
+    assert capture.bytes_written == 7000
+    assert len(capture._buffer) == 8
+    assert capture.output == "abcdef\na..."
+
+
+def test_capture_output_drops_a_character_split_at_the_cap():
+    capture = OutputCapture(limit=5)
+    capture.write("abcdéf")
+
+    assert capture.bytes_written == 7
+    assert capture.truncated
+    assert capture.output == "abcd..."
+
+
+def test_concurrent_validations_keep_their_output_apart():
+    validator = ChallengeValidator()
+    lines = 2000
+    results = {}
+
+    def submit(tag, expected):
+        start.wait()
+        code = f"for i in range({lines}):\n    print('{tag}')"
+        output = "\n".join([tag] * lines) if expected else None
+        results[tag, expected] = validator.validate_code(code, expected_output=output)
+
+    threads = [
+        threading.Thread(target=submit, args=(tag, expected))
+        for tag in ("north", "south", "east", "west")
+        for expected in (True, False)
+    ]
+    start = threading.Barrier(len(threads))
+    # Switch threads often, so the runs' prints interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    for (tag, expected), result in results.items():
+        assert result["success"], result["message"]
+        assert set(result["output"].split("\n")) == {tag}
+        assert result["output"].count(tag) == lines
+    assert len(results) == len(threads)
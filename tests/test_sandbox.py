@@ -0,0 +1,66 @@
+import pytest
+
+from challenges import ChallengeValidator
+from sandbox import SandboxPool
+from story_loader import freeze
+
+# Stories are served frozen (mapping proxies and tuples), as the registry shares them
+DOUBLE = freeze({
+    "prompt": "Print double the number",
+    "test_cases": [
+        {"inputs": {"number": 2}, "expected_output": "4"},
+        {"inputs": {"number": 5}, "expected_output": "10"},
+    ],
+})
+
+
+# Test-case challenges also run the submission once without inputs
+def doubling(operation):
+    return f"number = number if 'number' in dir() else 0\nprint(number {operation})"
+
+
+TABLE = freeze({
+    "prompt": "Print the sum",
+    "parameters": {"names": ["a", "b"], "rows": [[1, 2], [3, 4]], "expected": ["3", "7"]},
+})
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(workers=1, wall_time=1.0)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def validator(pool):
+    return ChallengeValidator(sandbox=pool)
+
+
+def test_pool_accepts_frozen_inputs(pool):
+    outcomes = pool.run_many("print(number * 2)", [case["inputs"] for case in DOUBLE["test_cases"]], ["4", "10"])
+    assert [outcome["status"] for outcome in outcomes] == ["ok", "ok"]
+    assert [outcome["mismatch"] for outcome in outcomes] == [None, None]
+
+
+def test_frozen_test_cases_run_in_sandbox(validator):
+    result = validator.validate_challenge(doubling("* 2"), DOUBLE)
+    assert result["success"], result
+
+
+def test_failing_test_case_is_reported(validator):
+    result = validator.validate_challenge(doubling("+ 2"), DOUBLE)
+    assert not result["success"]
+
+
+def test_frozen_parameter_table_runs_in_sandbox(validator):
+    result = validator.validate_challenge("print(a + b)", TABLE)
+    assert result["success"], result
+    assert len(result["cases"]) == 2
+
+
+def test_runaway_submission_is_stopped(validator):
+    result = validator.validate_challenge("while True:\n    pass", {"expected_output": "done"})
+    assert not result["success"]
+    # The pool replaces the killed worker
+    assert validator.validate_challenge("print('done')", {"expected_output": "done"})["success"]
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from scheduler import TOPICS, ChallengeBank, CompletedPositions
+
+TOPIC = TOPICS[0]
+
+
+@pytest.fixture(scope="module")
+def bank():
+    return ChallengeBank(per_topic=60, seed=3)
+
+
+def position(bank, challenge):
+    return bank.position_of(*bank.parse_id(challenge["id"]))
+
+
+def scan_nearest(difficulties, difficulty, completed):
+    """Reference answer: walk out from the search point one position at a time"""
+    above = next((i for i, d in enumerate(difficulties) if d >= difficulty), len(difficulties))
+    below = above - 1
+    while above < len(difficulties) and above in completed:
+        above += 1
+    while below >= 0 and below in completed:
+        below -= 1
+    if above < len(difficulties) and (below < 0 or
+                                      difficulties[above] - difficulty <= difficulty - difficulties[below]):
+        return above
+    return below if below >= 0 else None
+
+
+def test_completed_positions_skip_runs_both_ways():
+    completed = CompletedPositions()
+    for p in (3, 4, 5, 6, 9):
+        completed.add(p)
+
+    assert len(completed) == 5
+    assert 4 in completed and 7 not in completed
+    assert completed.open_above(3) == 7
+    assert completed.open_below(6) == 2
+    assert completed.open_above(7) == 7
+    # Links shortened by earlier lookups still lead to the right place
+    completed.add(7)
+    completed.add(8)
+    assert completed.open_above(3) == 10
+    assert completed.open_above(5) == 10
+    assert completed.open_below(9) == 2
+    completed.add(2)
+    assert completed.open_below(9) == 1
+
+
+def test_nearest_with_everything_completed_is_none(bank):
+    completed = CompletedPositions()
+    for p in range(bank.per_topic):
+        completed.add(p)
+    assert bank.nearest(TOPIC, 500, completed) is None
+    assert bank.nearest(TOPIC, 0, completed) is None
+
+
+def test_nearest_skips_a_completed_run_at_the_low_end(bank):
+    completed = CompletedPositions()
+    for p in range(10):
+        completed.add(p)
+
+    challenge = bank.nearest(TOPIC, 0, completed)
+    assert position(bank, challenge) == 10
+
+
+def test_nearest_skips_a_completed_run_at_the_high_end(bank):
+    completed = CompletedPositions()
+    for p in range(bank.per_topic - 10, bank.per_topic):
+        completed.add(p)
+
+    challenge = bank.nearest(TOPIC, 1000, completed)
+    assert position(bank, challenge) == bank.per_topic - 11
+
+
+def test_nearest_prefers_the_harder_challenge_on_a_tie(bank):
+    difficulties = bank._difficulties[TOPIC]
+    low = next(i for i in range(len(difficulties) - 1)
+               if (difficulties[i + 1] - difficulties[i]) % 2 == 0 and difficulties[i + 1] > difficulties[i])
+    middle = (difficulties[low] + difficulties[low + 1]) // 2
+
+    assert position(bank, bank.nearest(TOPIC, middle)) == low + 1
+
+
+def test_nearest_matches_a_linear_scan(bank):
+    difficulties = bank._difficulties[TOPIC]
+    rng = random.Random(0)
+    completed = CompletedPositions()
+    done = set()
+    for _ in range(bank.per_topic - 1):
+        difficulty = rng.randint(0, 1000)
+        challenge = bank.nearest(TOPIC, difficulty, completed)
+        expected = scan_nearest(difficulties, difficulty, done)
+        assert position(bank, challenge) == expected
+        completed.add(expected)
+        done.add(expected)
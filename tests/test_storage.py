@@ -0,0 +1,162 @@
+import json
+import os
+
+import pytest
+
+import storage
+from storage import SQLiteSaveStore, WriteBehindSaver, atomic_write_json
+
+
+@pytest.fixture
+def store():
+    store = SQLiteSaveStore(":memory:")
+    yield store
+    store.close()
+
+
+def save_data(**fields):
+    data = {
+        "experience": 0,
+        "completed_challenges": [],
+        "current_story": "intro",
+        "current_scene": "start",
+        "inventory": [],
+        "achievements": []
+    }
+    data.update(fields)
+    return data
+
+
+def test_backend_writes_only_changed_fields(store, monkeypatch):
+    updates = []
+    update = store.update
+    monkeypatch.setattr(store, "update", lambda profile, changes: (updates.append(dict(changes)),
+                                                                   update(profile, changes)))
+    backend = store.backend("ada")
+
+    backend.save(save_data())
+    assert set(updates[-1]) == set(save_data())
+
+    backend.save(save_data(experience=25, inventory=["lantern"]))
+    assert updates[-1] == {"experience": 25, "inventory": ["lantern"]}
+
+    # Nothing changed, so nothing is written
+    backend.save(save_data(experience=25, inventory=["lantern"]))
+    assert len(updates) == 2
+
+    # A fresh backend diffs against what it loaded
+    reloaded = store.backend("ada")
+    assert reloaded.load() == save_data(experience=25, inventory=["lantern"])
+    reloaded.save(save_data(experience=25, inventory=["lantern"], current_scene="cave"))
+    assert updates[-1] == {"current_scene": "cave"}
+
+
+def test_fields_without_columns_are_merged_into_extra(store):
+    store.update("ada", save_data(mastery={"loop": {"rating": 120}}))
+    store.update("ada", {"failed_challenges": {"intro:loops": 1}})
+    store.update("ada", {"mastery": {"loop": {"rating": 180}}})
+
+    loaded = store.load("ada")
+    assert loaded["failed_challenges"] == {"intro:loops": 1}
+    assert loaded["mastery"] == {"loop": {"rating": 180}}
+    assert loaded["current_story"] == "intro"
+
+
+def test_completed_count_follows_completed_challenges(store):
+    store.update("ada", save_data(completed_challenges=["a", "b", "c"]))
+    store.update("ada", {"experience": 40})
+    assert store.leaderboard()[0]["completed_count"] == 3
+
+
+def test_leaderboard_orders_and_breaks_ties(store):
+    store.update("ada", save_data(experience=50, completed_challenges=["a"]))
+    store.update("bob", save_data(experience=50, completed_challenges=["a", "b"]))
+    store.update("cy", save_data(experience=10, completed_challenges=["a", "b", "c"]))
+
+    assert [row["profile"] for row in store.leaderboard("experience")] == ["bob", "ada", "cy"]
+    assert [row["profile"] for row in store.leaderboard("completed")] == ["cy", "bob", "ada"]
+    assert [row["profile"] for row in store.leaderboard("experience", limit=1)] == ["bob"]
+
+    with pytest.raises(ValueError):
+        store.leaderboard("speed")
+
+
+def test_delete_removes_the_profile(store):
+    backend = store.backend("ada")
+    backend.save(save_data())
+    assert store.profiles() == ["ada"]
+
+    backend.delete()
+    assert not backend.exists()
+    assert store.profiles() == []
+
+
+def test_atomic_write_json_replaces_the_file(tmp_path):
+    path = tmp_path / "save.json"
+    atomic_write_json(str(path), {"experience": 1})
+    atomic_write_json(str(path), {"experience": 2}, compact=True)
+
+    assert json.loads(path.read_text()) == {"experience": 2}
+    assert os.listdir(tmp_path) == ["save.json"]
+
+
+def test_atomic_write_json_keeps_the_old_file_on_failure(tmp_path, monkeypatch):
+    path = tmp_path / "save.json"
+    atomic_write_json(str(path), {"experience": 1})
+
+    def fail(source, target):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage.os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write_json(str(path), {"experience": 2})
+
+    assert json.loads(path.read_text()) == {"experience": 1}
+    # The temp file is cleaned up
+    assert os.listdir(tmp_path) == ["save.json"]
+
+
+def test_write_behind_saver_coalesces_until_flushed():
+    flushes = []
+    saver = WriteBehindSaver(lambda: flushes.append(1), interval=None)
+
+    saver.mark_dirty()
+    saver.mark_dirty()
+    saver.mark_dirty()
+    assert flushes == []
+    assert saver in storage._pending_savers
+
+    saver.flush()
+    assert flushes == [1]
+    assert saver not in storage._pending_savers
+
+    # A clean saver has nothing to write
+    saver.close()
+    assert flushes == [1]
+
+
+def test_write_behind_saver_discard_drops_changes():
+    flushes = []
+    saver = WriteBehindSaver(lambda: flushes.append(1), interval=60)
+
+    saver.mark_dirty()
+    saver.discard()
+    saver.flush()
+
+    assert flushes == []
+    assert not saver.dirty
+    assert saver not in storage._pending_savers
+
+
+def test_write_behind_saver_flushes_once_per_interval():
+    flushed = []
+    saver = WriteBehindSaver(lambda: flushed.append(1), interval=0.05)
+
+    saver.mark_dirty()
+    timer = saver._timer
+    for _ in range(20):
+        saver.mark_dirty()
+    timer.join(5)
+
+    assert flushed == [1]
+    assert saver not in storage._pending_savers
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+from conftest import STORIES_DIR
+from story import CompiledStory
+from storybin import MappedStory, StoryBundle, StoryPackError, compile_bundle_files, compile_story
+
+ODD_IDS = {
+    "title": "Odd ids",
+    "scenes": [
+        {"id": "start", "choices": [{"text": "On", "next_scene": "next"}, {"text": "Nowhere"}]},
+        {"title": "No id"},
+        {"id": "start", "title": "Duplicate"},
+        {"id": "next", "choices": []},
+    ],
+}
+
+
+def open_pack(tmp_path, story_data):
+    pack_path = tmp_path / "story.pyadv"
+    pack_path.write_bytes(compile_story(story_data))
+    return MappedStory(str(pack_path))
+
+
+def test_pack_navigates_like_compiled_story(tmp_path):
+    with open(os.path.join(STORIES_DIR, "intro.json"), encoding="utf-8") as f:
+        story_data = json.load(f)
+    mapped = open_pack(tmp_path, story_data)
+    compiled = CompiledStory(story_data)
+
+    assert mapped.title == compiled.title
+    assert len(mapped) == len(compiled)
+    for i, scene in enumerate(story_data["scenes"]):
+        assert mapped.index_of(scene["id"]) == compiled.index_of(scene["id"])
+        assert mapped.scene_at(i) == scene
+        for choice_index in range(len(scene.get("choices", []))):
+            assert mapped.choice_target(i, choice_index) == compiled.choice_target(i, choice_index)
+    assert mapped.scene_at(len(mapped)) is None
+    mapped.close()
+
+
+def test_pack_keeps_scenes_with_missing_or_duplicate_ids(tmp_path):
+    mapped = open_pack(tmp_path, ODD_IDS)
+
+    assert len(mapped) == 4
+    assert mapped.index_of("start") == 0
+    assert mapped.index_of("next") == 3
+    assert mapped.index_of("missing") is None
+    assert mapped.index_of(None) is None
+    assert mapped.index_of("") is None
+    assert CompiledStory(ODD_IDS).index_of("") is None
+    assert mapped.scene_at(1) == {"title": "No id"}
+    assert mapped.choice_target(0, 0) == 3
+    assert mapped.choice_target(0, 1) is None
+    mapped.close()
+
+
+def test_pack_lookups_agree_with_compiled_story(tmp_path):
+    scenes = [{"id": scene_id} if scene_id is not None else {} for scene_id in
+              ["m", None, "", "b", "m", None, "z", "a", ""]]
+    story_data = {"title": "Lookups", "scenes": scenes}
+    mapped = open_pack(tmp_path, story_data)
+    compiled = CompiledStory(story_data)
+
+    for scene_id in ["", "a", "b", "m", "z", "c", "zz", None]:
+        assert mapped.index_of(scene_id) == compiled.index_of(scene_id), scene_id
+    mapped.close()
+
+
+def test_bundle_stories_share_one_file(tmp_path):
+    sources = [os.path.join(STORIES_DIR, name) for name in ("intro.json", "epic_fantasy_quest.json")]
+    bundle = compile_bundle_files(sources, str(tmp_path / "stories.pyadv"))
+    opened = StoryBundle(bundle)
+
+    assert sorted(opened) == ["epic_fantasy_quest", "intro"]
+    assert opened.story("intro").index_of("variables") is not None
+    with pytest.raises(KeyError):
+        opened.story("missing")
+
+
+def test_rejects_files_that_are_not_packs(tmp_path):
+    path = tmp_path / "bad.pyadv"
+    path.write_bytes(b"not a story pack at all, just some bytes to read")
+    with pytest.raises(StoryPackError):
+        MappedStory(str(path))